@@ -14,6 +14,7 @@
 
 import os
 
+import click
 from flask import Flask
 from flask_restx import Api
 
@@ -21,10 +22,12 @@ from config import DevelopmentConfig, ProductionConfig
 from routes.api_routes import (
     boards_ns,
     categories_ns,
+    internal_ns,
     notes_ns,
     register_static_routes,
     settings_ns,
 )
+from services import services
 
 CONFIG = {
     "development": DevelopmentConfig,
@@ -41,16 +44,20 @@ def create_app(testing=False):
         __name__, static_folder=static_folder_path, static_url_path=None
     )
 
+    flask_app.config.from_object(CONFIG.get(env, ProductionConfig))
     if testing:
         flask_app.config.update(
             {
                 "TESTING": True,
                 "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+                "SQLALCHEMY_ENGINE_OPTIONS": {},
                 "SQLALCHEMY_TRACK_MODIFICATIONS": False,
             }
         )
-    else:
-        flask_app.config.from_object(CONFIG.get(env, ProductionConfig))
+
+    services.init_app(flask_app)
+    if testing:
+        services.db.create_tables()
 
     api = Api(
         flask_app,
@@ -65,12 +72,24 @@ def create_app(testing=False):
     api.add_namespace(categories_ns)
     api.add_namespace(notes_ns)
     api.add_namespace(settings_ns)
+    api.add_namespace(internal_ns)
 
     register_static_routes(flask_app)
+    register_commands(flask_app)
 
     return flask_app
 
 
+def register_commands(flask_app):
+    """Register the command line commands of the app"""
+
+    @flask_app.cli.command("init-db")
+    def init_db_command():
+        """Create or migrate the database and sync the settings."""
+        services.init_database()
+        click.echo("Database is up to date.")
+
+
 app = create_app()
 
 if __name__ == "__main__":
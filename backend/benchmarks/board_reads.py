@@ -0,0 +1,128 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Per-board read latency as the total note count grows
+
+Every board has the same categories and notes, only the number of boards
+grows, so the reads of one board should take the same time at every size.
+Run it from the backend directory:
+
+    PYTHONPATH=. python benchmarks/board_reads.py [--without-indexes]
+"""
+
+import argparse
+import os
+import tempfile
+import timeit
+
+from sqlalchemy import insert, text
+
+from config import Config
+from database.models import Board, Category, Note
+from services import services
+
+CATEGORIES_PER_BOARD = 3
+NOTES_PER_BOARD = 60
+TOTAL_NOTES = (1_000, 10_000, 100_000)
+INDEXES = (
+    "ix_notes_board_id_category",
+    "ix_notes_category",
+    "ix_categories_board_id",
+)
+
+
+def fill(board_count: int):
+    """Add boards with the same categories and notes to the database"""
+    with services.db.get_session() as session:
+        session.execute(
+            insert(Board),
+            [{"name": f"Board {index}"} for index in range(board_count)],
+        )
+        session.execute(
+            insert(Category),
+            [
+                {"name": f"Category {index}", "board_id": board_id}
+                for board_id in range(1, board_count + 1)
+                for index in range(CATEGORIES_PER_BOARD)
+            ],
+        )
+        session.execute(
+            insert(Note),
+            [
+                {
+                    "description": f"Note {index}",
+                    "category": (board_id - 1) * CATEGORIES_PER_BOARD
+                    + index % CATEGORIES_PER_BOARD
+                    + 1,
+                    "tags": [],
+                    "board_id": board_id,
+                }
+                for board_id in range(1, board_count + 1)
+                for index in range(NOTES_PER_BOARD)
+            ],
+        )
+        session.commit()
+
+
+def measure(board_id: int, repeat: int) -> dict[str, float]:
+    """Return the best latency of the board reads in milliseconds"""
+    reads = {
+        "get_notes": lambda: services.get_notes(board_id),
+        "get_categories": lambda: services.get_categories(board_id),
+        "get_note_changes": lambda: services.get_note_changes(board_id, 0),
+    }
+    return {
+        name: min(timeit.repeat(read, number=1, repeat=repeat)) * 1000
+        for name, read in reads.items()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--without-indexes",
+        action="store_true",
+        help="drop the board and category indexes to compare",
+    )
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(
+        f"{'notes':>8} {'get_notes':>12} {'get_categories':>15} "
+        f"{'get_note_changes':>17}"
+    )
+    for total in TOTAL_NOTES:
+        with tempfile.TemporaryDirectory() as directory:
+            services.db.configure(
+                "sqlite:///" + os.path.join(directory, "data.sqlite"),
+                Config.SQLITE_PRAGMAS,
+            )
+            services.db.create_tables()
+            if args.without_indexes:
+                with services.db.engine.begin() as connection:
+                    for index in INDEXES:
+                        connection.execute(text(f"DROP INDEX {index}"))
+            fill(total // NOTES_PER_BOARD)
+
+            # The last board, so a scan has to read past all the others
+            timings = measure(total // NOTES_PER_BOARD, args.repeat)
+            services.db.engine.dispose()
+
+        print(
+            f"{total:>8} {timings['get_notes']:>10.2f}ms "
+            f"{timings['get_categories']:>13.2f}ms "
+            f"{timings['get_note_changes']:>15.2f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
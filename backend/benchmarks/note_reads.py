@@ -0,0 +1,115 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""CPU time and memory of the note listing per 1,000 notes
+
+Compares the column projection of get_notes with loading Note objects
+into the session and copying their attributes, as it used to. Run it from
+the backend directory:
+
+    PYTHONPATH=. python benchmarks/note_reads.py
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+from sqlalchemy import insert, select
+
+from config import Config
+from database.models import Board, Category, Note
+from services import services
+
+NOTES = 1_000
+
+
+def hydrated_get_notes(board_id: int) -> list[dict]:
+    """Return the notes of a board by loading them as ORM objects"""
+    with services.db.get_session() as session:
+        return [
+            services.note_as_dict(note)
+            for note in session.scalars(
+                select(Note).where(Note.board_id == board_id).order_by(Note.id)
+            )
+        ]
+
+
+def projected_get_notes(board_id: int) -> list[dict]:
+    """Return the notes of a board from the selected columns"""
+    return services.get_notes(board_id).response
+
+
+def fill():
+    """Add a board with a category and its notes"""
+    with services.db.get_session() as session:
+        session.execute(insert(Board), [{"name": "Board"}])
+        session.execute(insert(Category), [{"name": "Good", "board_id": 1}])
+        session.execute(
+            insert(Note),
+            [
+                {
+                    "description": f"Note {index}",
+                    "category": 1,
+                    "tags": ["tag"],
+                    "board_id": 1,
+                }
+                for index in range(NOTES)
+            ],
+        )
+        session.commit()
+
+
+def measure(read, repeat: int) -> tuple[float, float]:
+    """Return the best CPU time in milliseconds and the peak KiB traced
+    while reading the notes once"""
+    read(1)
+    cpu_time = float("inf")
+    for _ in range(repeat):
+        start = time.process_time()
+        read(1)
+        cpu_time = min(cpu_time, time.process_time() - start)
+
+    tracemalloc.start()
+    notes = read(1)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    assert len(notes) == NOTES
+    return cpu_time * 1000, peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        services.db.configure(
+            "sqlite:///" + os.path.join(directory, "data.sqlite"),
+            Config.SQLITE_PRAGMAS,
+        )
+        services.db.create_tables()
+        fill()
+
+        print(f"{'read':<10} {'cpu':>10} {'peak':>12}")
+        for name, read in (
+            ("hydrated", hydrated_get_notes),
+            ("projected", projected_get_notes),
+        ):
+            cpu_time, peak = measure(read, args.repeat)
+            print(f"{name:<10} {cpu_time:>8.2f}ms {peak:>9.1f}KiB")
+        services.db.engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
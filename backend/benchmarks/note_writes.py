@@ -0,0 +1,170 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Single note and setting write latency and peak traced memory
+
+Compares the direct UPDATE and DELETE statements of the services with the
+previous path that loaded the ORM object, changed it and flushed it.
+Run it from the backend directory:
+
+    PYTHONPATH=. python benchmarks/note_writes.py
+"""
+
+import argparse
+import os
+import tempfile
+import timeit
+import tracemalloc
+
+from sqlalchemy import insert, select
+
+from config import Config
+from database.database_handler import bump_revision
+from database.models import Board, Category, Note, Setting, Tombstone
+from services import services
+
+NOTES = 2_000
+
+
+def loaded_modify_note_category(note_id: int, new_category: int):
+    """Change the category of a note by loading it first"""
+    with services.db.get_session() as session:
+        note = session.scalars(select(Note).where(Note.id == note_id)).one()
+        note.category = new_category
+        note.revision = services.bump_board_revision(session, note.board_id)
+        services.note_as_dict(note)
+        session.commit()
+
+
+def loaded_remove_note(note_id: int):
+    """Remove a note by loading it first"""
+    with services.db.get_session() as session:
+        note = session.get(Note, note_id)
+        revision = services.bump_board_revision(session, note.board_id, -1)
+        session.add(
+            Tombstone(
+                board_id=note.board_id,
+                entity="note",
+                entity_id=note.id,
+                revision=revision,
+            )
+        )
+        session.delete(note)
+        session.commit()
+
+
+def loaded_modify_setting(setting_name: str, new_value: str):
+    """Change a setting by loading it first"""
+    with services.db.get_session() as session:
+        setting = session.scalars(
+            select(Setting).where(Setting.setting_name == setting_name)
+        ).one()
+        setting.setting_value = new_value
+        bump_revision(session, "settings")
+        session.commit()
+
+
+def fill():
+    """Add a board with two categories, its notes and a setting"""
+    with services.db.get_session() as session:
+        session.execute(insert(Board), [{"name": "Board"}])
+        session.execute(
+            insert(Category),
+            [{"name": name, "board_id": 1} for name in ("Good", "Bad")],
+        )
+        session.execute(
+            insert(Note),
+            [
+                {
+                    "description": f"Note {index}",
+                    "category": 1,
+                    "tags": [],
+                    "board_id": 1,
+                }
+                for index in range(NOTES)
+            ],
+        )
+        session.execute(
+            insert(Setting),
+            [
+                {
+                    "setting_name": "benchmark",
+                    "setting_value": "0",
+                    "setting_type": "string",
+                    "setting_display_name": "Benchmark",
+                    "setting_description": "",
+                }
+            ],
+        )
+        session.commit()
+
+
+def measure(write, repeat: int) -> tuple[float, float]:
+    """Return the best latency in milliseconds and peak KiB traced in a write
+
+    The write is called with a growing counter, so each call changes or
+    removes a different note.
+    """
+    calls = iter(range(1, NOTES + 1))
+    latency = min(
+        timeit.repeat(lambda: write(next(calls)), number=1, repeat=repeat)
+    )
+    tracemalloc.start()
+    write(next(calls))
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return latency * 1000, peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    writes = {
+        "modify_note_category": (
+            lambda i: loaded_modify_note_category(i, 2 - i % 2),
+            lambda i: services.modify_note_category(i, 2 - i % 2),
+        ),
+        "modify_setting": (
+            lambda i: loaded_modify_setting("benchmark", str(i)),
+            lambda i: services.modify_setting("benchmark", str(i)),
+        ),
+        "remove_note": (loaded_remove_note, services.remove_note),
+    }
+
+    print(
+        f"{'write':<22} {'loaded':>10} {'direct':>10} "
+        f"{'loaded peak':>14} {'direct peak':>14}"
+    )
+    for name, variants in writes.items():
+        timings = []
+        for write in variants:
+            with tempfile.TemporaryDirectory() as directory:
+                services.db.configure(
+                    "sqlite:///" + os.path.join(directory, "data.sqlite"),
+                    Config.SQLITE_PRAGMAS,
+                )
+                services.db.create_tables()
+                fill()
+                timings.append(measure(write, args.repeat))
+                services.db.engine.dispose()
+
+        (loaded, loaded_peak), (direct, direct_peak) = timings
+        print(
+            f"{name:<22} {loaded:>8.3f}ms {direct:>8.3f}ms "
+            f"{loaded_peak:>11.1f}KiB {direct_peak:>11.1f}KiB"
+        )
+
+
+if __name__ == "__main__":
+    main()
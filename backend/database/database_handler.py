@@ -12,57 +12,242 @@
 
 """Database handler"""
 
+import hashlib
 import json
-from sqlite3 import DatabaseError
+import os
+from contextlib import AbstractContextManager, nullcontext
+from contextvars import ContextVar
 
-from sqlalchemy import create_engine, event
+from alembic import command
+from alembic.config import Config as AlembicConfig
+from sqlalchemy import (
+    create_engine,
+    event,
+    inspect,
+    make_url,
+    pool,
+    select,
+    update,
+)
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import DatabaseError
 from sqlalchemy.orm import Session, sessionmaker
 
-from database.models import Base, Setting
+from database.models import Base, Checksum, Revision, Setting
+from database.pool import PoolStats
+
+DEFAULT_DATABASE_URL = "sqlite:///database/data.sqlite"
+SETTINGS_FILE = "settings.json"
+ALEMBIC_INI = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic.ini"
+)
+# Alembic revision creating the tables as they were before migrations
+INITIAL_REVISION = "d1b5c6b8d9cc"
+# Global revision stamps, whose rows are created with the tables
+REVISION_NAMES = ("boards", "settings")
+
+
+# Sizing options only the QueuePool family accepts
+QUEUE_POOL_OPTIONS = ("pool_size", "max_overflow", "pool_timeout")
+
+DIALECT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def dialect_insert(session: Session, entity):
+    """Return an INSERT of the session's dialect, which supports
+    on_conflict_do_nothing"""
+    return DIALECT_INSERTS[session.get_bind().dialect.name](entity)
+
+
+def bump_revision(session: Session, name: str) -> int:
+    """Increment a global revision stamp in the current transaction and
+    return its new value
+
+    The rows of REVISION_NAMES are created with the tables. A missing row
+    is inserted unless a concurrent transaction did so first, in which
+    case the increment waits for it instead of failing on the key.
+    """
+    bump = (
+        update(Revision)
+        .where(Revision.name == name)
+        .values(revision=Revision.revision + 1)
+        .returning(Revision.revision)
+    )
+    revision = session.execute(bump).scalar()
+    if revision is None:
+        session.execute(
+            dialect_insert(session, Revision)
+            .values(name=name, revision=0)
+            .on_conflict_do_nothing()
+        )
+        revision = session.execute(bump).scalar()
+    return revision
 
 
 class DatabaseHandler:
     """Main class for database handling"""
 
-    def __init__(self, db_url="sqlite:///database/data.sqlite"):
-        self.engine = create_engine(db_url, echo=False)
+    def __init__(
+        self, db_url=DEFAULT_DATABASE_URL, pragmas=None, engine_options=None
+    ):
+        self.request_session: ContextVar[Session | None] = ContextVar(
+            "request_session", default=None
+        )
+        self.configure(db_url, pragmas, engine_options)
+
+    def configure(
+        self,
+        db_url: str,
+        pragmas: dict | None = None,
+        engine_options: dict | None = None,
+    ):
+        """Create the engine and session factory for a database URL
+
+        The engine connects lazily, so no database is opened until the
+        first session is used. The given pragmas are set on every new
+        SQLite connection after foreign keys are enabled, other databases
+        enforce foreign keys on their own. The engine options are
+        passed to create_engine, poolclass may be given by its name in
+        sqlalchemy.pool and defaults to the one of the dialect. The pool
+        sizing options are dropped for pool classes which do not take
+        them, like NullPool or StaticPool.
+        """
+        options = dict(engine_options or {})
+        pool_class = options.pop("poolclass", None)
+        if isinstance(pool_class, str):
+            pool_class = getattr(pool, pool_class)
+        if pool_class is None:
+            url = make_url(db_url)
+            pool_class = url.get_dialect().get_pool_class(url)
+        if not issubclass(pool_class, pool.QueuePool):
+            for name in QUEUE_POOL_OPTIONS:
+                options.pop(name, None)
+
+        self.pool_stats = PoolStats()
+        self.engine = create_engine(
+            db_url,
+            echo=False,
+            poolclass=self.pool_stats.timed(pool_class),
+            **options,
+        )
+        self.pool_stats.watch(self.engine)
         self.session_local = sessionmaker(bind=self.engine)
+        if self.engine.dialect.name == "sqlite":
+            self._set_sqlite_pragmas(dict(pragmas or {}))
+
+    def _set_sqlite_pragmas(self, pragmas: dict):
+        """Enable foreign keys and set the pragmas on every new connection"""
 
         @event.listens_for(self.engine, "connect")
         def set_sqlite_pragma(dbapi_connection, _connection_record):
             dbapi_connection.execute("PRAGMA foreign_keys = ON")
+            for name, value in pragmas.items():
+                dbapi_connection.execute(f"PRAGMA {name} = {value}")
 
     def create_tables(self):
-        """Create new database tables"""
+        """Create new database tables and their global revision stamps"""
         Base.metadata.create_all(self.engine)
+        with self.engine.begin() as connection:
+            connection.execute(
+                DIALECT_INSERTS[connection.dialect.name](Revision)
+                .values([{"name": name} for name in REVISION_NAMES])
+                .on_conflict_do_nothing()
+            )
+
+    def init_database(self):
+        """Create a new database or migrate an existing one
+
+        Both run the Alembic migrations up to the latest revision, like
+        `alembic upgrade head`. Databases created before migrations were
+        introduced hold the initial tables without a revision, they are
+        stamped with the initial revision first.
+        """
+        with self.engine.begin() as connection:
+            alembic_config = AlembicConfig(ALEMBIC_INI)
+            alembic_config.attributes["connection"] = connection
+            tables = inspect(connection)
+            if tables.has_table("boards") and not tables.has_table(
+                "alembic_version"
+            ):
+                command.stamp(alembic_config, INITIAL_REVISION)
+            command.upgrade(alembic_config, "head")
+
+    def get_pool_stats(self) -> dict:
+        """Get the connection pool counters and state"""
+        return self.pool_stats.snapshot(self.engine.pool)
+
+    def begin_request(self):
+        """Start the unit of work of a request
+
+        Every get_session until end_request shares one session, so the
+        request checks out one connection and runs in one transaction
+        until a service commits. The connection is only checked out once
+        the session is first used.
+        """
+        self.request_session.set(self.session_local())
 
-    def get_session(self) -> Session:
-        """Get database session"""
+    def end_request(self, _exception=None):
+        """Close the session of the request and return its connection
+
+        Anything the services did not commit is rolled back.
+        """
+        session = self.request_session.get()
+        if session is not None:
+            self.request_session.set(None)
+            session.close()
+
+    def get_session(self) -> AbstractContextManager[Session]:
+        """Get the session of the current request, or a new one outside
+        of a request
+
+        Use it in a with block. Leaving the block closes a new session,
+        the one of a request stays open until end_request.
+        """
+        session = self.request_session.get()
+        if session is not None:
+            return nullcontext(session)
         return self.session_local()
 
-    def sync_settings(self, session: Session):
-        """Reads settings file and adds not yet existing settings to the DB"""
-        with open("settings.json", encoding="utf-8") as settings_file:
-            settings_list = json.load(settings_file)
+    def sync_settings(self, session: Session, path: str = SETTINGS_FILE):
+        """Reads settings file and adds not yet existing settings to the DB
 
-        for setting in settings_list:
-            exists = (
-                session.query(Setting)
-                .filter_by(setting_name=setting["setting_name"])
-                .first()
-            )
-            if not exists:
-                try:
-                    tmp_setting = Setting(
-                        setting_name=setting["setting_name"],
-                        setting_value=setting["default_value"],
-                        setting_type=setting["setting_type"],
-                        setting_display_name=setting["setting_display_name"],
-                        setting_description=setting["setting_description"],
-                    )
-                    session.add(tmp_setting)
-                except DatabaseError:
-                    session.rollback()
-                    raise
-
-        session.commit()
+        The checksum of the file is stored once it is synced, so an unchanged
+        file costs a single lookup instead of a query per setting.
+        """
+        with open(path, "rb") as settings_file:
+            content = settings_file.read()
+        checksum = hashlib.sha256(content).hexdigest()
+        stored = session.get(Checksum, "settings")
+        if stored is not None and stored.checksum == checksum:
+            return
+
+        existing = set(session.scalars(select(Setting.setting_name)))
+        missing = [
+            {
+                "setting_name": setting["setting_name"],
+                "setting_value": setting["default_value"],
+                "setting_type": setting["setting_type"],
+                "setting_display_name": setting["setting_display_name"],
+                "setting_description": setting["setting_description"],
+            }
+            for setting in json.loads(content)
+            if setting["setting_name"] not in existing
+        ]
+
+        try:
+            if missing:
+                result = session.execute(
+                    dialect_insert(session, Setting)
+                    .values(missing)
+                    .on_conflict_do_nothing()
+                )
+                if result.rowcount:
+                    bump_revision(session, "settings")
+            if stored is None:
+                session.add(Checksum(name="settings", checksum=checksum))
+            else:
+                stored.checksum = checksum
+            session.commit()
+        except DatabaseError:
+            session.rollback()
+            raise
@@ -14,7 +14,7 @@
 
 from typing import List
 
-from sqlalchemy import JSON, ForeignKey, String
+from sqlalchemy import JSON, ForeignKey, Index, String, Text
 from sqlalchemy.orm import (
     Mapped,
     declarative_base,
@@ -32,7 +32,9 @@ class Board(Base):
     __table_args__ = {"sqlite_autoincrement": True}
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
-    name: Mapped[str] = mapped_column(String(30))
+    name: Mapped[str] = mapped_column(Text)
+    revision: Mapped[int] = mapped_column(default=0, server_default="0")
+    note_count: Mapped[int] = mapped_column(default=0, server_default="0")
     categories: Mapped[List["Category"]] = relationship(
         back_populates="board", cascade="all, delete-orphan"
     )
@@ -47,15 +49,22 @@ class Note(Base):
     """Database model of a Note"""
 
     __tablename__ = "notes"
-    __table_args__ = {"sqlite_autoincrement": True}
+    # The composite indexes also serve lookups by board_id alone, the one
+    # on id lets the notes of a board be paged through in id order
+    __table_args__ = (
+        Index("ix_notes_board_id_category", "board_id", "category"),
+        Index("ix_notes_board_id_id", "board_id", "id"),
+        {"sqlite_autoincrement": True},
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
-    description: Mapped[str] = mapped_column(String(30))
+    description: Mapped[str] = mapped_column(Text)
     category: Mapped[int] = mapped_column(
-        ForeignKey("categories.id", ondelete="CASCADE")
+        ForeignKey("categories.id", ondelete="CASCADE"), index=True
     )
     tags: Mapped[list] = mapped_column(JSON)
     board_id: Mapped[int] = mapped_column(ForeignKey("boards.id"))
+    revision: Mapped[int] = mapped_column(default=0, server_default="0")
 
     categories: Mapped["Category"] = relationship(back_populates="notes")
 
@@ -73,19 +82,68 @@ class Category(Base):
     __table_args__ = {"sqlite_autoincrement": True}
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
-    name: Mapped[str] = mapped_column(String(30))
-    board_id: Mapped[int] = mapped_column(ForeignKey("boards.id"))
+    name: Mapped[str] = mapped_column(Text)
+    board_id: Mapped[int] = mapped_column(ForeignKey("boards.id"), index=True)
+    revision: Mapped[int] = mapped_column(default=0, server_default="0")
 
     board: Mapped["Board"] = relationship(back_populates="categories")
 
-    notes: Mapped["Note"] = relationship(
-        back_populates="categories", cascade="all, delete-orphan"
+    # The notes are removed by the ON DELETE CASCADE of notes.category
+    notes: Mapped[List["Note"]] = relationship(
+        back_populates="categories",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
     )
 
     def __repr__(self) -> str:
         return f"Category(id={self.id!r}, name={self.name!r})"
 
 
+class Tombstone(Base):
+    """Database model of a deleted note or category of a board"""
+
+    __tablename__ = "tombstones"
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    board_id: Mapped[int] = mapped_column(
+        ForeignKey("boards.id", ondelete="CASCADE")
+    )
+    entity: Mapped[str] = mapped_column(String(16))
+    entity_id: Mapped[int]
+    revision: Mapped[int]
+
+    def __repr__(self) -> str:
+        return (
+            f"Tombstone(board_id={self.board_id!r}, entity={self.entity!r},"
+            f"entity_id={self.entity_id!r}, revision={self.revision!r})"
+        )
+
+
+class Revision(Base):
+    """Database model of a global revision stamp"""
+
+    __tablename__ = "revisions"
+
+    name: Mapped[str] = mapped_column(String(16), primary_key=True)
+    revision: Mapped[int] = mapped_column(default=0, server_default="0")
+
+    def __repr__(self) -> str:
+        return f"Revision(name={self.name!r}, revision={self.revision!r})"
+
+
+class Checksum(Base):
+    """Database model of the checksum of a synced file"""
+
+    __tablename__ = "checksums"
+
+    name: Mapped[str] = mapped_column(String(16), primary_key=True)
+    checksum: Mapped[str] = mapped_column(String(64))
+
+    def __repr__(self) -> str:
+        return f"Checksum(name={self.name!r}, checksum={self.checksum!r})"
+
+
 class Setting(Base):
     """Database model for Settings"""
 
@@ -0,0 +1,108 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Connection pool metrics"""
+
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import Pool
+
+
+class PoolStats:
+    """Counters of the connections handed out by an engine's pool
+
+    Checkouts and checkins are counted from the pool events, the time a
+    caller waited for a connection is measured around Pool.connect, which
+    includes opening a new connection when the pool has no idle one.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.timeouts = 0
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+
+    def watch(self, target):
+        """Count the connections of a pool, or of an engine's pool"""
+        event.listen(target, "connect", self._on_connect)
+        event.listen(target, "checkout", self._on_checkout)
+        event.listen(target, "checkin", self._on_checkin)
+
+    def timed(self, pool_class: type[Pool]) -> type[Pool]:
+        """Return a subclass of a pool class which records wait times"""
+        stats = self
+
+        class TimedPool(pool_class):
+            """Pool which records how long connect calls wait"""
+
+            def connect(self):
+                start = time.perf_counter()
+                try:
+                    connection = super().connect()
+                except PoolTimeoutError:
+                    stats.record_wait(time.perf_counter() - start, True)
+                    raise
+                stats.record_wait(time.perf_counter() - start)
+                return connection
+
+        TimedPool.__name__ = pool_class.__name__
+        return TimedPool
+
+    def record_wait(self, seconds: float, timed_out: bool = False):
+        """Record the time a caller waited for a connection"""
+        with self._lock:
+            self.wait_time += seconds
+            self.max_wait_time = max(self.max_wait_time, seconds)
+            if timed_out:
+                self.timeouts += 1
+
+    def snapshot(self, pool: Pool) -> dict:
+        """Return the counters together with the current pool state"""
+        with self._lock:
+            stats = {
+                "pool_class": type(pool).__name__,
+                "connects": self.connects,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "checked_out": self.checkouts - self.checkins,
+                "timeouts": self.timeouts,
+                "wait_time": self.wait_time,
+                "max_wait_time": self.max_wait_time,
+                "avg_wait_time": (
+                    self.wait_time / self.checkouts if self.checkouts else 0.0
+                ),
+            }
+        for name in ("size", "overflow"):
+            # SingletonThreadPool keeps its size in a plain attribute
+            if callable(getattr(pool, name, None)):
+                stats[name] = getattr(pool, name)()
+        return stats
+
+    def _on_connect(self, _dbapi_connection, _connection_record):
+        with self._lock:
+            self.connects += 1
+
+    def _on_checkout(
+        self, _dbapi_connection, _connection_record, _connection_proxy
+    ):
+        with self._lock:
+            self.checkouts += 1
+
+    def _on_checkin(self, _dbapi_connection, _connection_record):
+        with self._lock:
+            self.checkins += 1
@@ -3,6 +3,7 @@ from logging.config import fileConfig
 from alembic import context
 from sqlalchemy import engine_from_config, pool
 
+from config import Config
 from database.models import Base
 
 # this is the Alembic Config object, which provides
@@ -10,9 +11,16 @@ from database.models import Base
 config = context.config
 
 # Interpret the config file for Python logging.
-# This line sets up loggers basically.
+# This line sets up loggers basically. The app runs migrations in its own
+# process, so the loggers it already created are left enabled.
 if config.config_file_name is not None:
-    fileConfig(config.config_file_name)
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+# Migrate the database the app is configured with, so DATABASE_URL is
+# honoured by the alembic command line too.
+config.set_main_option(
+    "sqlalchemy.url", Config.SQLALCHEMY_DATABASE_URI.replace("%", "%%")
+)
 
 # add your model's MetaData object here
 # for 'autogenerate' support
@@ -57,6 +65,17 @@ def run_migrations_online() -> None:
     and associate a connection with the context.
 
     """
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        # Called from DatabaseHandler.init_database with an open connection
+        context.configure(
+            connection=connection, target_metadata=target_metadata
+        )
+
+        with context.begin_transaction():
+            context.run_migrations()
+        return
+
     connectable = engine_from_config(
         config.get_section(config.config_ini_section, {}),
         prefix="sqlalchemy.",
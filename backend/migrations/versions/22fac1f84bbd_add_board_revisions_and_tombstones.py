@@ -0,0 +1,53 @@
+"""add board revisions and tombstones
+
+Revision ID: 22fac1f84bbd
+Revises: d1b5c6b8d9cc
+Create Date: 2026-10-18 08:59:28.793547
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "22fac1f84bbd"
+down_revision: str | Sequence[str] | None = "d1b5c6b8d9cc"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in ("boards", "categories", "notes"):
+        op.add_column(
+            table,
+            sa.Column(
+                "revision", sa.Integer(), nullable=False, server_default="0"
+            ),
+        )
+
+    op.create_table(
+        "tombstones",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column(
+            "board_id",
+            sa.Integer(),
+            sa.ForeignKey("boards.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("entity", sa.String(16), nullable=False),
+        sa.Column("entity_id", sa.Integer(), nullable=False),
+        sa.Column("revision", sa.Integer(), nullable=False),
+        sqlite_autoincrement=True,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("tombstones")
+
+    for table in ("notes", "categories", "boards"):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column("revision")
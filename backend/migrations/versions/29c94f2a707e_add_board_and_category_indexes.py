@@ -0,0 +1,33 @@
+"""add board and category indexes
+
+Revision ID: 29c94f2a707e
+Revises: c84d05265ec1
+Create Date: 2026-10-18 12:03:51.620418
+
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "29c94f2a707e"
+down_revision: str | Sequence[str] | None = "c84d05265ec1"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        "ix_notes_board_id_category", "notes", ["board_id", "category"]
+    )
+    op.create_index("ix_notes_category", "notes", ["category"])
+    op.create_index("ix_categories_board_id", "categories", ["board_id"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_categories_board_id", table_name="categories")
+    op.drop_index("ix_notes_category", table_name="notes")
+    op.drop_index("ix_notes_board_id_category", table_name="notes")
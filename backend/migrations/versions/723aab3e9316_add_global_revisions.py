@@ -0,0 +1,34 @@
+"""add global revisions
+
+Revision ID: 723aab3e9316
+Revises: 22fac1f84bbd
+Create Date: 2026-10-18 09:04:27.522507
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "723aab3e9316"
+down_revision: str | Sequence[str] | None = "22fac1f84bbd"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "revisions",
+        sa.Column("name", sa.String(16), primary_key=True),
+        sa.Column(
+            "revision", sa.Integer(), nullable=False, server_default="0"
+        ),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("revisions")
@@ -0,0 +1,33 @@
+"""seed global revisions
+
+Revision ID: 778a43ee75b0
+Revises: c6db8af3bd22
+Create Date: 2026-10-18 10:12:16.229988
+
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "778a43ee75b0"
+down_revision: str | Sequence[str] | None = "c6db8af3bd22"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+REVISION_NAMES = ("boards", "settings")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for name in REVISION_NAMES:
+        op.execute(
+            f"INSERT INTO revisions (name, revision) SELECT '{name}', 0 "
+            f"WHERE NOT EXISTS (SELECT 1 FROM revisions WHERE name = '{name}')"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # The rows are also created by the first bump, so they are kept
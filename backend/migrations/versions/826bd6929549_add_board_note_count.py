@@ -0,0 +1,38 @@
+"""add board note count
+
+Revision ID: 826bd6929549
+Revises: 29c94f2a707e
+Create Date: 2026-10-18 12:41:07.208113
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "826bd6929549"
+down_revision: str | Sequence[str] | None = "29c94f2a707e"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "boards",
+        sa.Column(
+            "note_count", sa.Integer(), nullable=False, server_default="0"
+        ),
+    )
+    op.execute(
+        "UPDATE boards SET note_count = "
+        "(SELECT count(*) FROM notes WHERE notes.board_id = boards.id)"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table("boards") as batch_op:
+        batch_op.drop_column("note_count")
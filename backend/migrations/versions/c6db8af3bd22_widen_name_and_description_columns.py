@@ -0,0 +1,51 @@
+"""widen name and description columns
+
+Revision ID: c6db8af3bd22
+Revises: f85b059e7e92
+Create Date: 2026-10-18 10:09:31.362615
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c6db8af3bd22"
+down_revision: str | Sequence[str] | None = "f85b059e7e92"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+COLUMNS = (
+    ("boards", "name"),
+    ("categories", "name"),
+    ("notes", "description"),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # SQLite does not enforce the length of VARCHAR columns, and changing
+    # the type there copies the tables, whose drop would run the ON
+    # DELETE cascades of the notes.
+    if op.get_bind().dialect.name == "sqlite":
+        return
+    for table, column in COLUMNS:
+        op.alter_column(
+            table, column, type_=sa.Text(), existing_type=sa.String(30)
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == "sqlite":
+        return
+    for table, column in COLUMNS:
+        op.alter_column(
+            table,
+            column,
+            type_=sa.String(30),
+            existing_type=sa.Text(),
+            postgresql_using=f"left({column}, 30)",
+        )
@@ -0,0 +1,32 @@
+"""add checksums
+
+Revision ID: c84d05265ec1
+Revises: 723aab3e9316
+Create Date: 2026-10-18 11:12:40.315274
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c84d05265ec1"
+down_revision: str | Sequence[str] | None = "723aab3e9316"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "checksums",
+        sa.Column("name", sa.String(16), primary_key=True),
+        sa.Column("checksum", sa.String(64), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("checksums")
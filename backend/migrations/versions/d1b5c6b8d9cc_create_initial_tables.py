@@ -0,0 +1,75 @@
+"""create initial tables
+
+Revision ID: d1b5c6b8d9cc
+Revises:
+Create Date: 2026-10-18 10:10:33.791976
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "d1b5c6b8d9cc"
+down_revision: str | Sequence[str] | None = None
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The tables as they were before migrations were introduced, databases
+    # created back then are stamped with this revision instead.
+    op.create_table(
+        "boards",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("name", sa.String(30), nullable=False),
+        sqlite_autoincrement=True,
+    )
+    op.create_table(
+        "categories",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("name", sa.String(30), nullable=False),
+        sa.Column(
+            "board_id",
+            sa.Integer(),
+            sa.ForeignKey("boards.id"),
+            nullable=False,
+        ),
+        sqlite_autoincrement=True,
+    )
+    op.create_table(
+        "notes",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("description", sa.String(30), nullable=False),
+        sa.Column(
+            "category",
+            sa.Integer(),
+            sa.ForeignKey("categories.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("tags", sa.JSON(), nullable=False),
+        sa.Column(
+            "board_id",
+            sa.Integer(),
+            sa.ForeignKey("boards.id"),
+            nullable=False,
+        ),
+        sqlite_autoincrement=True,
+    )
+    op.create_table(
+        "settings",
+        sa.Column("setting_name", sa.String(), primary_key=True),
+        sa.Column("setting_value", sa.String(64), nullable=False),
+        sa.Column("setting_type", sa.String(16), nullable=False),
+        sa.Column("setting_display_name", sa.String(32), nullable=False),
+        sa.Column("setting_description", sa.String(128), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in ("settings", "notes", "categories", "boards"):
+        op.drop_table(table)
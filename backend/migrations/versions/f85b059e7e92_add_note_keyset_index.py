@@ -0,0 +1,27 @@
+"""add note keyset index
+
+Revision ID: f85b059e7e92
+Revises: 826bd6929549
+Create Date: 2026-10-18 13:15:44.902561
+
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "f85b059e7e92"
+down_revision: str | Sequence[str] | None = "826bd6929549"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index("ix_notes_board_id_id", "notes", ["board_id", "id"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_notes_board_id_id", table_name="notes")
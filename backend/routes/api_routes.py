@@ -16,27 +16,78 @@ import json
 from datetime import datetime
 
 from flask import Response, request, send_from_directory
-from flask_restx import Namespace, Resource, fields, reqparse
+from flask_restx import Namespace, Resource, fields, inputs, reqparse
 from werkzeug.exceptions import NotFound
+from werkzeug.http import quote_etag
 
+from custom_types.api_response import ApiResponse
+from services.exporters import EXPORT_FORMATS, buffered
+from services.importers import IMPORT_FORMATS, InvalidImport, spooled_import
 from services.services import (
     add_board,
     add_category,
     add_note,
+    add_notes,
     get_board_name_from_id,
+    get_board_revision,
+    get_board_snapshot,
     get_boards,
+    get_boards_revision,
     get_categories,
+    get_note_changes,
     get_notes,
     get_notes_for_export,
     get_settings,
+    get_settings_revision,
+    get_stats,
+    import_board,
+    iter_export_rows,
+    listen_board_events,
     modify_note_category,
     modify_note_tags,
+    modify_notes,
     modify_setting,
     remove_board,
     remove_category,
     remove_note,
 )
 
+
+def not_modified(etag: str) -> Response | None:
+    """Return a 304 response if the client already has the given ETag"""
+    if not request.if_none_match.contains(etag):
+        return None
+
+    response = Response(status=304)
+    response.set_etag(etag)
+    return response
+
+
+def with_etag(resp: ApiResponse, etag: str | None):
+    """Return a service response with its ETag header, if it has one"""
+    if etag is None:
+        return resp.response, resp.status_code
+    return resp.response, resp.status_code, {"ETag": quote_etag(etag)}
+
+
+MAX_PAGE_SIZE = 500
+MAX_BULK_SIZE = 500
+
+
+def add_page_arguments(parser: reqparse.RequestParser):
+    """Add the limit and cursor arguments of a keyset paginated listing"""
+    parser.add_argument("limit", type=inputs.int_range(1, MAX_PAGE_SIZE))
+    parser.add_argument("cursor", type=inputs.natural)
+
+
+def board_etag(resource: str, board_id: int) -> str | None:
+    """Return the ETag of a board resource from the board revision"""
+    revision = get_board_revision(board_id)
+    if revision is None:
+        return None
+    return f"{resource}-{board_id}-{revision}"
+
+
 boards_ns = Namespace("boards", description="Board related operations")
 
 board_model = boards_ns.model("Board", {"name": fields.String(required=True)})
@@ -47,9 +98,19 @@ class Boards(Resource):
     """All boards related endpoints"""
 
     def get(self):
-        """Get all boards"""
-        resp = get_boards()
-        return resp.response, resp.status_code
+        """Get all boards
+
+        With a limit, a page of boards ordered by id is returned together
+        with the cursor of the next page.
+        """
+        parser = reqparse.RequestParser()
+        add_page_arguments(parser)
+        args = parser.parse_args()
+        etag = f"boards-{get_boards_revision()}"
+        if cached := not_modified(etag):
+            return cached
+
+        return with_etag(get_boards(args["limit"], args["cursor"]), etag)
 
     @boards_ns.expect(board_model)
     def post(self):
@@ -72,20 +133,40 @@ class BoardsExport(Resource):
     """Export a board"""
 
     def get(self):
-        """Get and serve for export all notes from a board"""
+        """Get and serve for export all notes from a board
+
+        Every format except buffered JSON is rendered while the notes are
+        read, so the response is streamed to the client.
+        """
         parser = reqparse.RequestParser()
         parser.add_argument("board_id", type=int)
+        parser.add_argument("stream", type=inputs.boolean, default=False)
+        parser.add_argument(
+            "format", choices=tuple(EXPORT_FORMATS), default="json"
+        )
         args = parser.parse_args()
-        result = get_notes_for_export(args["board_id"])
-        export_data = json.dumps(result, indent=2)
+        export_format = EXPORT_FORMATS[args["format"]]
+        board_name = get_board_name_from_id(args["board_id"])
+        if not board_name:
+            return {"status": "Board not found"}, 404
+
+        if args["format"] == "json" and not args["stream"]:
+            result = get_notes_for_export(args["board_id"])
+            export_data = json.dumps(result, indent=2).encode("utf-8")
+        else:
+            export_data = buffered(
+                export_format.render(
+                    board_name, iter_export_rows(args["board_id"])
+                )
+            )
+
         response = Response(
-            export_data.encode("utf-8"),
-            mimetype="application/json",
+            export_data,
+            mimetype=export_format.mimetype,
             status=200,
         )
         timestamp = datetime.now().strftime("%Y_%m_%d_%H_%M_%S")
-        board_name = get_board_name_from_id(args["board_id"])
-        filename = f"export_{timestamp}_{board_name}.json"
+        filename = f"export_{timestamp}_{board_name}.{export_format.extension}"
 
         response.headers["Content-Disposition"] = (
             f"attachment; filename={filename}"
@@ -93,6 +174,71 @@ class BoardsExport(Resource):
         return response
 
 
+@boards_ns.route("/import")
+class BoardsImport(Resource):
+    """Import a board"""
+
+    def post(self):
+        """Create a board from an export
+
+        Send the export JSON as application/json, or the NDJSON export as
+        application/x-ndjson. The upload is received and validated before
+        the board is written.
+        """
+        parse = IMPORT_FORMATS.get(request.mimetype)
+        if parse is None:
+            return {
+                "status": f"Unsupported import type {request.mimetype}"
+            }, 415
+
+        try:
+            with spooled_import(parse, request.stream) as (board_name, rows):
+                resp = import_board(board_name, rows)
+        except InvalidImport as e:
+            return {"status": str(e)}, 400
+        return resp.response, resp.status_code
+
+
+@boards_ns.route("/<int:board_id>/snapshot")
+class BoardSnapshot(Resource):
+    """Snapshot of a board"""
+
+    def get(self, board_id):
+        """Get the board with its categories, their note counts and its
+        notes in one response"""
+        etag = board_etag("snapshot", board_id)
+        if etag is None:
+            return {"status": "Board not found"}, 404
+        if cached := not_modified(etag):
+            return cached
+
+        resp = get_board_snapshot(board_id)
+        if resp.status_code != 200:
+            return resp.response, resp.status_code
+        # Stamp with the revision the snapshot was read at, in case the
+        # board changed after the ETag was checked
+        revision = resp.response["board"]["revision"]
+        return with_etag(resp, f"snapshot-{board_id}-{revision}")
+
+
+@boards_ns.route("/<int:board_id>/events")
+class BoardEvents(Resource):
+    """Live events of a board"""
+
+    def get(self, board_id):
+        """Stream the note and category changes of a board as
+        Server-Sent Events"""
+        if not get_board_name_from_id(board_id):
+            return {"status": "Board not found"}, 404
+
+        response = Response(
+            listen_board_events(board_id), mimetype="text/event-stream"
+        )
+        response.headers["Cache-Control"] = "no-cache"
+        response.headers["X-Accel-Buffering"] = "no"
+        return response
+
+
 notes_ns = Namespace("notes", description="Note related operations")
 
 note_model = notes_ns.model(
@@ -110,6 +256,17 @@ category_model = notes_ns.model(
     {"category": fields.Integer(required=True, description="New category")},
 )
 
+note_change_model = notes_ns.model(
+    "NoteChange",
+    {
+        "id": fields.Integer(required=True),
+        "category": fields.Integer(required=False, description="New category"),
+        "tags": fields.List(
+            fields.String, required=False, description="New tags"
+        ),
+    },
+)
+
 tags_model = notes_ns.model(
     "TagsUpdate",
     {
@@ -125,12 +282,27 @@ class Notes(Resource):
     """All notes related endpoints"""
 
     def get(self):
-        """Get notes for a given board"""
+        """Get notes for a given board, or only those changed since a
+        given board revision
+
+        With a limit, a page of notes ordered by id is returned together
+        with the cursor of the next page. Changes since a revision are
+        never paginated.
+        """
         parser = reqparse.RequestParser()
         parser.add_argument("board_id", type=int)
+        parser.add_argument("since", type=int)
+        add_page_arguments(parser)
         args = parser.parse_args()
-        resp = get_notes(args["board_id"])
-        return resp.response, resp.status_code
+        etag = board_etag("notes", args["board_id"])
+        if etag and (cached := not_modified(etag)):
+            return cached
+
+        if args["since"] is not None:
+            resp = get_note_changes(args["board_id"], args["since"])
+        else:
+            resp = get_notes(args["board_id"], args["limit"], args["cursor"])
+        return with_etag(resp, etag)
 
     @notes_ns.expect(note_model)
     def post(self):
@@ -153,6 +325,39 @@ class Notes(Resource):
         return resp.response, resp.status_code
 
 
+@notes_ns.route("/bulk")
+class NotesBulk(Resource):
+    """Bulk note endpoints"""
+
+    @notes_ns.expect([note_model], validate=True)
+    def post(self):
+        """Add several notes in one transaction and return their ids"""
+        data = request.get_json()
+        if not isinstance(data, list) or not 1 <= len(data) <= MAX_BULK_SIZE:
+            return {
+                "status": f"Expected a list of 1 to {MAX_BULK_SIZE} notes"
+            }, 400
+
+        resp = add_notes(data)
+        return resp.response, resp.status_code
+
+    @notes_ns.expect([note_change_model], validate=True)
+    def patch(self):
+        """Change the category or tags of several notes in one transaction
+
+        Every change gets its own status, the valid ones are applied even
+        if others fail.
+        """
+        data = request.get_json()
+        if not isinstance(data, list) or not 1 <= len(data) <= MAX_BULK_SIZE:
+            return {
+                "status": f"Expected a list of 1 to {MAX_BULK_SIZE} changes"
+            }, 400
+
+        resp = modify_notes(data)
+        return resp.response, resp.status_code
+
+
 @notes_ns.route("/<int:note_id>/category")
 class NoteCategoryResource(Resource):
     """Modify a note category"""
@@ -204,8 +409,11 @@ class Categories(Resource):
         parser = reqparse.RequestParser()
         parser.add_argument("board_id", type=int)
         args = parser.parse_args()
-        resp = get_categories(args["board_id"])
-        return resp.response, resp.status_code
+        etag = board_etag("categories", args["board_id"])
+        if etag and (cached := not_modified(etag)):
+            return cached
+
+        return with_etag(get_categories(args["board_id"]), etag)
 
     @notes_ns.expect(category_model)
     def post(self):
@@ -217,7 +425,7 @@ class Categories(Resource):
     def delete(self):
         """Delete a category by id"""
         parser = reqparse.RequestParser()
-        parser.add_argument("category_id")
+        parser.add_argument("category_id", type=int, required=True)
         args = parser.parse_args()
         resp = remove_category(args["category_id"])
         return resp.response, resp.status_code
@@ -240,8 +448,11 @@ class Settings(Resource):
 
     def get(self):
         """Get all settings"""
-        resp = get_settings()
-        return resp.response, resp.status_code
+        etag = f"settings-{get_settings_revision()}"
+        if cached := not_modified(etag):
+            return cached
+
+        return with_etag(get_settings(), etag)
 
 
 @settings_ns.route("/<string:setting_name>")
@@ -257,6 +468,19 @@ class ModifyStringSetting(Resource):
         return resp.response, resp.status_code
 
 
+internal_ns = Namespace("internal", description="Internal diagnostics")
+
+
+@internal_ns.route("/stats", doc=False)
+class Stats(Resource):
+    """Internal counters of the serving worker"""
+
+    def get(self):
+        """Get the connection pool counters of this worker"""
+        resp = get_stats()
+        return resp.response, resp.status_code
+
+
 def register_static_routes(app):
     """Register static routes for serving static files"""
 
@@ -0,0 +1,157 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""In-memory read model of a board"""
+
+from collections import Counter
+from collections.abc import Iterable
+from dataclasses import dataclass, replace
+from functools import cached_property
+
+
+@dataclass(frozen=True)
+class BoardState:
+    """Categories and notes of a board at one revision
+
+    Notes are kept by id as (revision, description, category, tags)
+    tuples in id order. A state is never changed, applying a board event
+    returns a new one, so readers can keep using the state they got.
+    Notes deleted after the state was loaded are kept as (revision, id)
+    pairs, so the changes since any revision from the loaded one on can
+    be answered from memory.
+    """
+
+    id: int
+    name: str
+    revision: int
+    loaded: int
+    categories: dict[int, str]
+    notes: dict[int, tuple[int, str, int, list[str]]]
+    deleted: tuple[tuple[int, int], ...] = ()
+
+    @cached_property
+    def notes_json(self) -> list[dict]:
+        """Return the API representation of the notes"""
+        return [
+            {
+                "id": note_id,
+                "description": description,
+                "category": category,
+                "tags": tags,
+            }
+            for note_id, (_, description, category, tags) in self.notes.items()
+        ]
+
+    @cached_property
+    def categories_json(self) -> list[dict]:
+        """Return the API representation of the categories"""
+        return [
+            {"id": category_id, "name": name}
+            for category_id, name in self.categories.items()
+        ]
+
+    def snapshot(self) -> dict:
+        """Return the board, its categories with note counts and notes"""
+        note_counts = Counter(note[2] for note in self.notes.values())
+        return {
+            "board": {
+                "id": self.id,
+                "name": self.name,
+                "revision": self.revision,
+                "note_count": len(self.notes),
+            },
+            "categories": [
+                {**category, "note_count": note_counts[category["id"]]}
+                for category in self.categories_json
+            ],
+            "notes": self.notes_json,
+        }
+
+    def changes_since(self, since: int) -> dict | None:
+        """Return the notes changed after a revision, or None if it is
+        older than the state and the changes are not known"""
+        if since < self.loaded:
+            return None
+        return {
+            "revision": self.revision,
+            "notes": [
+                note
+                for note, (revision, *_) in zip(
+                    self.notes_json, self.notes.values()
+                )
+                if revision > since
+            ],
+            "deleted": [
+                note_id
+                for revision, note_id in self.deleted
+                if revision > since
+            ],
+        }
+
+    def apply(self, name: str, event: dict) -> "BoardState":
+        """Return the state after a committed board event"""
+        revision = event["revision"]
+        if name in ("note_added", "note_modified"):
+            return self.with_notes(revision, [event["note"]])
+        if name in ("notes_added", "notes_modified"):
+            return self.with_notes(revision, event["notes"])
+        if name == "note_removed":
+            return self.without_notes(revision, [event["id"]])
+        if name == "category_added":
+            categories = dict(self.categories)
+            categories[event["category"]["id"]] = event["category"]["name"]
+            return replace(self, revision=revision, categories=categories)
+        if name == "category_removed":
+            categories = dict(self.categories)
+            categories.pop(event["id"], None)
+            removed = [
+                note_id
+                for note_id, note in self.notes.items()
+                if note[2] == event["id"]
+            ]
+            return replace(
+                self.without_notes(revision, removed), categories=categories
+            )
+        raise ValueError(f"Unknown board event {name}")
+
+    def with_notes(self, revision: int, notes: Iterable[dict]) -> "BoardState":
+        """Return the state with notes added or replaced"""
+        merged = dict(self.notes)
+        for note in notes:
+            merged[note["id"]] = (
+                revision,
+                note["description"],
+                note["category"],
+                note["tags"],
+            )
+        # Added notes have the highest ids, so the ids stay in order
+        # unless an id was reused after the last note was removed.
+        if list(merged) != sorted(merged):
+            merged = dict(sorted(merged.items()))
+        return replace(self, revision=revision, notes=merged)
+
+    def without_notes(
+        self, revision: int, note_ids: Iterable[int]
+    ) -> "BoardState":
+        """Return the state with notes removed"""
+        note_ids = set(note_ids)
+        return replace(
+            self,
+            revision=revision,
+            notes={
+                note_id: note
+                for note_id, note in self.notes.items()
+                if note_id not in note_ids
+            },
+            deleted=self.deleted
+            + tuple((revision, note_id) for note_id in sorted(note_ids)),
+        )
@@ -0,0 +1,283 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Process-local caches"""
+
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from typing import Any
+
+
+class RevisionCache:
+    """Process-local copy of data guarded by a stored revision stamp
+
+    The stored revision is compared with the cached one at most once per
+    ttl seconds and the data is only reloaded when they differ. Writes of
+    this process are applied to the copy right away, writes of other
+    workers are picked up within ttl seconds. The data is loaded outside
+    the lock, so a slow load does not hold up the readers of the copy.
+    """
+
+    def __init__(
+        self,
+        load_revision: Callable[[], int],
+        load: Callable[[], Any],
+        ttl: float,
+    ):
+        self.load_revision = load_revision
+        self.load = load
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._revision = 0
+        self._value = None
+        self._expires = 0.0
+        # Bumped by every write through and invalidation, so data loaded
+        # before one of them is not kept after it.
+        self._generation = 0
+
+    def get(self) -> tuple[int, Any]:
+        """Return the cached revision and data, reloading them if stale"""
+        with self._lock:
+            if self._loaded and time.monotonic() < self._expires:
+                return self._revision, self._value
+
+        # The revision is read before the data, so the data is never older
+        # than the revision it is stored under.
+        revision = self.load_revision()
+        with self._lock:
+            if self._loaded and revision == self._revision:
+                self._expires = time.monotonic() + self.ttl
+                return self._revision, self._value
+            generation = self._generation
+
+        value = self.load()
+        with self._lock:
+            if generation == self._generation:
+                self._value = value
+                self._revision = revision
+                self._loaded = True
+                self._expires = time.monotonic() + self.ttl
+        return revision, value
+
+    def write_through(self, revision: int, update: Callable[[Any], Any]):
+        """Apply a committed write which moved the stored revision
+
+        The update function receives the cached data and returns the new
+        data, it must not modify the cached data in place. If another
+        worker wrote in between, the copy is dropped instead.
+        """
+        with self._lock:
+            self._generation += 1
+            if self._loaded and revision == self._revision + 1:
+                self._value = update(self._value)
+                self._revision = revision
+            else:
+                self._loaded = False
+                self._value = None
+
+    def invalidate(self):
+        """Drop the cached data so the next read reloads it"""
+        with self._lock:
+            self._generation += 1
+            self._loaded = False
+            self._value = None
+
+
+class LRURevisionCache:
+    """Process-local copies of data by key, each guarded by the stored
+    revision of its key
+
+    Like RevisionCache for every key, with at most size keys kept. The
+    least recently read key is dropped first, and keys not read for idle
+    seconds are dropped as well. A size of 0 disables the cache, get then
+    always returns None. Data is loaded outside the lock, so loading one
+    key does not hold up the readers of the others.
+    """
+
+    def __init__(
+        self,
+        load_revision: Callable[[Hashable], int | None],
+        load: Callable[[Hashable], Any],
+        size: int,
+        ttl: float,
+        idle: float,
+    ):
+        self.load_revision = load_revision
+        self.load = load
+        self.size = size
+        self.ttl = ttl
+        self.idle = idle
+        self._lock = threading.Lock()
+        # key -> [revision, value, expires, last read]
+        self._entries: OrderedDict[Hashable, list] = OrderedDict()
+        # Bumped by every write through and invalidation, so data loaded
+        # before one of them is not kept after it.
+        self._generation = 0
+
+    def get(self, key: Hashable, seen: int | None = None) -> Any | None:
+        """Return the cached data of a key, reloading it if stale
+
+        Returns None if the key has no stored revision. A caller which has
+        already seen the cached revision passes it as seen, the stored one
+        is then checked right away, as the caller is waiting for a newer
+        one which may come from another worker.
+        """
+        if not self.size:
+            return None
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if (
+                entry is not None
+                and now < entry[2]
+                and (seen is None or seen < entry[0])
+            ):
+                entry[3] = now
+                self._entries.move_to_end(key)
+                return entry[1]
+
+        # The revision is read before the data, so the data is never older
+        # than the revision it is stored under.
+        revision = self.load_revision(key)
+        with self._lock:
+            if revision is None:
+                self._entries.pop(key, None)
+                return None
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == revision:
+                return self._touch(key, entry, now)
+            generation = self._generation
+
+        value = self.load(key)
+        with self._lock:
+            if generation != self._generation:
+                return value
+            # Another reader may have stored the same or a newer revision
+            # while this one was loading.
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < revision:
+                entry = [revision, value, 0.0, 0.0]
+                self._entries[key] = entry
+            return self._touch(key, entry, now)
+
+    def write_through(
+        self, key: Hashable, revision: int, update: Callable[[Any], Any]
+    ):
+        """Apply a committed write which moved the stored revision of a key
+
+        The update function receives the cached data and returns the new
+        data, it must not modify the cached data in place. If another
+        worker wrote in between, the copy is dropped instead.
+        """
+        with self._lock:
+            self._generation += 1
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            if revision == entry[0] + 1:
+                entry[0] = revision
+                entry[1] = update(entry[1])
+            else:
+                del self._entries[key]
+
+    def invalidate(self, key: Hashable | None = None):
+        """Drop the cached data of a key, or of all keys"""
+        with self._lock:
+            self._generation += 1
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def _touch(self, key: Hashable, entry: list, now: float) -> Any:
+        """Mark an entry as read now and return its data, the lock must be
+        held"""
+        entry[2] = now + self.ttl
+        entry[3] = now
+        self._entries.move_to_end(key)
+        self._evict(now)
+        return entry[1]
+
+    def _evict(self, now: float):
+        """Drop the keys over the size and those idle for too long"""
+        while len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if now - entry[3] < self.idle:
+                break
+            del self._entries[key]
+
+
+class LRUCache:
+    """Process-local memo of values by key, bounded to size keys
+
+    A missing key is loaded and kept only if the loader found a value, so
+    a key created later, by any worker, is seen right away. The least
+    recently used key is dropped first. Hits and misses are counted for
+    monitoring. A size of 0 disables it, every get then loads.
+    """
+
+    def __init__(self, load: Callable[[Hashable], Any | None], size: int):
+        self.load = load
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._values: OrderedDict[Hashable, Any] = OrderedDict()
+        # Bumped by every invalidation, so a value loaded before it is not
+        # kept after it.
+        self._generation = 0
+
+    def get(self, key: Hashable) -> Any | None:
+        """Return the value of a key, loading it on a miss"""
+        with self._lock:
+            if key in self._values:
+                self.hits += 1
+                self._values.move_to_end(key)
+                return self._values[key]
+            self.misses += 1
+            generation = self._generation
+
+        value = self.load(key)
+        if value is not None and self.size:
+            with self._lock:
+                if generation != self._generation:
+                    return value
+                self._values[key] = value
+                self._values.move_to_end(key)
+                while len(self._values) > self.size:
+                    self._values.popitem(last=False)
+        return value
+
+    def invalidate(self, key: Hashable | None = None):
+        """Drop the value of a key, or of all keys"""
+        with self._lock:
+            self._generation += 1
+            if key is None:
+                self._values.clear()
+            else:
+                self._values.pop(key, None)
+
+    def stats(self) -> dict:
+        """Return the hit and miss counters and the number of keys"""
+        with self._lock:
+            return {
+                "size": len(self._values),
+                "max_size": self.size,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
@@ -0,0 +1,337 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Live board events"""
+
+import json
+import logging
+import queue
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Iterator
+from typing import Any
+
+from sqlalchemy import (
+    Column,
+    Float,
+    Integer,
+    MetaData,
+    Table,
+    Text,
+    create_engine,
+    delete,
+    func,
+    insert,
+    select,
+)
+
+HEARTBEAT_INTERVAL = 15
+SUBSCRIBER_QUEUE_SIZE = 256
+RECONNECT_INTERVAL = 1
+MAX_RECONNECT_INTERVAL = 60
+
+logger = logging.getLogger(__name__)
+
+events_table = Table(
+    "events",
+    MetaData(),
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("board_id", Integer, nullable=False),
+    Column("message", Text, nullable=False),
+    Column("created", Float, nullable=False),
+    sqlite_autoincrement=True,
+)
+
+
+def format_event(event: str, data: dict[str, Any]) -> str:
+    """Format a board event as a Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class EventBroker:
+    """In-process publish/subscribe fan-out of board events
+
+    Every published event is formatted once and the same message is handed
+    to each subscriber of the board, so the cost of an event does not grow
+    with the number of watchers.
+    """
+
+    def __init__(self):
+        self._subscribers: dict[int, set[queue.Queue]] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, board_id: int) -> queue.Queue:
+        """Register a new subscriber queue for the events of a board"""
+        subscription = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers.setdefault(board_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, board_id: int, subscription: queue.Queue):
+        """Remove a subscriber queue of a board"""
+        with self._lock:
+            subscribers = self._subscribers.get(board_id, set())
+            subscribers.discard(subscription)
+            if not subscribers:
+                self._subscribers.pop(board_id, None)
+
+    def publish(self, board_id: int, event: str, data: dict[str, Any]):
+        """Send an event to every subscriber of a board"""
+        with self._lock:
+            if board_id not in self._subscribers:
+                return
+
+        self.deliver(board_id, format_event(event, data))
+
+    def deliver(self, board_id: int, message: str):
+        """Hand a formatted event to the subscribers of this process
+
+        Subscribers whose queue is full are too slow to keep up, their
+        pending events are replaced by a single resync event telling the
+        client to catch up with a delta fetch instead.
+        """
+        with self._lock:
+            subscribers = list(self._subscribers.get(board_id, ()))
+
+        for subscription in subscribers:
+            try:
+                subscription.put_nowait(message)
+            except queue.Full:
+                self._resync(subscription)
+
+    @staticmethod
+    def _resync(subscription: queue.Queue):
+        """Replace the pending events of a subscriber with a resync event"""
+        try:
+            while True:
+                subscription.get_nowait()
+        except queue.Empty:
+            pass
+        subscription.put_nowait(format_event("resync", {}))
+
+    def listen(
+        self, board_id: int, heartbeat: float = HEARTBEAT_INTERVAL
+    ) -> Iterator[str]:
+        """Yield the Server-Sent Events messages of a board
+
+        A comment is sent when the board is idle for the heartbeat interval
+        so proxies keep the connection open and closed clients are noticed.
+        """
+        subscription = self.subscribe(board_id)
+        try:
+            yield ": connected\n\n"
+            while True:
+                try:
+                    yield subscription.get(timeout=heartbeat)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+        finally:
+            self.unsubscribe(board_id, subscription)
+
+
+class RemoteEventBroker(EventBroker, ABC):
+    """Base class of brokers sharing events between worker processes
+
+    Published events are formatted once and written to a shared transport.
+    A background thread of every process reads them back, its own events
+    included, and delivers them to the local subscribers. It is started by
+    the first subscriber, as only events published after it are delivered.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._listener: threading.Thread | None = None
+        self._closed = threading.Event()
+
+    def subscribe(self, board_id: int) -> queue.Queue:
+        """Register a new subscriber queue and start the listener thread"""
+        with self._lock:
+            if self._listener is None:
+                self.prepare_listener()
+                self._listener = threading.Thread(
+                    target=self._listen, daemon=True
+                )
+                self._listener.start()
+        return super().subscribe(board_id)
+
+    def publish(self, board_id: int, event: str, data: dict[str, Any]):
+        """Send an event to the subscribers of a board in every process"""
+        self.send(board_id, format_event(event, data))
+
+    @abstractmethod
+    def send(self, board_id: int, message: str):
+        """Write a formatted event to the shared transport"""
+
+    @abstractmethod
+    def receive(self):
+        """Block and deliver events from the shared transport"""
+
+    def prepare_listener(self):
+        """Mark the point from which the listener delivers events, called
+        once before the listener thread starts"""
+
+    def close(self):
+        """Stop the listener once its transport returns or fails"""
+        self._closed.set()
+
+    def _listen(self):
+        """Receive events until the broker is closed, reconnecting on errors
+
+        The wait before reconnecting doubles with every failure in a row,
+        up to MAX_RECONNECT_INTERVAL, and starts over once a connection
+        lasted longer than the wait before it.
+        """
+        interval = RECONNECT_INTERVAL
+        while not self._closed.is_set():
+            started = time.monotonic()
+            try:
+                self.receive()
+            except Exception:
+                if time.monotonic() - started > interval:
+                    interval = RECONNECT_INTERVAL
+                logger.exception(
+                    "Receiving board events failed, reconnecting in %s s",
+                    interval,
+                )
+                self._closed.wait(interval)
+                interval = min(interval * 2, MAX_RECONNECT_INTERVAL)
+
+
+class SQLiteEventBroker(RemoteEventBroker):
+    """Broker sharing events between processes on one host
+
+    Events are appended to a table of a separate SQLite database, which
+    every process polls for rows newer than the last one it delivered.
+    The table is created on the first send or subscribe, so building the
+    broker does not touch its database.
+    """
+
+    def __init__(
+        self,
+        db_url: str,
+        poll_interval: float = 0.25,
+        retention: float = 60,
+    ):
+        super().__init__()
+        self.engine = create_engine(db_url)
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self._last_id = 0
+        self._table_lock = threading.Lock()
+        self._table_created = False
+
+    def _create_table(self):
+        """Create the events table once"""
+        with self._table_lock:
+            if not self._table_created:
+                events_table.metadata.create_all(self.engine)
+                self._table_created = True
+
+    def prepare_listener(self):
+        """Skip the events appended before the first subscriber"""
+        self._create_table()
+        with self.engine.connect() as connection:
+            self._last_id = (
+                connection.scalar(select(func.max(events_table.c.id))) or 0
+            )
+
+    def send(self, board_id: int, message: str):
+        """Append a formatted event and drop expired ones"""
+        self._create_table()
+        now = time.time()
+        with self.engine.begin() as connection:
+            connection.execute(
+                insert(events_table).values(
+                    board_id=board_id, message=message, created=now
+                )
+            )
+            connection.execute(
+                delete(events_table).where(
+                    events_table.c.created < now - self.retention
+                )
+            )
+
+    def poll(self):
+        """Deliver the events appended since the last poll"""
+        with self.engine.connect() as connection:
+            rows = connection.execute(
+                select(
+                    events_table.c.id,
+                    events_table.c.board_id,
+                    events_table.c.message,
+                )
+                .where(events_table.c.id > self._last_id)
+                .order_by(events_table.c.id)
+            ).all()
+
+        for event_id, board_id, message in rows:
+            self._last_id = event_id
+            self.deliver(board_id, message)
+
+    def receive(self):
+        """Poll for new events until the broker is closed"""
+        while not self._closed.is_set():
+            self.poll()
+            self._closed.wait(self.poll_interval)
+
+
+class RedisEventBroker(RemoteEventBroker):
+    """Broker sharing events between processes and hosts through Redis
+
+    Any client with the publish and pubsub interface of redis-py can be
+    passed in, otherwise one is created from the URL.
+    """
+
+    CHANNEL_PREFIX = "retroboard:board:"
+
+    def __init__(self, url: str | None = None, client: Any = None):
+        super().__init__()
+        if client is None:
+            import redis
+
+            client = redis.Redis.from_url(url)
+        self.client = client
+
+    def send(self, board_id: int, message: str):
+        """Publish a formatted event on the channel of its board"""
+        self.client.publish(f"{self.CHANNEL_PREFIX}{board_id}", message)
+
+    def receive(self):
+        """Deliver the events of every board channel"""
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        pubsub.psubscribe(f"{self.CHANNEL_PREFIX}*")
+        try:
+            for item in pubsub.listen():
+                if item["type"] != "pmessage":
+                    continue
+                channel, message = item["channel"], item["data"]
+                if isinstance(channel, bytes):
+                    channel = channel.decode("utf-8")
+                if isinstance(message, bytes):
+                    message = message.decode("utf-8")
+                board_id = int(channel.removeprefix(self.CHANNEL_PREFIX))
+                self.deliver(board_id, message)
+        finally:
+            pubsub.close()
+
+
+def create_broker(url: str) -> EventBroker:
+    """Create the event broker selected by its URL scheme"""
+    scheme = url.split(":", 1)[0]
+    if scheme == "memory":
+        return EventBroker()
+    if scheme.startswith("sqlite"):
+        return SQLiteEventBroker(url)
+    if scheme in ("redis", "rediss", "unix"):
+        return RedisEventBroker(url)
+    raise ValueError(f"Unsupported event broker URL: {url}")
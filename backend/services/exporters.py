@@ -0,0 +1,137 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Incremental renderers for board exports"""
+
+import csv
+import io
+import json
+import textwrap
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass
+
+CHUNK_SIZE = 64 * 1024
+
+
+def buffered(chunks: Iterable[str], size: int = CHUNK_SIZE) -> Iterator[str]:
+    """Join small text chunks into pieces of roughly the given size"""
+    buffer = []
+    buffered_size = 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        buffered_size += len(chunk)
+        if buffered_size >= size:
+            yield "".join(buffer)
+            buffer = []
+            buffered_size = 0
+    if buffer:
+        yield "".join(buffer)
+
+
+def render_json(
+    board_name: str, rows: Iterable[tuple[str, str]]
+) -> Iterator[str]:
+    """Render export rows as the indented export JSON document
+
+    The output is identical to json.dumps(export, indent=2) of the export
+    dict, but only one note is held in memory at a time.
+    """
+    yield '{\n  "board_name": ' + json.dumps(board_name) + ',\n  "notes": ['
+    separator = "\n"
+    for description, category_name in rows:
+        note = json.dumps(
+            {"description": description, "category": category_name},
+            indent=2,
+        )
+        yield separator + textwrap.indent(note, "    ")
+        separator = ",\n"
+    yield ("]" if separator == "\n" else "\n  ]") + "\n}"
+
+
+def render_ndjson(
+    board_name: str, rows: Iterable[tuple[str, str]]
+) -> Iterator[str]:
+    """Render export rows as newline delimited JSON
+
+    The first line holds the board name, every further line is one note.
+    """
+    yield json.dumps({"board_name": board_name}) + "\n"
+    for description, category_name in rows:
+        yield (
+            json.dumps({"description": description, "category": category_name})
+            + "\n"
+        )
+
+
+def render_csv(
+    _board_name: str, rows: Iterable[tuple[str, str]]
+) -> Iterator[str]:
+    """Render export rows as CSV with a description and category column"""
+    line = io.StringIO()
+    writer = csv.writer(line)
+    writer.writerow(("description", "category"))
+    for row in rows:
+        writer.writerow(row)
+        yield line.getvalue()
+        line.seek(0)
+        line.truncate()
+    yield line.getvalue()
+
+
+def _markdown_cell(text: str) -> str:
+    """Escape a note description for use in a Markdown table cell"""
+    return text.replace("|", "\\|").replace("\n", "<br>")
+
+
+def render_markdown(
+    board_name: str, rows: Iterable[tuple[str, str]]
+) -> Iterator[str]:
+    """Render export rows as a Markdown table with a column per category
+
+    The table is laid out column-wise, so the note descriptions are grouped
+    by category before the first table row can be written.
+    """
+    yield f"# {board_name}\n\n"
+
+    columns: dict[str, list[str]] = {}
+    for description, category_name in rows:
+        columns.setdefault(category_name, []).append(
+            _markdown_cell(description)
+        )
+    if not columns:
+        return
+
+    yield "| " + " | ".join(map(_markdown_cell, columns)) + " |\n"
+    yield "|-" * len(columns) + "|\n"
+    for index in range(max(len(notes) for notes in columns.values())):
+        cells = [
+            notes[index] if index < len(notes) else ""
+            for notes in columns.values()
+        ]
+        yield "| " + " | ".join(cells) + " |\n"
+
+
+@dataclass
+class ExportFormat:
+    """Export Format Dataclass describing how a format is served"""
+
+    mimetype: str
+    extension: str
+    render: Callable[[str, Iterable[tuple[str, str]]], Iterator[str]]
+
+
+EXPORT_FORMATS = {
+    "json": ExportFormat("application/json", "json", render_json),
+    "ndjson": ExportFormat("application/x-ndjson", "ndjson", render_ndjson),
+    "csv": ExportFormat("text/csv", "csv", render_csv),
+    "markdown": ExportFormat("text/markdown", "md", render_markdown),
+}
@@ -0,0 +1,114 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Parsers for board imports in the export formats"""
+
+import json
+import shutil
+import tempfile
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
+from typing import IO, Any
+
+# Uploads larger than this are spooled to a temporary file on disk
+SPOOL_MAX_SIZE = 1 << 20
+
+
+class InvalidImport(ValueError):
+    """Raised when an import is not a valid board export"""
+
+
+def _note_row(note: Any) -> tuple[str, str]:
+    """Return the description and category name of an exported note"""
+    if not isinstance(note, dict):
+        raise InvalidImport("Every note must be an object")
+    description, category_name = note.get("description"), note.get("category")
+    if not isinstance(description, str) or not isinstance(category_name, str):
+        raise InvalidImport("Every note needs a description and a category")
+    return description, category_name
+
+
+def _board_name(header: Any) -> str:
+    """Return the board name of an export"""
+    if not isinstance(header, dict) or not isinstance(
+        header.get("board_name"), str
+    ):
+        raise InvalidImport("The export has no board name")
+    return header["board_name"]
+
+
+def _loads(line: str | bytes) -> Any:
+    """Decode one JSON document of an import"""
+    try:
+        return json.loads(line)
+    except ValueError as e:
+        raise InvalidImport(f"Invalid JSON: {e}") from e
+
+
+def parse_json(stream: IO[bytes]) -> tuple[str, Iterator[tuple[str, str]]]:
+    """Parse an export JSON document
+
+    The whole document is decoded up front, use NDJSON for exports which
+    should not be held in memory.
+    """
+    export = _loads(stream.read())
+    board_name = _board_name(export)
+    notes = export.get("notes", [])
+    if not isinstance(notes, list):
+        raise InvalidImport("The notes of the export must be a list")
+    return board_name, (_note_row(note) for note in notes)
+
+
+def parse_ndjson(
+    stream: IO[bytes],
+) -> tuple[str, Iterator[tuple[str, str]]]:
+    """Parse newline delimited export JSON
+
+    Only the board name line is read up front, the notes are decoded one
+    line at a time while they are consumed.
+    """
+    lines = (line for line in stream if line.strip())
+    header = next(lines, None)
+    if header is None:
+        raise InvalidImport("The export is empty")
+    board_name = _board_name(_loads(header))
+    return board_name, (_note_row(_loads(line)) for line in lines)
+
+
+IMPORT_FORMATS: dict[
+    str, Callable[[IO[bytes]], tuple[str, Iterable[tuple[str, str]]]]
+] = {
+    "application/json": parse_json,
+    "application/x-ndjson": parse_ndjson,
+}
+
+
+@contextmanager
+def spooled_import(
+    parse: Callable[[IO[bytes]], tuple[str, Iterable[tuple[str, str]]]],
+    stream: IO[bytes],
+) -> Iterator[tuple[str, Iterable[tuple[str, str]]]]:
+    """Receive and validate a whole upload, then parse it again
+
+    The upload is copied to a temporary file, kept in memory up to
+    SPOOL_MAX_SIZE bytes, and every note is checked before the board name
+    and the rows read back from the file are yielded. So a slow or invalid
+    upload fails before the import opens its write transaction.
+    """
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE) as upload:
+        shutil.copyfileobj(stream, upload)
+        upload.seek(0)
+        _, rows = parse(upload)
+        deque(rows, maxlen=0)
+        upload.seek(0)
+        yield parse(upload)
@@ -12,65 +12,318 @@
 
 """All service operations"""
 
-from sqlalchemy import func, select
+import json
+import logging
+from bisect import bisect_right
+from collections import Counter, defaultdict
+from collections.abc import Iterable, Iterator
+from itertools import islice
+
+from sqlalchemy import (
+    ColumnElement,
+    Integer,
+    Row,
+    and_,
+    delete,
+    func,
+    insert,
+    literal,
+    or_,
+    select,
+    union_all,
+    update,
+)
 from sqlalchemy.exc import DatabaseError
+from sqlalchemy.orm import Session
 
 from custom_types.api_response import ApiResponse
-from database.database_handler import DatabaseHandler
-from database.models import Board, Category, Note, Setting
+from database.database_handler import DatabaseHandler, bump_revision
+from database.models import (
+    Board,
+    Category,
+    Note,
+    Revision,
+    Setting,
+    Tombstone,
+)
+from services.board_state import BoardState
+from services.cache import LRUCache, LRURevisionCache, RevisionCache
+from services.events import EventBroker, create_broker
+from services.importers import InvalidImport
+
+EXPORT_BATCH_SIZE = 500
+IMPORT_BATCH_SIZE = 500
+
+# Columns of the API representation of notes and settings, selected on
+# their own so reads build responses from rows instead of ORM objects.
+NOTE_COLUMNS = (Note.id, Note.description, Note.category, Note.tags)
+SETTING_COLUMNS = (
+    Setting.setting_name,
+    Setting.setting_value,
+    Setting.setting_type,
+    Setting.setting_display_name,
+    Setting.setting_description,
+)
+
+logger = logging.getLogger(__name__)
 
 db = DatabaseHandler()
-db.create_tables()
-db.sync_settings(db.get_session())
 
+broker = EventBroker()
+
+
+def init_app(flask_app):
+    """Configure the services from the config of a Flask app
+
+    Only the engine and the event broker are created, the database is not
+    touched until it is first used. Run `flask init-db` to create or
+    migrate it. Each request shares one database session between the
+    services it calls.
+    """
+    global broker
 
-def get_note_count_on_board():
-    """Return the note count from each board"""
+    db.configure(
+        flask_app.config["SQLALCHEMY_DATABASE_URI"],
+        flask_app.config["SQLITE_PRAGMAS"],
+        flask_app.config["SQLALCHEMY_ENGINE_OPTIONS"],
+    )
+    broker = create_broker(flask_app.config["EVENT_BROKER_URL"])
+    settings_cache.ttl = flask_app.config["SETTINGS_CACHE_TTL"]
+    settings_cache.invalidate()
+    board_cache.size = flask_app.config["BOARD_CACHE_SIZE"]
+    board_cache.ttl = flask_app.config["BOARD_CACHE_TTL"]
+    board_cache.idle = flask_app.config["BOARD_CACHE_IDLE"]
+    board_cache.invalidate()
+    board_names.size = flask_app.config["NAME_CACHE_SIZE"]
+    category_names.size = flask_app.config["NAME_CACHE_SIZE"]
+    invalidate_names()
+
+    @flask_app.before_request
+    def begin_request():
+        """Open the session the services share during the request"""
+        db.begin_request()
+
+    @flask_app.teardown_request
+    def end_request(exception):
+        """Close the session of the request"""
+        db.end_request(exception)
+
+
+def init_database():
+    """Create or migrate the database and add the missing settings"""
+    db.init_database()
     with db.get_session() as session:
-        counts = (
-            session.query(Note.board_id, func.count().label("board_id_count"))
-            .group_by(Note.board_id)
-            .order_by(Note.board_id)
-            .all()
+        db.sync_settings(session)
+
+
+def listen_board_events(board_id: int) -> Iterator[str]:
+    """Return the Server-Sent Events stream of a board"""
+    return broker.listen(board_id)
+
+
+def publish(board_id: int, name: str, event: dict):
+    """Apply a committed board write to the cached board and announce it"""
+    board_cache.write_through(
+        board_id, event["revision"], lambda state: state.apply(name, event)
+    )
+    announce(board_id, name, event)
+
+
+def announce(board_id: int, name: str, event: dict):
+    """Send an event to the subscribers of a board
+
+    The write behind the event is committed already, so a failing broker
+    is logged instead of failing the request. Subscribers missing the
+    event catch up through the revision of their next read.
+    """
+    try:
+        broker.publish(board_id, name, event)
+    except Exception:
+        logger.exception("Publishing %s of board %s failed", name, board_id)
+
+
+def get_stats() -> ApiResponse:
+    """Get the internal counters of this worker"""
+    return ApiResponse(
+        {
+            "pool": db.get_pool_stats(),
+            "names": {
+                "boards": board_names.stats(),
+                "categories": category_names.stats(),
+            },
+        },
+        200,
+    )
+
+
+def invalidate_names():
+    """Drop all memoized board and category names"""
+    board_names.invalidate()
+    category_names.invalidate()
+
+
+def bump_board_revision(
+    session: Session, board_id: int, notes: int = 0
+) -> int | None:
+    """Increment the revision of a board and return the new value
+
+    Must run in the same transaction as the note or category write it
+    stamps, so the revision and the change are committed together. The
+    note count of the board is moved by the number of added or removed
+    notes in the same statement. Writes moving it also bump the boards
+    revision, once after all of their board rows so that concurrent
+    writes lock the rows in the same order.
+    """
+    return session.execute(
+        update(Board)
+        .where(Board.id == board_id)
+        .values(board_revision_values(notes))
+        .returning(Board.revision)
+    ).scalar()
+
+
+def bump_owner_revision(
+    session: Session,
+    entity: type[Note | Category],
+    entity_id: int,
+    notes: int | ColumnElement = 0,
+) -> Row | None:
+    """Increment the revision of the board a note or category is on
+
+    Returns the board id and new revision, or None when the note or
+    category does not exist, without loading it. Like bump_board_revision
+    the board row is updated before the note or category it stamps.
+    """
+    owner = select(entity.board_id).where(entity.id == entity_id)
+    return session.execute(
+        update(Board)
+        .where(Board.id == owner.scalar_subquery())
+        .values(board_revision_values(notes))
+        .returning(Board.id, Board.revision)
+    ).one_or_none()
+
+
+def board_revision_values(notes: int | ColumnElement) -> dict:
+    """Return the values of a board revision bump moving the note count"""
+    values = {"revision": Board.revision + 1}
+    if isinstance(notes, ColumnElement) or notes:
+        values["note_count"] = Board.note_count + notes
+    return values
+
+
+def get_board_revision(board_id: int) -> int | None:
+    """Return the revision of a board, or None if it does not exist"""
+    if board_cache.size:
+        state = board_cache.get(board_id)
+        return None if state is None else state.revision
+
+    return load_board_revision(board_id)
+
+
+def load_board_revision(board_id: int) -> int | None:
+    """Return the stored revision of a board, or None if it does not
+    exist"""
+    with db.get_session() as session:
+        return session.scalar(
+            select(Board.revision).where(Board.id == board_id)
         )
 
-    return counts
 
+def get_boards_revision() -> int:
+    """Return a stamp which changes whenever the boards listing does
 
-def get_boards() -> ApiResponse:
-    """Return all boards"""
+    Adding or removing a board and moving the note count of one bump the
+    boards revision.
+    """
     with db.get_session() as session:
-        boards = session.query(Board).all()
+        revision = session.scalar(
+            select(Revision.revision).where(Revision.name == "boards")
+        )
 
-    counts = get_note_count_on_board()
+    return revision or 0
 
-    boards_json = [{"id": board.id, "name": board.name} for board in boards]
-    note_count_json = [
-        {"board_id": item[0], "note_count": item[1]} for item in counts
-    ]
 
-    note_count_lookup = {
-        item["board_id"]: item["note_count"] for item in note_count_json
-    }
+def get_settings_revision() -> int:
+    """Return the revision of the settings"""
+    return settings_cache.get()[0]
 
-    merged_boards_json = []
-    for board in boards_json:
-        merged_boards_json.append(
-            {**board, "note_count": note_count_lookup.get(board["id"], 0)}
+
+def load_settings_revision() -> int:
+    """Return the stored revision of the settings"""
+    with db.get_session() as session:
+        revision = session.scalar(
+            select(Revision.revision).where(Revision.name == "settings")
         )
 
-    return ApiResponse(response=merged_boards_json, status_code=200)
+    return revision or 0
+
+
+def note_as_dict(note: Note | Row) -> dict:
+    """Return the API representation of a note, or of a row of
+    NOTE_COLUMNS"""
+    return {
+        "id": note.id,
+        "description": note.description,
+        "category": note.category,
+        "tags": note.tags,
+    }
+
+
+def after_cursor(statement, column, limit: int | None, cursor: int | None):
+    """Restrict a statement ordered by column to the page after a cursor
+
+    One row more than the limit is selected, so page() can tell whether
+    a next page exists without counting the rows.
+    """
+    if cursor is not None:
+        statement = statement.where(column > cursor)
+    if limit is not None:
+        statement = statement.limit(limit + 1)
+    return statement
+
+
+def page(items: list[dict], limit: int, name: str) -> dict:
+    """Return a page of items selected by after_cursor with the cursor of
+    the next page, or None on the last page"""
+    next_cursor = items[limit - 1]["id"] if len(items) > limit else None
+    return {name: items[:limit], "next_cursor": next_cursor}
+
+
+def get_boards(
+    limit: int | None = None, cursor: int | None = None
+) -> ApiResponse:
+    """Return all boards, or a page of them if a limit is given"""
+    statement = after_cursor(
+        select(Board.id, Board.name, Board.note_count).order_by(Board.id),
+        Board.id,
+        limit,
+        cursor,
+    )
+    with db.get_session() as session:
+        boards = session.execute(statement).all()
+
+    boards_json = [
+        {"id": board.id, "name": board.name, "note_count": board.note_count}
+        for board in boards
+    ]
+    if limit is not None:
+        return ApiResponse(page(boards_json, limit, "boards"), 200)
+
+    return ApiResponse(response=boards_json, status_code=200)
 
 
 def get_board_name_from_id(board_id) -> str:
     """Return the name of the board from its id"""
+    return board_names.get(board_id) or ""
+
+
+def load_board_name(board_id) -> str | None:
+    """Return the stored name of a board, or None if it does not exist"""
     with db.get_session() as session:
-        board = session.query(Board).filter(Board.id == board_id).first()
+        return session.scalar(select(Board.name).where(Board.id == board_id))
 
-    if board is None:
-        return ""
 
-    return board.name
+board_names = LRUCache(load_board_name, size=0)
 
 
 def add_board(
@@ -82,8 +335,10 @@ def add_board(
         try:
             board = Board(name=board_name)
             session.add(board)
+            bump_revision(session, "boards")
             session.commit()
             board_id = board.id
+            board_names.invalidate(board_id)
         except DatabaseError as e:
             session.rollback()
             return ApiResponse(
@@ -94,6 +349,85 @@ def add_board(
     )
 
 
+def import_board(
+    board_name: str, rows: Iterable[tuple[str, str]]
+) -> ApiResponse:
+    """Create a board from the description and category name of its notes
+
+    Everything is added in one transaction. The rows are consumed in
+    batches, each batch inserts its new categories and then its notes with
+    one executemany each. Category ids are kept in a name map, so a
+    category is only looked up right after it is created.
+    """
+    with db.get_session() as session:
+        try:
+            board = Board(name=board_name, revision=1)
+            session.add(board)
+            bump_revision(session, "boards")
+            session.flush()
+            board_id = board.id
+
+            category_ids: dict[str, int] = {}
+            note_count = 0
+            rows = iter(rows)
+            while batch := list(islice(rows, IMPORT_BATCH_SIZE)):
+                new_names = list(
+                    dict.fromkeys(
+                        name for _, name in batch if name not in category_ids
+                    )
+                )
+                if new_names:
+                    session.execute(
+                        insert(Category),
+                        [
+                            {"name": name, "board_id": board_id, "revision": 1}
+                            for name in new_names
+                        ],
+                    )
+                    category_ids.update(
+                        session.execute(
+                            select(Category.name, Category.id).where(
+                                Category.board_id == board_id,
+                                Category.name.in_(new_names),
+                            )
+                        ).all()
+                    )
+                session.execute(
+                    insert(Note),
+                    [
+                        {
+                            "description": description,
+                            "category": category_ids[name],
+                            "tags": [],
+                            "board_id": board_id,
+                            "revision": 1,
+                        }
+                        for description, name in batch
+                    ],
+                )
+                note_count += len(batch)
+
+            board.note_count = note_count
+            session.commit()
+            board_names.invalidate(board_id)
+        except InvalidImport as e:
+            session.rollback()
+            return ApiResponse(response={"status": str(e)}, status_code=400)
+        except DatabaseError as e:
+            session.rollback()
+            return ApiResponse(
+                response={"status": f"DB Error: {e}"}, status_code=500
+            )
+    return ApiResponse(
+        response={
+            "status": "Success",
+            "board_id": board_id,
+            "note_count": note_count,
+        },
+        status_code=200,
+    )
+
+
 def remove_board(
     board_id: int,
 ) -> ApiResponse:
@@ -106,58 +440,220 @@ def remove_board(
                     response={"status": "Board not found"}, status_code=404
                 )
             session.delete(board)
+            bump_revision(session, "boards")
             session.commit()
+            board_cache.invalidate(board.id)
+            # The categories of the board are removed by the cascade
+            board_names.invalidate(board.id)
+            category_names.invalidate()
         except DatabaseError as e:
             session.rollback()
             return ApiResponse(
                 response={"status": f"DB Error: {e}"}, status_code=500
             )
+    announce(board_id, "board_removed", {"id": board_id})
     return ApiResponse(response={"status": "Success"}, status_code=200)
 
 
-def get_notes(board_id: int) -> ApiResponse:
-    """Return all notes for a board"""
+def get_notes(
+    board_id: int, limit: int | None = None, cursor: int | None = None
+) -> ApiResponse:
+    """Return all notes for a board, or a page of them if a limit is given"""
+    if board_cache.size:
+        state = board_cache.get(board_id)
+        notes_json = [] if state is None else state.notes_json
+        if limit is not None:
+            start = 0
+            if cursor is not None:
+                start = bisect_right(
+                    notes_json, cursor, key=lambda note: note["id"]
+                )
+            notes_json = notes_json[start : start + limit + 1]
+            return ApiResponse(page(notes_json, limit, "notes"), 200)
+        return ApiResponse(response=notes_json, status_code=200)
+
+    statement = after_cursor(
+        select(*NOTE_COLUMNS)
+        .where(Note.board_id == board_id)
+        .order_by(Note.id),
+        Note.id,
+        limit,
+        cursor,
+    )
     with db.get_session() as session:
-        notes = session.query(Note).where(Note.board_id.is_(board_id))
+        notes_json = [
+            note_as_dict(note) for note in session.execute(statement)
+        ]
 
-    notes_json = [
-        {
-            "id": note.id,
-            "description": note.description,
-            "category": note.category,
-            "tags": note.tags,
-        }
-        for note in notes
-    ]
+    if limit is not None:
+        return ApiResponse(page(notes_json, limit, "notes"), 200)
 
     return ApiResponse(response=notes_json, status_code=200)
 
 
+def get_note_changes(board_id: int, since: int) -> ApiResponse:
+    """Return the notes of a board changed after the given revision
+
+    Inserted and updated notes are returned in full, deleted notes only
+    by id, together with the current revision of the board. A client
+    which is already at the cached revision makes the cache check the
+    stored one, so it sees the writes of other workers right away.
+    """
+    if board_cache.size:
+        state = board_cache.get(board_id, seen=since)
+        if state is None:
+            return ApiResponse(
+                response={"status": "Board not found"}, status_code=404
+            )
+        changes_json = state.changes_since(since)
+        if changes_json is not None:
+            return ApiResponse(response=changes_json, status_code=200)
+
+    with db.get_session() as session:
+        revision = session.scalar(
+            select(Board.revision).where(Board.id == board_id)
+        )
+        if revision is None:
+            return ApiResponse(
+                response={"status": "Board not found"}, status_code=404
+            )
+
+        notes = session.execute(
+            select(*NOTE_COLUMNS)
+            .where(Note.board_id == board_id, Note.revision > since)
+            .order_by(Note.id)
+        ).all()
+        deleted = session.scalars(
+            select(Tombstone.entity_id)
+            .where(
+                Tombstone.board_id == board_id,
+                Tombstone.entity == "note",
+                Tombstone.revision > since,
+            )
+            .order_by(Tombstone.id)
+        ).all()
+
+        changes_json = {
+            "revision": revision,
+            "notes": [note_as_dict(note) for note in notes],
+            "deleted": list(deleted),
+        }
+
+    return ApiResponse(response=changes_json, status_code=200)
+
+
+def get_board_snapshot(board_id: int) -> ApiResponse:
+    """Return everything needed to open a board
+
+    The board, its categories with their note counts and its notes are
+    read with three queries in one session, or taken from the cached
+    board. The revision of the board stamps the snapshot, like the
+    listings it replaces.
+    """
+    if board_cache.size:
+        state = board_cache.get(board_id)
+    else:
+        state = load_board_state(board_id)
+    if state is None:
+        return ApiResponse(
+            response={"status": "Board not found"}, status_code=404
+        )
+
+    return ApiResponse(response=state.snapshot(), status_code=200)
+
+
+def load_board_state(board_id: int) -> BoardState | None:
+    """Return the stored categories and notes of a board, or None if it
+    does not exist"""
+    with db.get_session() as session:
+        board = session.execute(
+            select(Board.name, Board.revision).where(Board.id == board_id)
+        ).first()
+        if board is None:
+            return None
+
+        categories = session.execute(
+            select(Category.id, Category.name)
+            .where(Category.board_id == board_id)
+            .order_by(Category.id)
+        )
+        notes = session.execute(
+            select(Note.revision, *NOTE_COLUMNS)
+            .where(Note.board_id == board_id)
+            .order_by(Note.id)
+        )
+        return BoardState(
+            id=board_id,
+            name=board.name,
+            revision=board.revision,
+            loaded=board.revision,
+            categories=dict(categories.all()),
+            notes={
+                note.id: (
+                    note.revision,
+                    note.description,
+                    note.category,
+                    note.tags,
+                )
+                for note in notes
+            },
+        )
+
+
+# Categories and notes of the most read boards, disabled unless
+# BOARD_CACHE_SIZE is set.
+board_cache = LRURevisionCache(
+    load_board_revision, load_board_state, size=0, ttl=1, idle=600
+)
+
+
 def get_notes_for_export(
     board_id: int,
 ) -> dict[str, str | list[dict[str, str]]]:
     """Return all notes for export from a board"""
-    board_name = get_board_name_from_id(board_id)
-    if board_name == "":
-        return {}
-
+    statement = (
+        select(Board.name, Note.id, Note.description, Category.name)
+        .select_from(Board)
+        .outerjoin(Note, Note.board_id == Board.id)
+        .outerjoin(Category, Category.id == Note.category)
+        .where(Board.id == board_id)
+        .order_by(Note.id)
+    )
     with db.get_session() as session:
-        notes = session.query(Note).where(Note.board_id.is_(board_id))
+        rows = session.execute(statement).all()
+
+    if not rows:
+        return {}
 
     notes_json = {
-        "board_name": board_name,
+        "board_name": rows[0][0],
         "notes": [
-            {
-                "description": note.description,
-                "category": get_category_name_from_id(note.category),
-            }
-            for note in notes
+            {"description": description, "category": category_name or ""}
+            for _, note_id, description, category_name in rows
+            if note_id is not None
         ],
     }
 
     return notes_json
 
 
+def iter_export_rows(board_id: int) -> Iterator[tuple[str, str]]:
+    """Yield the description and category name of each note on a board
+
+    Rows are fetched from the cursor in batches of EXPORT_BATCH_SIZE, so
+    the session stays open until the generator is exhausted or closed.
+    """
+    statement = (
+        select(Note.description, Category.name)
+        .join(Category, Category.id == Note.category)
+        .where(Note.board_id == board_id)
+        .order_by(Note.id)
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+    with db.get_session() as session:
+        yield from session.execute(statement)
+
+
 def add_note(
     note_description: str,
     note_category: int,
@@ -167,114 +663,366 @@ def add_note(
     """Add a new note"""
     with db.get_session() as session:
         try:
-            session.add(
-                Note(
-                    description=note_description,
-                    category=note_category,
-                    tags=note_tags,
-                    board_id=note_board_id,
-                )
+            revision = bump_board_revision(session, note_board_id, 1)
+            bump_revision(session, "boards")
+            note = Note(
+                description=note_description,
+                category=note_category,
+                tags=note_tags,
+                board_id=note_board_id,
+                revision=revision,
             )
+            session.add(note)
+            session.flush()
+            board_id = note.board_id
+            event = {"revision": revision, "note": note_as_dict(note)}
             session.commit()
         except DatabaseError as e:
             session.rollback()
             return ApiResponse(
                 response={"status": f"DB Error: {e}"}, status_code=500
             )
+    publish(board_id, "note_added", event)
     return ApiResponse(response={"status": "Success"}, status_code=200)
 
 
+def add_notes(notes: list[dict]) -> ApiResponse:
+    """Add several notes in one transaction and return their ids
+
+    The categories of all notes are checked against their boards with a
+    single query, then the notes are inserted with one executemany. Each
+    board gets one revision for all of its new notes, which is also used
+    to read back the ids of the inserted notes.
+    """
+    category_ids = {note["category"] for note in notes}
+    with db.get_session() as session:
+        category_boards = dict(
+            session.execute(
+                select(Category.id, Category.board_id).where(
+                    Category.id.in_(category_ids)
+                )
+            ).all()
+        )
+        if any(
+            category_boards.get(note["category"]) != note["board_id"]
+            for note in notes
+        ):
+            return ApiResponse(
+                response={"status": "Category not found on board"},
+                status_code=404,
+            )
+
+        try:
+            board_notes = Counter(note["board_id"] for note in notes)
+            revisions = {
+                board_id: bump_board_revision(session, board_id, count)
+                for board_id, count in board_notes.items()
+            }
+            bump_revision(session, "boards")
+            rows = [
+                {
+                    "description": note["description"],
+                    "category": note["category"],
+                    "tags": note.get("tags", []),
+                    "board_id": note["board_id"],
+                    "revision": revisions[note["board_id"]],
+                }
+                for note in notes
+            ]
+            session.execute(insert(Note), rows)
+            # The new revision of a board marks exactly the notes added
+            # here, and the ids of one board grow in the order of the rows.
+            created = {}
+            for board_id, note_id in session.execute(
+                select(Note.board_id, Note.id)
+                .where(
+                    or_(
+                        *(
+                            and_(
+                                Note.board_id == board_id,
+                                Note.revision == revision,
+                            )
+                            for board_id, revision in revisions.items()
+                        )
+                    )
+                )
+                .order_by(Note.id)
+            ):
+                created.setdefault(board_id, []).append(note_id)
+            board_ids = {
+                board_id: iter(ids) for board_id, ids in created.items()
+            }
+            note_ids = [next(board_ids[row["board_id"]]) for row in rows]
+            session.commit()
+        except DatabaseError as e:
+            session.rollback()
+            return ApiResponse(
+                response={"status": f"DB Error: {e}"}, status_code=500
+            )
+
+    events = {
+        board_id: {"revision": revision, "notes": []}
+        for board_id, revision in revisions.items()
+    }
+    for note_id, row in zip(note_ids, rows):
+        events[row["board_id"]]["notes"].append(
+            {
+                "id": note_id,
+                "description": row["description"],
+                "category": row["category"],
+                "tags": row["tags"],
+            }
+        )
+    for board_id, event in events.items():
+        publish(board_id, "notes_added", event)
+
+    return ApiResponse(
+        response={"status": "Success", "note_ids": note_ids}, status_code=200
+    )
+
+
 def remove_note(
     note_id: int,
 ) -> ApiResponse:
     """Remove a note"""
     with db.get_session() as session:
         try:
-            note = session.get(Note, note_id)
-            if note is None:
+            owner = bump_owner_revision(session, Note, note_id, -1)
+            removed = (
+                owner is not None
+                and session.execute(
+                    delete(Note).where(Note.id == note_id).returning(Note.id),
+                    execution_options={"synchronize_session": False},
+                ).first()
+            )
+            if not removed:
+                session.rollback()
                 return ApiResponse(
                     response={"status": "Note not found"}, status_code=404
                 )
-            session.delete(note)
+            bump_revision(session, "boards")
+            session.execute(
+                insert(Tombstone).values(
+                    board_id=owner.id,
+                    entity="note",
+                    entity_id=note_id,
+                    revision=owner.revision,
+                )
+            )
             session.commit()
         except DatabaseError as e:
             session.rollback()
             return ApiResponse({"status": f"DB Error: {e}"}, status_code=500)
+    publish(
+        owner.id,
+        "note_removed",
+        {"revision": owner.revision, "id": note_id},
+    )
     return ApiResponse(response={"status": "Success"}, status_code=200)
 
 
-def modify_note_category(note_id: int, new_category: int) -> ApiResponse:
-    """Modify a note category by id"""
+def modify_note(note_id: int, values: dict) -> ApiResponse:
+    """Set columns of a note by id and stamp it with a new board revision"""
     with db.get_session() as session:
         try:
-            statement = select(Note).where(Note.id == note_id)
-            note = session.scalars(statement).one()
-            note.category = new_category
+            owner = bump_owner_revision(session, Note, note_id)
+            note = (
+                owner is not None
+                and session.execute(
+                    update(Note)
+                    .where(Note.id == note_id)
+                    .values(**values, revision=owner.revision)
+                    .returning(*NOTE_COLUMNS),
+                    execution_options={"synchronize_session": False},
+                ).first()
+            )
+            if not note:
+                session.rollback()
+                return ApiResponse(
+                    response={"status": "Note not found"}, status_code=404
+                )
             session.commit()
         except DatabaseError as e:
             session.rollback()
             return ApiResponse(
                 response={"status": f"DB Error: {e}"}, status_code=500
             )
+    publish(
+        owner.id,
+        "note_modified",
+        {"revision": owner.revision, "note": note_as_dict(note)},
+    )
     return ApiResponse(response={"status": "Success"}, status_code=200)
 
 
+def modify_note_category(note_id: int, new_category: int) -> ApiResponse:
+    """Modify a note category by id"""
+    return modify_note(note_id, {"category": new_category})
+
+
 def modify_note_tags(note_id: int, new_tags: list) -> ApiResponse:
     """Modify note tags by id"""
+    return modify_note(note_id, {"tags": new_tags})
+
+
+def modify_notes(changes: list[dict]) -> ApiResponse:
+    """Apply category and tag changes to several notes in one transaction
+
+    Every change holds a note id with a new category, new tags or both.
+    The valid changes are grouped by board and new value, and each group
+    is applied with one UPDATE ... WHERE id IN (...). Changes of missing
+    notes or to categories of another board are skipped and reported in
+    the status of the change.
+    """
+    note_ids = {change["id"] for change in changes}
+    category_ids = {
+        change["category"] for change in changes if "category" in change
+    }
     with db.get_session() as session:
+        note_boards = dict(
+            session.execute(
+                select(Note.id, Note.board_id).where(Note.id.in_(note_ids))
+            ).all()
+        )
+        category_boards = dict(
+            session.execute(
+                select(Category.id, Category.board_id).where(
+                    Category.id.in_(category_ids)
+                )
+            ).all()
+        )
+
+        results = []
+        valid: dict[int, dict] = {}
+        for change in changes:
+            board_id = note_boards.get(change["id"])
+            if board_id is None:
+                status = "Note not found"
+            elif "category" in change and (
+                category_boards.get(change["category"]) != board_id
+            ):
+                status = "Category not found on board"
+            elif "category" not in change and "tags" not in change:
+                status = "Nothing to change"
+            else:
+                status = "Success"
+                valid.setdefault(change["id"], {}).update(change)
+            results.append({"id": change["id"], "status": status})
+
+        moves = defaultdict(list)
+        retags = defaultdict(list)
+        for note_id, change in valid.items():
+            board_id = note_boards[note_id]
+            if "category" in change:
+                moves[board_id, change["category"]].append(note_id)
+            if "tags" in change:
+                retags[board_id, json.dumps(change["tags"])].append(note_id)
+
         try:
-            statement = select(Note).where(Note.id == note_id)
-            note = session.scalars(statement).one()
-            note.tags = new_tags
+            revisions = {
+                board_id: bump_board_revision(session, board_id)
+                for board_id in sorted({note_boards[i] for i in valid})
+            }
+            updates = [
+                ({"category": category}, board_id, ids)
+                for (board_id, category), ids in moves.items()
+            ] + [
+                ({"tags": json.loads(tags)}, board_id, ids)
+                for (board_id, tags), ids in retags.items()
+            ]
+            modified = {}
+            for values, board_id, ids in updates:
+                for note in session.execute(
+                    update(Note)
+                    .where(Note.id.in_(ids))
+                    .values(**values, revision=revisions[board_id])
+                    .returning(Note.board_id, *NOTE_COLUMNS),
+                    execution_options={"synchronize_session": False},
+                ):
+                    modified[note.id] = note
             session.commit()
         except DatabaseError as e:
             session.rollback()
             return ApiResponse(
                 response={"status": f"DB Error: {e}"}, status_code=500
             )
-    return ApiResponse(response={"status": "Success"}, status_code=200)
+
+    events = {
+        board_id: {"revision": revision, "notes": []}
+        for board_id, revision in revisions.items()
+    }
+    for note in modified.values():
+        events[note.board_id]["notes"].append(note_as_dict(note))
+    for board_id, event in events.items():
+        publish(board_id, "notes_modified", event)
+
+    return ApiResponse(
+        response={"status": "Success", "results": results}, status_code=200
+    )
 
 
 def get_categories(board_id: int) -> ApiResponse:
     """Return all categories for a board or all"""
-    with db.get_session() as session:
-        categories = session.query(Category).where(
-            Category.board_id.is_(board_id)
-        )
+    if board_cache.size:
+        state = board_cache.get(board_id)
+        categories_json = [] if state is None else state.categories_json
+        return ApiResponse(response=categories_json, status_code=200)
 
-    categories_json = [
-        {"id": category.id, "name": category.name} for category in categories
-    ]
+    with db.get_session() as session:
+        categories_json = [
+            dict(category)
+            for category in session.execute(
+                select(Category.id, Category.name).where(
+                    Category.board_id == board_id
+                )
+            ).mappings()
+        ]
 
     return ApiResponse(response=categories_json, status_code=200)
 
 
 def get_category_name_from_id(category_id) -> str:
     """Return the name of the category from its id"""
+    return category_names.get(category_id) or ""
+
+
+def load_category_name(category_id) -> str | None:
+    """Return the stored name of a category, or None if it does not
+    exist"""
     with db.get_session() as session:
-        category = (
-            session.query(Category).filter(Category.id == category_id).first()
+        return session.scalar(
+            select(Category.name).where(Category.id == category_id)
         )
 
-    if category is None:
-        return ""
 
-    return category.name
+category_names = LRUCache(load_category_name, size=0)
 
 
 def add_category(category_name: str, category_board_id: int) -> ApiResponse:
     """Add a new category"""
     with db.get_session() as session:
         try:
-            session.add(
-                Category(name=category_name, board_id=category_board_id)
+            revision = bump_board_revision(session, category_board_id)
+            category = Category(
+                name=category_name,
+                board_id=category_board_id,
+                revision=revision,
             )
+            session.add(category)
+            session.flush()
+            board_id = category.board_id
+            event = {
+                "revision": revision,
+                "category": {"id": category.id, "name": category.name},
+            }
             session.commit()
+            category_names.invalidate(category.id)
         except DatabaseError as e:
             session.rollback()
             return ApiResponse(
                 response={"status": f"DB Error: {e}"}, status_code=500
             )
+    publish(board_id, "category_added", event)
     return ApiResponse(response={"status": "Success"}, status_code=200)
 
 
@@ -288,54 +1036,111 @@ def remove_category(
     """
     with db.get_session() as session:
         try:
-            category = session.get(Category, category_id)
-            if category is None:
+            # The notes of the category leave the board with it, through
+            # the cascade of the foreign key.
+            notes = (
+                select(func.count())
+                .where(Note.category == category_id)
+                .scalar_subquery()
+            )
+            owner = bump_owner_revision(session, Category, category_id, -notes)
+            if owner is None:
+                return ApiResponse(
+                    response={"status": "Category not found"}, status_code=404
+                )
+            bump_revision(session, "boards")
+            # Tombstones for the category and each of its notes, written
+            # before the delete cascades the notes away.
+            session.execute(
+                insert(Tombstone).from_select(
+                    ["board_id", "entity", "entity_id", "revision"],
+                    union_all(
+                        select(
+                            literal(owner.id, Integer),
+                            literal("note"),
+                            Note.id,
+                            literal(owner.revision, Integer),
+                        ).where(Note.category == category_id),
+                        select(
+                            literal(owner.id, Integer),
+                            literal("category"),
+                            literal(category_id, Integer),
+                            literal(owner.revision, Integer),
+                        ),
+                    ),
+                )
+            )
+            removed = session.execute(
+                delete(Category).where(Category.id == category_id),
+                execution_options={"synchronize_session": False},
+            ).rowcount
+            if not removed:
+                session.rollback()
                 return ApiResponse(
                     response={"status": "Category not found"}, status_code=404
                 )
-
-            session.delete(category)
             session.commit()
-            return ApiResponse(response={"status": "Success"}, status_code=200)
+            category_names.invalidate(category_id)
         except DatabaseError as e:
             session.rollback()
             return ApiResponse(
                 response={"status": f"DB Error: {e}"}, status_code=500
             )
+    publish(
+        owner.id,
+        "category_removed",
+        {"revision": owner.revision, "id": category_id},
+    )
+    return ApiResponse(response={"status": "Success"}, status_code=200)
 
 
 def get_settings() -> ApiResponse:
     """Return all settings stored"""
+    return ApiResponse(response=settings_cache.get()[1], status_code=200)
+
+
+def load_settings() -> list[dict[str, str]]:
+    """Return all stored settings"""
     with db.get_session() as session:
-        settings = session.query(Setting).all()
+        return [
+            dict(setting)
+            for setting in session.execute(select(*SETTING_COLUMNS)).mappings()
+        ]
 
-    settings_json = [
-        {
-            "setting_name": setting.setting_name,
-            "setting_value": setting.setting_value,
-            "setting_type": setting.setting_type,
-            "setting_display_name": setting.setting_display_name,
-            "setting_description": setting.setting_description,
-        }
-        for setting in settings
-    ]
 
-    return ApiResponse(response=settings_json, status_code=200)
+settings_cache = RevisionCache(load_settings_revision, load_settings, ttl=5)
 
 
 def modify_setting(setting_name: str, new_value: str) -> ApiResponse:
     """Modify a given setting"""
     with db.get_session() as session:
         try:
-            statement = select(Setting).where(
-                Setting.setting_name == setting_name
-            )
-            setting = session.scalars(statement).one()
-            setting.setting_value = new_value
+            setting = session.execute(
+                update(Setting)
+                .where(Setting.setting_name == setting_name)
+                .values(setting_value=new_value)
+                .returning(Setting.setting_name),
+                execution_options={"synchronize_session": False},
+            ).first()
+            if setting is None:
+                return ApiResponse(
+                    response={"status": "Setting not found"}, status_code=404
+                )
+            revision = bump_revision(session, "settings")
             session.commit()
         except DatabaseError as e:
             session.rollback()
             return ApiResponse(
                 response={"status": f"DB Error: {e}"}, status_code=500
             )
+
+    settings_cache.write_through(
+        revision,
+        lambda settings: [
+            {**setting, "setting_value": new_value}
+            if setting["setting_name"] == setting_name
+            else setting
+            for setting in settings
+        ],
+    )
     return ApiResponse(response={"status": "Success"}, status_code=200)
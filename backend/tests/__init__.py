@@ -9,3 +9,100 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+
+"""Shared test helpers"""
+
+import os
+import unittest
+from unittest.mock import patch
+
+from sqlalchemy import Engine, event
+
+from database.database_handler import DatabaseHandler
+from database.models import Base
+from services import services
+
+# In-memory SQLite by default. Point it at a scratch database, like
+# postgresql://retroboard@localhost/retroboard_test, to run the database
+# backed tests against another backend.
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL", "sqlite://")
+
+
+def create_test_database(test_case: unittest.TestCase) -> DatabaseHandler:
+    """Create the tables in the test database for a single test
+
+    The tables are dropped again when the test finishes, so every test
+    starts from an empty database on persistent backends too. The board
+    and category names memoized by id for an earlier database are dropped.
+    """
+    services.invalidate_names()
+    db = DatabaseHandler(TEST_DATABASE_URL)
+    Base.metadata.drop_all(db.engine)
+    db.create_tables()
+    test_case.addCleanup(db.engine.dispose)
+    test_case.addCleanup(Base.metadata.drop_all, db.engine)
+    return db
+
+
+def record_statements(test_case: unittest.TestCase, engine: Engine) -> list:
+    """Return a list the SQL of every statement the engine runs is appended
+    to until the test finishes"""
+    statements = []
+
+    def record(_conn, _cursor, statement, _params, _context, _executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    test_case.addCleanup(event.remove, engine, "before_cursor_execute", record)
+    return statements
+
+
+class ServicesTestCase(unittest.TestCase):
+    """Base class of the tests running the services against the test
+    database"""
+
+    def setUp(self):
+        """Create the test database and let the services use it"""
+        self.db = create_test_database(self)
+        self.patch_services(db=self.db)
+
+    def patch_services(self, **values):
+        """Replace module globals of the services until the test finishes"""
+        for name, value in values.items():
+            patcher = patch(f"services.services.{name}", value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def record_statements(self) -> list:
+        """Return the list of statements the test database runs from now"""
+        return record_statements(self, self.db.engine)
+
+    @staticmethod
+    def create_board(
+        name: str = "Board", categories: tuple[str, ...] = ("Good", "Bad")
+    ) -> tuple[int, list[int]]:
+        """Add a board with categories and return their ids"""
+        board_id = services.add_board(name).response["board_id"]
+        for category in categories:
+            services.add_category(category, board_id)
+        return board_id, [
+            category["id"]
+            for category in services.get_categories(board_id).response
+        ]
+
+    @staticmethod
+    def create_notes(
+        board_id: int, category_ids: list[int], count: int
+    ) -> list[int]:
+        """Add notes spread over the categories of a board and return their
+        ids"""
+        return services.add_notes(
+            [
+                {
+                    "description": f"Note {index}",
+                    "category": category_ids[index % len(category_ids)],
+                    "board_id": board_id,
+                }
+                for index in range(count)
+            ]
+        ).response["note_ids"]
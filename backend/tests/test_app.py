@@ -0,0 +1,188 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test app"""
+
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from sqlalchemy import event, inspect, text
+from sqlalchemy.engine import Engine
+
+from app import create_app
+from config import Config, database_url
+from services import services
+
+
+class TestApp(unittest.TestCase):
+    """Tests for the app factory and commands"""
+
+    def test_create_app_does_not_touch_database(self):
+        """Test creating the app does not connect to the database"""
+        with patch.object(Engine, "connect") as mock_connect:
+            create_app()
+
+        mock_connect.assert_not_called()
+
+    def test_create_app_with_sqlite_broker(self):
+        """Test creating the app with an SQLite event broker does not
+        touch the broker database either"""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, "events.sqlite")
+        self.addCleanup(setattr, services, "broker", services.broker)
+
+        broker_url = patch.object(
+            Config, "EVENT_BROKER_URL", f"sqlite:///{path}"
+        )
+        with broker_url, patch.object(Engine, "connect") as mock_connect:
+            create_app()
+
+        mock_connect.assert_not_called()
+        self.assertFalse(os.path.exists(path))
+
+    def test_create_app_with_null_pool(self):
+        """Test the app builds with a pool class without sizing options"""
+        with patch.dict(
+            Config.SQLALCHEMY_ENGINE_OPTIONS, {"poolclass": "NullPool"}
+        ):
+            create_app()
+
+        self.assertEqual(
+            services.db.get_pool_stats()["pool_class"], "NullPool"
+        )
+
+    def test_init_db_command(self):
+        """Test init-db creates the tables, stamps them and adds settings"""
+        app = create_app(testing=True)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        services.db.configure(
+            "sqlite:///" + os.path.join(directory.name, "data.sqlite")
+        )
+        self.addCleanup(services.db.engine.dispose)
+
+        result = app.test_cli_runner().invoke(args=["init-db"])
+        self.assertEqual(result.exit_code, 0, result.output)
+        result = app.test_cli_runner().invoke(args=["init-db"])
+        self.assertEqual(result.exit_code, 0, result.output)
+
+        with services.db.engine.connect() as connection:
+            self.assertTrue(inspect(connection).has_table("notes"))
+            self.assertIsNotNone(
+                connection.scalar(
+                    text("SELECT version_num FROM alembic_version")
+                )
+            )
+        self.assertNotEqual(services.get_settings().response, [])
+
+
+class TestRequestSession(unittest.TestCase):
+    """Tests for the database session shared by the services of a request"""
+
+    def setUp(self):
+        """Create the app with a board and count transactions"""
+        self.client = create_app(testing=True).test_client()
+        self.board_id = services.add_board("Board").response["board_id"]
+        services.add_category("Good", self.board_id)
+        self.category_id = services.get_categories(self.board_id).response[0][
+            "id"
+        ]
+        services.add_note("Note", self.category_id, [], self.board_id)
+
+        self.transactions = 0
+
+        @event.listens_for(services.db.engine, "begin")
+        def count_transactions(_connection):
+            self.transactions += 1
+
+    def _checkouts(self) -> int:
+        """Return the number of connection checkouts so far"""
+        return services.db.get_pool_stats()["checkouts"]
+
+    def test_request_uses_one_connection(self):
+        """Test the services of one request share a connection and
+        transaction"""
+        for url in (
+            f"/api/notes/?board_id={self.board_id}",
+            f"/api/categories/?board_id={self.board_id}",
+            f"/api/boards/export?board_id={self.board_id}",
+            f"/api/boards/{self.board_id}/snapshot",
+        ):
+            with self.subTest(url=url):
+                checkouts, transactions = self._checkouts(), self.transactions
+
+                response = self.client.get(url)
+
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(self._checkouts() - checkouts, 1)
+                self.assertEqual(self.transactions - transactions, 1)
+                self.assertEqual(
+                    services.db.get_pool_stats()["checked_out"], 0
+                )
+
+    def test_write_request_commits_once(self):
+        """Test a write request commits its one transaction"""
+        checkouts, transactions = self._checkouts(), self.transactions
+
+        response = self.client.post(
+            "/api/notes/",
+            json={
+                "description": "Another",
+                "category": self.category_id,
+                "board_id": self.board_id,
+            },
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._checkouts() - checkouts, 1)
+        self.assertEqual(self.transactions - transactions, 1)
+        self.assertEqual(len(services.get_notes(self.board_id).response), 2)
+
+    def test_request_without_database(self):
+        """Test a request which does not use the database checks out no
+        connection"""
+        checkouts = self._checkouts()
+
+        self.client.get("/api/docs")
+
+        self.assertEqual(self._checkouts(), checkouts)
+
+    def test_session_outside_request(self):
+        """Test services used outside a request get their own session"""
+        self.assertIsNone(services.db.request_session.get())
+        with services.db.get_session() as first:
+            pass
+        with services.db.get_session() as second:
+            pass
+
+        self.assertIsNot(first, second)
+
+
+class TestConfig(unittest.TestCase):
+    """Tests for the configuration helpers"""
+
+    def test_database_url_default(self):
+        """Test the default URL is used without DATABASE_URL"""
+        with patch.dict(os.environ, clear=True):
+            self.assertEqual(database_url("sqlite://"), "sqlite://")
+
+    def test_database_url_postgres(self):
+        """Test PostgreSQL URLs are mapped to the psycopg driver"""
+        for url in ("postgres://u:p@db/rb", "postgresql://u:p@db/rb"):
+            with patch.dict(os.environ, {"DATABASE_URL": url}):
+                self.assertEqual(
+                    database_url("sqlite://"),
+                    "postgresql+psycopg://u:p@db/rb",
+                )
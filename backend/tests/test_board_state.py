@@ -0,0 +1,124 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test the board read model"""
+
+import unittest
+
+from services.board_state import BoardState
+
+
+def note(note_id: int, category: int = 1, tags=None) -> dict:
+    """Return the API representation of a test note"""
+    return {
+        "id": note_id,
+        "description": f"Note {note_id}",
+        "category": category,
+        "tags": tags or [],
+    }
+
+
+class TestBoardState(unittest.TestCase):
+    """Tests for BoardState"""
+
+    def setUp(self):
+        """Create a board with two categories and notes at revision 4"""
+        self.state = BoardState(
+            id=1,
+            name="Board",
+            revision=4,
+            loaded=4,
+            categories={1: "Good", 2: "Bad"},
+            notes={
+                1: (3, "Note 1", 1, []),
+                2: (4, "Note 2", 2, []),
+            },
+        )
+
+    def test_notes_json(self):
+        """Test the notes are represented like the notes listing"""
+        self.assertEqual(self.state.notes_json, [note(1), note(2, 2)])
+        self.assertEqual(
+            self.state.categories_json,
+            [{"id": 1, "name": "Good"}, {"id": 2, "name": "Bad"}],
+        )
+
+    def test_apply_note_events(self):
+        """Test added, modified and removed notes"""
+        state = self.state.apply(
+            "notes_added", {"revision": 5, "notes": [note(3), note(4)]}
+        )
+        state = state.apply(
+            "note_modified", {"revision": 6, "note": note(1, 2, ["x"])}
+        )
+        state = state.apply("note_removed", {"revision": 7, "id": 2})
+
+        self.assertEqual(state.revision, 7)
+        self.assertEqual(
+            state.notes_json, [note(1, 2, ["x"]), note(3), note(4)]
+        )
+        self.assertEqual(self.state.notes_json, [note(1), note(2, 2)])
+
+    def test_apply_category_events(self):
+        """Test a removed category takes its notes along"""
+        state = self.state.apply(
+            "category_added",
+            {"revision": 5, "category": {"id": 3, "name": "Ugly"}},
+        )
+        state = state.apply("category_removed", {"revision": 6, "id": 2})
+
+        self.assertEqual(state.categories, {1: "Good", 3: "Ugly"})
+        self.assertEqual(state.notes_json, [note(1)])
+        self.assertEqual(state.deleted, ((6, 2),))
+
+    def test_apply_reused_note_id(self):
+        """Test the notes stay in id order when an id is added again"""
+        state = self.state.apply("note_removed", {"revision": 5, "id": 2})
+        state = state.apply("note_added", {"revision": 6, "note": note(3)})
+        state = state.apply("note_removed", {"revision": 7, "id": 3})
+        state = state.apply("note_added", {"revision": 8, "note": note(2)})
+
+        self.assertEqual(list(state.notes), [1, 2])
+
+    def test_changes_since(self):
+        """Test the changes after a revision from the loaded one on"""
+        state = self.state.apply(
+            "note_added", {"revision": 5, "note": note(3)}
+        ).apply("note_removed", {"revision": 6, "id": 1})
+
+        self.assertEqual(
+            state.changes_since(4),
+            {"revision": 6, "notes": [note(3)], "deleted": [1]},
+        )
+        self.assertEqual(
+            state.changes_since(6), {"revision": 6, "notes": [], "deleted": []}
+        )
+        self.assertIsNone(state.changes_since(3))
+
+    def test_snapshot(self):
+        """Test the snapshot counts the notes of each category"""
+        self.assertEqual(
+            self.state.snapshot(),
+            {
+                "board": {
+                    "id": 1,
+                    "name": "Board",
+                    "revision": 4,
+                    "note_count": 2,
+                },
+                "categories": [
+                    {"id": 1, "name": "Good", "note_count": 1},
+                    {"id": 2, "name": "Bad", "note_count": 1},
+                ],
+                "notes": [note(1), note(2, 2)],
+            },
+        )
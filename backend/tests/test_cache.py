@@ -0,0 +1,344 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test caches"""
+
+import unittest
+from unittest.mock import MagicMock, patch
+
+from services.cache import LRUCache, LRURevisionCache, RevisionCache
+
+
+class TestRevisionCache(unittest.TestCase):
+    """Tests for RevisionCache"""
+
+    def setUp(self):
+        """Create a cache over mocked loaders"""
+        self.load_revision = MagicMock(return_value=1)
+        self.load = MagicMock(return_value=["a"])
+
+    def test_get_within_ttl(self):
+        """Test the data is served from memory within the ttl"""
+        cache = RevisionCache(self.load_revision, self.load, ttl=60)
+
+        self.assertEqual(cache.get(), (1, ["a"]))
+        self.assertEqual(cache.get(), (1, ["a"]))
+
+        self.load_revision.assert_called_once()
+        self.load.assert_called_once()
+
+    def test_get_unchanged_revision(self):
+        """Test an unchanged revision does not reload the data"""
+        cache = RevisionCache(self.load_revision, self.load, ttl=0)
+
+        cache.get()
+        cache.get()
+
+        self.assertEqual(self.load_revision.call_count, 2)
+        self.load.assert_called_once()
+
+    def test_get_changed_revision(self):
+        """Test a revision changed by another worker reloads the data"""
+        cache = RevisionCache(self.load_revision, self.load, ttl=0)
+        cache.get()
+        self.load_revision.return_value = 2
+        self.load.return_value = ["b"]
+
+        self.assertEqual(cache.get(), (2, ["b"]))
+
+    def test_write_through(self):
+        """Test a write of this process updates the data in memory"""
+        cache = RevisionCache(self.load_revision, self.load, ttl=60)
+        cache.get()
+
+        cache.write_through(2, lambda value: [*value, "b"])
+
+        self.assertEqual(cache.get(), (2, ["a", "b"]))
+        self.load.assert_called_once()
+
+    def test_write_through_after_foreign_write(self):
+        """Test a skipped revision drops the data instead"""
+        cache = RevisionCache(self.load_revision, self.load, ttl=60)
+        cache.get()
+        self.load_revision.return_value = 3
+        self.load.return_value = ["c"]
+
+        cache.write_through(3, lambda value: [*value, "b"])
+
+        self.assertEqual(cache.get(), (3, ["c"]))
+
+    def test_invalidate(self):
+        """Test an invalidated cache reloads on the next read"""
+        cache = RevisionCache(self.load_revision, self.load, ttl=60)
+        cache.get()
+
+        cache.invalidate()
+        cache.get()
+
+        self.assertEqual(self.load.call_count, 2)
+
+    def test_load_outside_lock(self):
+        """Test the data is loaded without holding the lock, and not kept
+        if the cache was invalidated meanwhile"""
+        cache = RevisionCache(self.load_revision, self.load, ttl=60)
+
+        def load():
+            self.assertTrue(cache._lock.acquire(blocking=False))
+            cache._lock.release()
+            cache.invalidate()
+            return ["a"]
+
+        self.load.side_effect = load
+        self.assertEqual(cache.get(), (1, ["a"]))
+        self.load.side_effect = None
+
+        cache.get()
+        self.assertEqual(self.load.call_count, 2)
+
+
+class TestLRURevisionCache(unittest.TestCase):
+    """Tests for LRURevisionCache"""
+
+    def setUp(self):
+        """Create mocked loaders which return the key in the data"""
+        self.revisions = {}
+        self.load_revision = MagicMock(side_effect=self.revisions.get)
+        self.load = MagicMock(side_effect=lambda key: [key])
+
+    def _cache(self, size=2, ttl=60, idle=600):
+        """Return a cache over the mocked loaders"""
+        return LRURevisionCache(
+            self.load_revision, self.load, size=size, ttl=ttl, idle=idle
+        )
+
+    def test_disabled(self):
+        """Test a size of 0 never loads anything"""
+        self.revisions["a"] = 1
+
+        self.assertIsNone(self._cache(size=0).get("a"))
+        self.load_revision.assert_not_called()
+
+    def test_get_within_ttl(self):
+        """Test the data of a key is served from memory within the ttl"""
+        self.revisions["a"] = 1
+        cache = self._cache()
+
+        self.assertEqual(cache.get("a"), ["a"])
+        self.assertEqual(cache.get("a"), ["a"])
+
+        self.load_revision.assert_called_once_with("a")
+        self.load.assert_called_once_with("a")
+
+    def test_get_missing_key(self):
+        """Test a key without a stored revision is not cached"""
+        cache = self._cache()
+
+        self.assertIsNone(cache.get("a"))
+        self.load.assert_not_called()
+
+    def test_get_changed_revision(self):
+        """Test a revision changed by another worker reloads the data"""
+        self.revisions["a"] = 1
+        cache = self._cache(ttl=0)
+        cache.get("a")
+        self.revisions["a"] = 2
+
+        cache.get("a")
+
+        self.assertEqual(self.load.call_count, 2)
+
+    def test_get_seen_revision(self):
+        """Test a caller at the cached revision checks the stored one"""
+        self.revisions["a"] = 1
+        cache = self._cache()
+        cache.get("a")
+
+        cache.get("a", seen=0)
+        self.load_revision.assert_called_once()
+        cache.get("a", seen=1)
+        self.assertEqual(self.load_revision.call_count, 2)
+
+    def test_lru_eviction(self):
+        """Test the least recently read key is dropped over the size"""
+        self.revisions.update(a=1, b=1, c=1)
+        cache = self._cache()
+        cache.get("a")
+        cache.get("b")
+        cache.get("a")
+
+        cache.get("c")
+        cache.get("a")
+        cache.get("b")
+
+        self.assertEqual(
+            [call.args[0] for call in self.load.call_args_list],
+            ["a", "b", "c", "b"],
+        )
+
+    @patch("services.cache.time.monotonic")
+    def test_idle_eviction(self, mock_monotonic):
+        """Test keys which were not read for idle seconds are dropped"""
+        self.revisions.update(a=1, b=1)
+        cache = self._cache(size=8, idle=10)
+        mock_monotonic.return_value = 0
+        cache.get("a")
+
+        mock_monotonic.return_value = 11
+        cache.get("b")
+        cache.get("a")
+
+        self.assertEqual(
+            [call.args[0] for call in self.load.call_args_list],
+            ["a", "b", "a"],
+        )
+
+    def test_write_through(self):
+        """Test a write of this process updates the data in memory"""
+        self.revisions["a"] = 1
+        cache = self._cache()
+        cache.get("a")
+
+        cache.write_through("a", 2, lambda value: [*value, "b"])
+
+        self.assertEqual(cache.get("a"), ["a", "b"])
+        self.load.assert_called_once()
+
+    def test_write_through_after_foreign_write(self):
+        """Test a skipped revision drops the data of the key instead"""
+        self.revisions["a"] = 1
+        cache = self._cache()
+        cache.get("a")
+        self.revisions["a"] = 3
+
+        cache.write_through("a", 3, lambda value: [*value, "b"])
+
+        self.assertEqual(cache.get("a"), ["a"])
+        self.assertEqual(self.load.call_count, 2)
+
+    def test_invalidate(self):
+        """Test an invalidated key reloads on the next read"""
+        self.revisions.update(a=1, b=1)
+        cache = self._cache()
+        cache.get("a")
+        cache.get("b")
+
+        cache.invalidate("a")
+        cache.get("a")
+        cache.get("b")
+
+        self.assertEqual(self.load.call_count, 3)
+
+    def test_load_outside_lock(self):
+        """Test loading a key leaves the other keys readable, and the data
+        is not kept if the key was written meanwhile"""
+        self.revisions.update(a=1, b=1)
+        cache = self._cache()
+        cache.get("b")
+
+        def load(key):
+            self.assertTrue(cache._lock.acquire(blocking=False))
+            cache._lock.release()
+            self.assertEqual(cache.get("b"), ["b"])
+            cache.write_through(key, 2, lambda value: value)
+            return [key]
+
+        self.load.side_effect = load
+        self.assertEqual(cache.get("a"), ["a"])
+        self.load.side_effect = lambda key: [key]
+
+        cache.get("a")
+        self.assertEqual(self.load.call_count, 3)
+
+
+class TestLRUCache(unittest.TestCase):
+    """Tests for LRUCache"""
+
+    def setUp(self):
+        """Create a mocked loader which finds the keys of names"""
+        self.names = {1: "a", 2: "b", 3: "c"}
+        self.load = MagicMock(side_effect=self.names.get)
+
+    def test_get_counts_hits_and_misses(self):
+        """Test a found value is loaded once and served from memory"""
+        cache = LRUCache(self.load, size=2)
+
+        self.assertEqual(cache.get(1), "a")
+        self.assertEqual(cache.get(1), "a")
+
+        self.load.assert_called_once_with(1)
+        self.assertEqual(
+            cache.stats(), {"size": 1, "max_size": 2, "hits": 1, "misses": 1}
+        )
+
+    def test_missing_value_not_kept(self):
+        """Test a key without a value is loaded again on the next get"""
+        cache = LRUCache(self.load, size=2)
+
+        self.assertIsNone(cache.get(4))
+        self.names[4] = "d"
+
+        self.assertEqual(cache.get(4), "d")
+        self.assertEqual(self.load.call_count, 2)
+
+    def test_least_recently_used_dropped(self):
+        """Test the least recently used key is dropped beyond the size"""
+        cache = LRUCache(self.load, size=2)
+        cache.get(1)
+        cache.get(2)
+        cache.get(1)
+
+        cache.get(3)
+        cache.get(1)
+        cache.get(2)
+
+        self.assertEqual(
+            [call.args[0] for call in self.load.call_args_list], [1, 2, 3, 2]
+        )
+
+    def test_invalidate(self):
+        """Test an invalidated key is loaded again"""
+        cache = LRUCache(self.load, size=2)
+        cache.get(1)
+        cache.get(2)
+
+        cache.invalidate(1)
+        self.names[1] = "z"
+
+        self.assertEqual(cache.get(1), "z")
+        self.assertEqual(cache.get(2), "b")
+        cache.invalidate()
+        self.assertEqual(cache.stats()["size"], 0)
+
+    def test_invalidate_during_load(self):
+        """Test a value loaded before an invalidation is not kept"""
+        cache = LRUCache(self.load, size=2)
+
+        def load(key):
+            cache.invalidate(key)
+            return self.names[key]
+
+        self.load.side_effect = load
+        self.assertEqual(cache.get(1), "a")
+        self.load.side_effect = self.names.get
+
+        cache.get(1)
+        self.assertEqual(self.load.call_count, 2)
+
+    def test_disabled(self):
+        """Test a size of 0 loads on every get"""
+        cache = LRUCache(self.load, size=0)
+
+        cache.get(1)
+        cache.get(1)
+
+        self.assertEqual(self.load.call_count, 2)
+        self.assertEqual(cache.stats()["size"], 0)
@@ -0,0 +1,339 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test database handler"""
+
+import json
+import os
+import tempfile
+import threading
+import unittest
+
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.config import Config as AlembicConfig
+from alembic.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import func, inspect, select, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from config import Config
+from database.database_handler import (
+    ALEMBIC_INI,
+    INITIAL_REVISION,
+    REVISION_NAMES,
+    DatabaseHandler,
+)
+from database.models import Base, Board, Revision, Setting
+from tests import create_test_database, record_statements
+
+
+def settings_entry(setting_name: str) -> dict:
+    """Build a settings.json entry for a string setting"""
+    return {
+        "setting_name": setting_name,
+        "default_value": "",
+        "setting_type": "string",
+        "setting_display_name": "Test",
+        "setting_description": "Test",
+    }
+
+
+class TestDatabaseHandlerSyncSettings(unittest.TestCase):
+    """Settings sync tests against the test database"""
+
+    def setUp(self):
+        """Create the test database and count the statements it runs"""
+        self.db = create_test_database(self)
+        self.statements = record_statements(self, self.db.engine)
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "settings.json")
+
+    def _write_settings(self, *setting_names: str):
+        """Write a settings file with the given setting names"""
+        with open(self.path, "w", encoding="utf-8") as settings_file:
+            json.dump(
+                [settings_entry(name) for name in setting_names], settings_file
+            )
+
+    def _sync(self) -> list[str]:
+        """Sync the settings file and return the statements it ran"""
+        self.statements.clear()
+        with self.db.get_session() as session:
+            self.db.sync_settings(session, self.path)
+        return list(self.statements)
+
+    def _stored(self) -> tuple[list[str], int | None]:
+        """Return the stored setting names and the settings revision"""
+        with self.db.get_session() as session:
+            names = session.scalars(
+                select(Setting.setting_name).order_by(Setting.setting_name)
+            ).all()
+            revision = session.scalar(
+                select(Revision.revision).where(Revision.name == "settings")
+            )
+        return names, revision
+
+    def test_sync_settings_adds_missing(self):
+        """Test missing settings are added in one insert"""
+        self._write_settings("first", "second")
+
+        statements = self._sync()
+        self.assertEqual(
+            [s for s in statements if "FROM settings" in s],
+            ["SELECT settings.setting_name \nFROM settings"],
+        )
+        self.assertEqual(
+            len(
+                [s for s in statements if s.startswith("INSERT INTO settings")]
+            ),
+            1,
+        )
+        self.assertEqual(self._stored(), (["first", "second"], 1))
+
+        self._write_settings("first", "second", "third")
+        self._sync()
+        self.assertEqual(self._stored(), (["first", "second", "third"], 2))
+
+    def test_sync_settings_unchanged_file(self):
+        """Test an unchanged settings file is skipped after one lookup"""
+        self._write_settings("first", "second")
+        self._sync()
+
+        self.assertEqual(len(self._sync()), 1)
+        self.assertEqual(self._stored(), (["first", "second"], 1))
+
+    def test_sync_settings_keeps_existing(self):
+        """Test existing settings are neither touched nor counted as added"""
+        self._write_settings("first")
+        self._sync()
+        with self.db.get_session() as session:
+            session.get(Setting, "first").setting_value = "custom"
+            session.commit()
+
+        self._write_settings("first")
+        with open(self.path, "a", encoding="utf-8") as settings_file:
+            settings_file.write("\n")
+        self._sync()
+
+        self.assertEqual(self._stored(), (["first"], 1))
+        with self.db.get_session() as session:
+            self.assertEqual(
+                session.get(Setting, "first").setting_value, "custom"
+            )
+
+
+class TestDatabaseHandlerMigrations(unittest.TestCase):
+    """Database creation and migration tests against a database file"""
+
+    def setUp(self):
+        """Create a handler for an empty database file"""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.db = DatabaseHandler(
+            "sqlite:///" + os.path.join(directory.name, "data.sqlite")
+        )
+        self.addCleanup(self.db.engine.dispose)
+        self.head = ScriptDirectory.from_config(
+            AlembicConfig(ALEMBIC_INI)
+        ).get_current_head()
+
+    def _version(self) -> str:
+        """Return the Alembic revision the database is stamped with"""
+        with self.db.engine.connect() as connection:
+            return MigrationContext.configure(
+                connection
+            ).get_current_revision()
+
+    def test_init_database_new(self):
+        """Test a new database is built by the migrations and matches the
+        models"""
+        self.db.init_database()
+
+        self.assertEqual(self._version(), self.head)
+        with self.db.engine.connect() as connection:
+            # SQLite keeps the declared lengths of widened text columns
+            context = MigrationContext.configure(
+                connection, opts={"compare_type": False}
+            )
+            self.assertEqual(compare_metadata(context, Base.metadata), [])
+
+    def test_revision_rows_created(self):
+        """Test the global revision rows come with the tables, from the
+        migrations and from create_tables alike"""
+        self.db.init_database()
+        test_db = create_test_database(self)
+
+        for db in (self.db, test_db):
+            with db.get_session() as session:
+                self.assertEqual(
+                    session.scalars(
+                        select(Revision.name).order_by(Revision.name)
+                    ).all(),
+                    list(REVISION_NAMES),
+                )
+
+    def test_init_database_before_migrations(self):
+        """Test a database created before migrations is stamped with the
+        initial revision and upgraded with its rows"""
+        alembic_config = AlembicConfig(ALEMBIC_INI)
+        with self.db.engine.begin() as connection:
+            alembic_config.attributes["connection"] = connection
+            command.upgrade(alembic_config, INITIAL_REVISION)
+            connection.execute(text("DROP TABLE alembic_version"))
+            connection.execute(text("INSERT INTO boards (name) VALUES ('B')"))
+
+        self.db.init_database()
+        self.db.init_database()
+
+        self.assertEqual(self._version(), self.head)
+        with self.db.get_session() as session:
+            self.assertEqual(session.scalars(select(Board.name)).all(), ["B"])
+        with self.db.engine.connect() as connection:
+            self.assertTrue(inspect(connection).has_table("tombstones"))
+
+
+class TestDatabaseHandlerPragmas(unittest.TestCase):
+    """SQLite pragma tests against a database file"""
+
+    def setUp(self):
+        """Create a database file with the configured pragmas"""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.db_url = "sqlite:///" + os.path.join(
+            directory.name, "data.sqlite"
+        )
+        self.db = self._handler()
+        self.db.create_tables()
+
+    def _handler(self) -> DatabaseHandler:
+        """Create a handler for the database file, like a worker does"""
+        db = DatabaseHandler(self.db_url, Config.SQLITE_PRAGMAS)
+        self.addCleanup(db.engine.dispose)
+        return db
+
+    def test_pragmas_applied(self):
+        """Test every new connection gets the configured pragmas"""
+        expected = {
+            "foreign_keys": 1,
+            "journal_mode": "wal",
+            "synchronous": 1,
+            "busy_timeout": 5000,
+            "cache_size": -16000,
+            "temp_store": 2,
+        }
+        with self.db.engine.connect() as connection:
+            for name, value in expected.items():
+                self.assertEqual(
+                    connection.scalar(text(f"PRAGMA {name}")), value, name
+                )
+
+    def test_concurrent_writes(self):
+        """Test writers of several handlers wait for each other's lock"""
+        errors = []
+
+        def write(db: DatabaseHandler):
+            try:
+                for index in range(20):
+                    with db.get_session() as session:
+                        session.add(Board(name=f"Board {index}"))
+                        session.commit()
+            except Exception as error:
+                errors.append(error)
+
+        threads = [
+            threading.Thread(target=write, args=(self._handler(),))
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        with self.db.get_session() as session:
+            self.assertEqual(
+                session.scalar(select(func.count()).select_from(Board)), 80
+            )
+
+
+class TestDatabaseHandlerPool(unittest.TestCase):
+    """Connection pool configuration and metrics tests"""
+
+    def setUp(self):
+        """Create a database file with a single connection pool"""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.db = DatabaseHandler(
+            "sqlite:///" + os.path.join(directory.name, "data.sqlite"),
+            engine_options={
+                "poolclass": "QueuePool",
+                "pool_size": 1,
+                "max_overflow": 0,
+                "pool_timeout": 0.05,
+            },
+        )
+        self.addCleanup(self.db.engine.dispose)
+
+    def test_pool_options(self):
+        """Test the configured pool class and size are used"""
+        stats = self.db.get_pool_stats()
+
+        self.assertEqual(stats["pool_class"], "QueuePool")
+        self.assertEqual(stats["size"], 1)
+
+    def test_pool_stats(self):
+        """Test checkouts, checkins and wait times are counted"""
+        for _ in range(3):
+            with self.db.engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
+
+        stats = self.db.get_pool_stats()
+        self.assertEqual(stats["connects"], 1)
+        self.assertEqual(stats["checkouts"], 3)
+        self.assertEqual(stats["checkins"], 3)
+        self.assertEqual(stats["checked_out"], 0)
+        self.assertEqual(stats["timeouts"], 0)
+        self.assertGreater(stats["wait_time"], 0)
+
+    def test_pool_timeout(self):
+        """Test an exhausted pool counts the timed out checkout"""
+        with self.db.engine.connect():
+            with self.assertRaises(PoolTimeoutError):
+                self.db.engine.connect()
+
+            stats = self.db.get_pool_stats()
+            self.assertEqual(stats["checked_out"], 1)
+            self.assertEqual(stats["timeouts"], 1)
+            self.assertGreaterEqual(stats["max_wait_time"], 0.05)
+
+    def test_pool_options_without_queue(self):
+        """Test the sizing options are dropped for other pool classes"""
+        for pool_class in ("NullPool", "StaticPool", "SingletonThreadPool"):
+            with self.subTest(pool_class=pool_class):
+                db = DatabaseHandler(
+                    "sqlite://",
+                    engine_options={
+                        "poolclass": pool_class,
+                        "pool_size": 1,
+                        "max_overflow": 0,
+                        "pool_timeout": 0.05,
+                        "pool_recycle": 60,
+                    },
+                )
+                self.addCleanup(db.engine.dispose)
+                with db.engine.connect() as connection:
+                    connection.execute(text("SELECT 1"))
+
+                self.assertEqual(db.get_pool_stats()["pool_class"], pool_class)
@@ -0,0 +1,249 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test events"""
+
+import os
+import queue
+import tempfile
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+from sqlalchemy import select
+
+from services.events import (
+    EventBroker,
+    RedisEventBroker,
+    RemoteEventBroker,
+    SQLiteEventBroker,
+    create_broker,
+    events_table,
+    format_event,
+)
+
+
+class TestEventBroker(unittest.TestCase):
+    """Tests for EventBroker"""
+
+    def setUp(self):
+        """Create an empty broker"""
+        self.broker = EventBroker()
+
+    def test_publish_fans_out_one_message(self):
+        """Test an event is formatted once for all subscribers"""
+        first = self.broker.subscribe(1)
+        second = self.broker.subscribe(1)
+        other_board = self.broker.subscribe(2)
+
+        with patch(
+            "services.events.format_event", wraps=format_event
+        ) as mock_format_event:
+            self.broker.publish(1, "note_removed", {"id": 3})
+
+        mock_format_event.assert_called_once()
+        message = first.get_nowait()
+        self.assertEqual(message, 'event: note_removed\ndata: {"id": 3}\n\n')
+        self.assertIs(second.get_nowait(), message)
+        self.assertTrue(other_board.empty())
+
+    def test_publish_without_subscribers(self):
+        """Test events of unwatched boards are not formatted"""
+        with patch("services.events.format_event") as mock_format_event:
+            self.broker.publish(1, "note_removed", {"id": 3})
+
+        mock_format_event.assert_not_called()
+
+    def test_unsubscribe(self):
+        """Test unsubscribed queues no longer receive events"""
+        subscription = self.broker.subscribe(1)
+        self.broker.unsubscribe(1, subscription)
+
+        self.broker.publish(1, "note_removed", {"id": 3})
+
+        self.assertTrue(subscription.empty())
+
+    @patch("services.events.SUBSCRIBER_QUEUE_SIZE", 2)
+    def test_publish_resyncs_slow_subscriber(self):
+        """Test a full subscriber queue is replaced by a resync event"""
+        subscription = self.broker.subscribe(1)
+
+        for note_id in range(3):
+            self.broker.publish(1, "note_removed", {"id": note_id})
+
+        self.assertEqual(subscription.get_nowait(), format_event("resync", {}))
+        self.assertTrue(subscription.empty())
+
+    def test_listen(self):
+        """Test listen yields published events and heartbeats"""
+        events = self.broker.listen(1, heartbeat=0)
+
+        self.assertEqual(next(events), ": connected\n\n")
+        self.broker.publish(1, "note_removed", {"id": 3})
+        self.assertEqual(
+            next(events), 'event: note_removed\ndata: {"id": 3}\n\n'
+        )
+        self.assertEqual(next(events), ": keep-alive\n\n")
+
+        events.close()
+        with patch("services.events.format_event") as mock_format_event:
+            self.broker.publish(1, "note_removed", {"id": 4})
+
+        mock_format_event.assert_not_called()
+
+
+class FakeRedis:
+    """Stand-in for a Redis server offering publish and pattern pubsub"""
+
+    def __init__(self):
+        self.subscribers = []
+
+    def publish(self, channel: str, message: str):
+        """Send a message to every pattern subscriber"""
+        for subscriber in self.subscribers:
+            subscriber.put(
+                {"type": "pmessage", "channel": channel, "data": message}
+            )
+
+    def pubsub(self, ignore_subscribe_messages: bool = False):
+        """Return a new pubsub connection"""
+        return FakePubSub(self, ignore_subscribe_messages)
+
+
+class FakePubSub:
+    """Stand-in for a redis-py PubSub connection"""
+
+    def __init__(self, server: FakeRedis, ignore_subscribe_messages: bool):
+        self.server = server
+        self.messages = queue.Queue()
+        if not ignore_subscribe_messages:
+            self.messages.put({"type": "psubscribe"})
+
+    def psubscribe(self, _pattern: str):
+        """Subscribe to every published message"""
+        self.server.subscribers.append(self.messages)
+
+    def listen(self):
+        """Yield the received messages"""
+        while True:
+            yield self.messages.get()
+
+    def close(self):
+        """Unsubscribe from the server"""
+        self.server.subscribers.remove(self.messages)
+
+
+class TestRemoteEventBrokers(unittest.TestCase):
+    """Tests for brokers sharing events between worker processes"""
+
+    def _assert_shared(self, publisher: EventBroker, receiver: EventBroker):
+        """Test an event published by one worker reaches another"""
+        subscription = receiver.subscribe(1)
+        other_board = receiver.subscribe(2)
+
+        publisher.publish(1, "note_removed", {"id": 3})
+
+        self.assertEqual(
+            subscription.get(timeout=5),
+            'event: note_removed\ndata: {"id": 3}\n\n',
+        )
+        self.assertTrue(other_board.empty())
+
+    def test_sqlite_broker(self):
+        """Test events are shared through an SQLite table"""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        db_url = "sqlite:///" + os.path.join(directory.name, "events.sqlite")
+
+        publisher = SQLiteEventBroker(db_url, poll_interval=0.01)
+        receiver = SQLiteEventBroker(db_url, poll_interval=0.01)
+        for broker in (publisher, receiver):
+            self.addCleanup(broker.engine.dispose)
+            self.addCleanup(broker.close)
+
+        self._assert_shared(publisher, receiver)
+
+    def test_sqlite_broker_skips_earlier_events(self):
+        """Test a first subscriber gets no event published before it"""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        broker = SQLiteEventBroker(
+            "sqlite:///" + os.path.join(directory.name, "events.sqlite"),
+            poll_interval=0.01,
+        )
+        self.addCleanup(broker.engine.dispose)
+        self.addCleanup(broker.close)
+        broker.publish(1, "note_removed", {"id": 3})
+
+        subscription = broker.subscribe(1)
+        broker.publish(1, "note_removed", {"id": 4})
+
+        self.assertEqual(
+            subscription.get(timeout=5),
+            'event: note_removed\ndata: {"id": 4}\n\n',
+        )
+
+    def test_sqlite_broker_drops_expired_events(self):
+        """Test events older than the retention are deleted on send"""
+        broker = SQLiteEventBroker("sqlite://", retention=0)
+        broker.send(1, format_event("note_removed", {"id": 3}))
+        broker.send(1, format_event("note_removed", {"id": 4}))
+
+        with broker.engine.connect() as connection:
+            messages = connection.scalars(select(events_table.c.message)).all()
+
+        self.assertEqual(messages, [format_event("note_removed", {"id": 4})])
+
+    def test_redis_broker(self):
+        """Test events are shared through Redis pattern subscriptions"""
+        server = FakeRedis()
+
+        publisher = RedisEventBroker(client=server)
+        receiver = RedisEventBroker(client=server)
+        receiver.subscribe(3)
+        for _ in range(500):
+            if server.subscribers:
+                break
+            time.sleep(0.01)
+
+        self._assert_shared(publisher, receiver)
+
+    def test_listener_logs_and_backs_off(self):
+        """Test transport errors are logged and retried with a growing
+        wait"""
+        broker = RedisEventBroker(client=FakeRedis())
+        waits = []
+        broker._closed = MagicMock()
+        broker._closed.is_set.side_effect = [False, False, False, True]
+        broker._closed.wait.side_effect = waits.append
+
+        receive = patch.object(
+            broker, "receive", side_effect=ConnectionError("refused")
+        )
+        with receive, self.assertLogs("services.events", "ERROR") as logs:
+            broker._listen()
+
+        self.assertEqual(waits, [1, 2, 4])
+        self.assertEqual(len(logs.records), 3)
+        self.assertIn("refused", logs.output[0])
+
+    def test_remote_broker_is_abstract(self):
+        """Test a broker without a transport cannot be created"""
+        with self.assertRaises(TypeError):
+            RemoteEventBroker()
+
+    def test_create_broker(self):
+        """Test the broker implementation is selected by URL scheme"""
+        self.assertIs(type(create_broker("memory://")), EventBroker)
+        self.assertIsInstance(create_broker("sqlite://"), SQLiteEventBroker)
+        with self.assertRaises(ValueError):
+            create_broker("kafka://localhost")
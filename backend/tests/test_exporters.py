@@ -0,0 +1,97 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test exporters"""
+
+import json
+import unittest
+
+from services.exporters import (
+    buffered,
+    render_csv,
+    render_json,
+    render_markdown,
+    render_ndjson,
+)
+
+ROWS = [
+    ("Went well", "Good"),
+    ("Too many\nmeetings", "Bad"),
+    ("Pair more", "Good"),
+]
+
+
+class TestExporters(unittest.TestCase):
+    """Tests for Exporters"""
+
+    def test_buffered(self):
+        """Test small chunks are joined up to the buffer size"""
+        chunks = list(buffered(iter(["ab", "cd", "ef", "g"]), size=4))
+        self.assertEqual(chunks, ["abcd", "efg"])
+
+    def test_render_json(self):
+        """Test JSON export matches the indented export document"""
+        expected_json = {
+            "board_name": "Retro",
+            "notes": [
+                {"description": description, "category": category}
+                for description, category in ROWS
+            ],
+        }
+
+        result = "".join(render_json("Retro", iter(ROWS)))
+
+        self.assertEqual(result, json.dumps(expected_json, indent=2))
+
+    def test_render_ndjson(self):
+        """Test NDJSON export writes the board name and one note per line"""
+        lines = "".join(render_ndjson("Retro", iter(ROWS))).splitlines()
+
+        self.assertEqual(json.loads(lines[0]), {"board_name": "Retro"})
+        self.assertEqual(
+            [json.loads(line) for line in lines[1:]],
+            [
+                {"description": description, "category": category}
+                for description, category in ROWS
+            ],
+        )
+
+    def test_render_csv(self):
+        """Test CSV export writes a header and one record per note"""
+        result = "".join(render_csv("Retro", iter(ROWS)))
+
+        self.assertEqual(
+            result,
+            "description,category\r\n"
+            "Went well,Good\r\n"
+            '"Too many\nmeetings",Bad\r\n'
+            "Pair more,Good\r\n",
+        )
+
+    def test_render_markdown(self):
+        """Test Markdown export lays out one column per category"""
+        result = "".join(render_markdown("Retro", iter(ROWS)))
+
+        self.assertEqual(
+            result,
+            "# Retro\n\n"
+            "| Good | Bad |\n"
+            "|-|-|\n"
+            "| Went well | Too many<br>meetings |\n"
+            "| Pair more |  |\n",
+        )
+
+    def test_render_markdown_empty_board(self):
+        """Test Markdown export of a board without notes"""
+        result = "".join(render_markdown("Retro", iter([])))
+
+        self.assertEqual(result, "# Retro\n\n")
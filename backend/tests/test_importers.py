@@ -0,0 +1,106 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test importers"""
+
+import io
+import unittest
+
+from services.exporters import render_json, render_ndjson
+from services.importers import (
+    InvalidImport,
+    parse_json,
+    parse_ndjson,
+    spooled_import,
+)
+
+ROWS = [
+    ("Went well", "Good"),
+    ("Too many\nmeetings", "Bad"),
+    ("Pair more", "Good"),
+]
+
+
+def export_stream(render) -> io.BytesIO:
+    """Render the rows as an export and return it as a request stream"""
+    return io.BytesIO("".join(render("Retro", ROWS)).encode())
+
+
+class TestImporters(unittest.TestCase):
+    """Tests for Importers"""
+
+    def test_parse_json(self):
+        """Test the JSON export is parsed back into its rows"""
+        board_name, rows = parse_json(export_stream(render_json))
+
+        self.assertEqual(board_name, "Retro")
+        self.assertEqual(list(rows), ROWS)
+
+    def test_parse_ndjson(self):
+        """Test the NDJSON export is parsed back into its rows"""
+        board_name, rows = parse_ndjson(export_stream(render_ndjson))
+
+        self.assertEqual(board_name, "Retro")
+        self.assertEqual(list(rows), ROWS)
+
+    def test_parse_ndjson_is_lazy(self):
+        """Test NDJSON notes are only decoded when they are consumed"""
+        stream = io.BytesIO(b'{"board_name": "Retro"}\nnot json\n')
+
+        board_name, rows = parse_ndjson(stream)
+
+        self.assertEqual(board_name, "Retro")
+        with self.assertRaises(InvalidImport):
+            next(rows)
+
+    def test_parse_invalid(self):
+        """Test invalid exports raise InvalidImport"""
+        cases = [
+            (parse_json, b"{"),
+            (parse_json, b"[]"),
+            (parse_json, b'{"board_name": "Retro", "notes": {}}'),
+            (parse_ndjson, b""),
+            (parse_ndjson, b'{"name": "Retro"}\n'),
+        ]
+        for parse, data in cases:
+            with self.subTest(data=data), self.assertRaises(InvalidImport):
+                parse(io.BytesIO(data))
+
+    def test_parse_invalid_note(self):
+        """Test notes without a description or category are rejected"""
+        data = b'{"board_name": "Retro", "notes": [{"description": "x"}]}'
+
+        _, rows = parse_json(io.BytesIO(data))
+
+        with self.assertRaises(InvalidImport):
+            list(rows)
+
+    def test_spooled_import(self):
+        """Test an upload is read to its end before the rows are yielded"""
+        stream = export_stream(render_ndjson)
+
+        with spooled_import(parse_ndjson, stream) as (board_name, rows):
+            self.assertEqual(stream.read(), b"")
+            self.assertEqual(board_name, "Retro")
+            self.assertEqual(list(rows), ROWS)
+
+    def test_spooled_import_invalid_note(self):
+        """Test an invalid note is rejected before any row is yielded"""
+        stream = io.BytesIO(
+            b'{"board_name": "Retro"}\n'
+            b'{"description": "x", "category": "Good"}\n'
+            b"not json\n"
+        )
+
+        rejected = self.assertRaises(InvalidImport)
+        with rejected, spooled_import(parse_ndjson, stream):
+            self.fail("The rows of an invalid upload were yielded")
@@ -12,11 +12,14 @@
 
 """Test routes"""
 
+import json
 import unittest
 from unittest.mock import patch
 
 from app import create_app
 from custom_types.api_response import ApiResponse
+from services.events import EventBroker
+from tests import ServicesTestCase
 
 
 class TestRoutes(unittest.TestCase):
@@ -39,6 +42,93 @@ class TestRoutes(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.get_json(), mock_json)
 
+    @patch("routes.api_routes.get_boards")
+    def test_get_boards_page(self, mock_get_boards):
+        """Test GET request to boards endpoint with a limit and cursor"""
+        mock_json = {"boards": [{"id": 6, "name": "test"}], "next_cursor": 6}
+        mock_get_boards.return_value = ApiResponse(
+            response=mock_json, status_code=200
+        )
+
+        response = self.client.get("/api/boards/?limit=1&cursor=5")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json(), mock_json)
+        mock_get_boards.assert_called_once_with(1, 5)
+
+    @patch("routes.api_routes.get_boards")
+    def test_get_boards_invalid_limit(self, mock_get_boards):
+        """Test GET request to boards endpoint with a too large limit"""
+        response = self.client.get("/api/boards/?limit=501")
+        self.assertEqual(response.status_code, 400)
+        mock_get_boards.assert_not_called()
+
+    @patch("routes.api_routes.import_board")
+    def test_import_board(self, mock_import_board):
+        """Test POST request to board import endpoint"""
+        mock_json = {"status": "Success", "board_id": 2, "note_count": 1}
+        mock_import_board.return_value = ApiResponse(
+            response=mock_json, status_code=200
+        )
+
+        response = self.client.post(
+            "/api/boards/import",
+            data=b'{"board_name": "Retro"}\n'
+            b'{"description": "Went well", "category": "Good"}\n',
+            content_type="application/x-ndjson",
+        )
+        self.assertEqual(response.get_json(), mock_json)
+        self.assertEqual(response.status_code, 200)
+        board_name, _ = mock_import_board.call_args.args
+        self.assertEqual(board_name, "Retro")
+
+    @patch("routes.api_routes.import_board")
+    def test_import_board_invalid(self, mock_import_board):
+        """Test POST request to board import endpoint with a bad export"""
+        response = self.client.post("/api/boards/import", json={"notes": []})
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.post(
+            "/api/boards/import",
+            data=b'{"board_name": "Retro"}\nnot json\n',
+            content_type="application/x-ndjson",
+        )
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.post(
+            "/api/boards/import", data="a,b", content_type="text/csv"
+        )
+        self.assertEqual(response.status_code, 415)
+        mock_import_board.assert_not_called()
+
+    @patch("routes.api_routes.get_boards_revision")
+    @patch("routes.api_routes.get_boards")
+    def test_get_boards_etag(self, mock_get_boards, mock_get_boards_revision):
+        """Test GET request to boards endpoint returns an ETag"""
+        mock_get_boards.return_value = ApiResponse(
+            response=[], status_code=200
+        )
+        mock_get_boards_revision.return_value = 5
+
+        response = self.client.get("/api/boards/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["ETag"], '"boards-5"')
+
+    @patch("routes.api_routes.get_boards_revision")
+    @patch("routes.api_routes.get_boards")
+    def test_get_boards_not_modified(
+        self, mock_get_boards, mock_get_boards_revision
+    ):
+        """Test GET request to boards endpoint with a matching ETag"""
+        mock_get_boards_revision.return_value = 5
+
+        response = self.client.get(
+            "/api/boards/", headers={"If-None-Match": '"boards-5"'}
+        )
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.headers["ETag"], '"boards-5"')
+        self.assertEqual(response.get_data(), b"")
+        mock_get_boards.assert_not_called()
+
     @patch("routes.api_routes.add_board")
     def test_post_boards_success(self, mock_add_board):
         """Test POST request to boards endpoint"""
@@ -88,8 +178,12 @@ class TestRoutes(unittest.TestCase):
         self.assertEqual(response.status_code, 500)
 
     @patch("routes.api_routes.get_notes_for_export")
-    def test_get_boardsexport(self, mock_get_notes_for_export):
+    @patch("routes.api_routes.get_board_name_from_id")
+    def test_get_boardsexport(
+        self, mock_get_board_name_from_id, mock_get_notes_for_export
+    ):
         """Test GET request to boards/export endpoint"""
+        mock_get_board_name_from_id.return_value = "Test Board"
         mock_json = {
             "board_name": "Test Board",
             "notes": [{"description": "Test note", "category": 11}],
@@ -99,6 +193,193 @@ class TestRoutes(unittest.TestCase):
         response = self.client.get("/api/boards/export")
         self.assertEqual(response.get_json(), mock_json)
 
+    @patch("routes.api_routes.iter_export_rows")
+    @patch("routes.api_routes.get_board_name_from_id")
+    def test_get_boardsexport_stream(
+        self, mock_get_board_name_from_id, mock_iter_export_rows
+    ):
+        """Test GET request to boards/export endpoint in streaming mode"""
+        mock_get_board_name_from_id.return_value = "Test Board"
+        mock_iter_export_rows.return_value = iter(
+            [("Test note", "Good"), ("Other note", "Bad")]
+        )
+        expected_json = {
+            "board_name": "Test Board",
+            "notes": [
+                {"description": "Test note", "category": "Good"},
+                {"description": "Other note", "category": "Bad"},
+            ],
+        }
+
+        response = self.client.get("/api/boards/export?board_id=1&stream=1")
+        self.assertTrue(response.is_streamed)
+        self.assertEqual(
+            response.get_data(as_text=True),
+            json.dumps(expected_json, indent=2),
+        )
+
+    @patch("routes.api_routes.iter_export_rows")
+    @patch("routes.api_routes.get_board_name_from_id")
+    def test_get_boardsexport_stream_empty_board(
+        self, mock_get_board_name_from_id, mock_iter_export_rows
+    ):
+        """Test streamed export of a board without notes"""
+        mock_get_board_name_from_id.return_value = "Test Board"
+        mock_iter_export_rows.return_value = iter([])
+
+        response = self.client.get("/api/boards/export?board_id=1&stream=1")
+        self.assertEqual(
+            response.get_data(as_text=True),
+            json.dumps({"board_name": "Test Board", "notes": []}, indent=2),
+        )
+
+    @patch("routes.api_routes.get_notes_for_export")
+    @patch("routes.api_routes.iter_export_rows")
+    @patch("routes.api_routes.get_board_name_from_id")
+    def test_get_boardsexport_board_not_found(
+        self,
+        mock_get_board_name_from_id,
+        mock_iter_export_rows,
+        mock_get_notes_for_export,
+    ):
+        """Test export where board cannot be found, in every format"""
+        mock_get_board_name_from_id.return_value = ""
+
+        for query in ("", "&stream=1", "&format=csv", "&format=markdown"):
+            with self.subTest(query=query):
+                response = self.client.get(
+                    f"/api/boards/export?board_id=1{query}"
+                )
+                self.assertEqual(response.status_code, 404)
+                self.assertEqual(
+                    response.get_json(), {"status": "Board not found"}
+                )
+        mock_iter_export_rows.assert_not_called()
+        mock_get_notes_for_export.assert_not_called()
+
+    @patch("routes.api_routes.iter_export_rows")
+    @patch("routes.api_routes.get_board_name_from_id")
+    def test_get_boardsexport_format_csv(
+        self, mock_get_board_name_from_id, mock_iter_export_rows
+    ):
+        """Test GET request to boards/export endpoint as CSV"""
+        mock_get_board_name_from_id.return_value = "Test Board"
+        mock_iter_export_rows.return_value = iter([("Test note", "Good")])
+
+        response = self.client.get("/api/boards/export?board_id=1&format=csv")
+        self.assertEqual(response.mimetype, "text/csv")
+        self.assertIn(".csv", response.headers["Content-Disposition"])
+        self.assertEqual(
+            response.get_data(as_text=True),
+            "description,category\r\nTest note,Good\r\n",
+        )
+        mock_iter_export_rows.assert_called_once_with(1)
+
+    @patch("routes.api_routes.iter_export_rows")
+    @patch("routes.api_routes.get_board_name_from_id")
+    def test_get_boardsexport_format_markdown(
+        self, mock_get_board_name_from_id, mock_iter_export_rows
+    ):
+        """Test GET request to boards/export endpoint as Markdown"""
+        mock_get_board_name_from_id.return_value = "Test Board"
+        mock_iter_export_rows.return_value = iter([("Test note", "Good")])
+
+        response = self.client.get(
+            "/api/boards/export?board_id=1&format=markdown"
+        )
+        self.assertEqual(response.mimetype, "text/markdown")
+        self.assertIn(".md", response.headers["Content-Disposition"])
+        self.assertEqual(
+            response.get_data(as_text=True),
+            "# Test Board\n\n| Good |\n|-|\n| Test note |\n",
+        )
+
+    def test_get_boardsexport_format_invalid(self):
+        """Test GET request to boards/export endpoint with unknown format"""
+        response = self.client.get("/api/boards/export?board_id=1&format=xml")
+        self.assertEqual(response.status_code, 400)
+
+    @patch("services.services.broker", new_callable=EventBroker)
+    @patch("routes.api_routes.get_board_name_from_id")
+    def test_get_board_events(self, mock_get_board_name_from_id, mock_broker):
+        """Test GET request to the board events stream"""
+        mock_get_board_name_from_id.return_value = "Test Board"
+
+        response = self.client.get("/api/boards/1/events", buffered=False)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, "text/event-stream")
+
+        events = response.iter_encoded()
+        self.assertEqual(next(events), b": connected\n\n")
+        mock_broker.publish(1, "note_removed", {"revision": 2, "id": 3})
+        self.assertEqual(
+            next(events),
+            b'event: note_removed\ndata: {"revision": 2, "id": 3}\n\n',
+        )
+        response.close()
+
+    @patch("routes.api_routes.get_board_name_from_id")
+    def test_get_board_events_board_not_found(
+        self, mock_get_board_name_from_id
+    ):
+        """Test GET request to the events stream of a missing board"""
+        mock_get_board_name_from_id.return_value = ""
+
+        response = self.client.get("/api/boards/1/events")
+        self.assertEqual(response.status_code, 404)
+
+    @patch("routes.api_routes.get_board_revision")
+    @patch("routes.api_routes.get_board_snapshot")
+    def test_get_board_snapshot(
+        self, mock_get_board_snapshot, mock_get_board_revision
+    ):
+        """Test GET request to the board snapshot endpoint"""
+        mock_json = {
+            "board": {
+                "id": 1,
+                "name": "Board",
+                "revision": 8,
+                "note_count": 1,
+            },
+            "categories": [{"id": 1, "name": "Good", "note_count": 1}],
+            "notes": [
+                {"id": 1, "description": "test", "category": 1, "tags": []}
+            ],
+        }
+        mock_get_board_snapshot.return_value = ApiResponse(
+            response=mock_json, status_code=200
+        )
+        mock_get_board_revision.return_value = 7
+
+        response = self.client.get("/api/boards/1/snapshot")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json(), mock_json)
+        # Stamped with the revision the snapshot was read at
+        self.assertEqual(response.headers["ETag"], '"snapshot-1-8"')
+
+    @patch("routes.api_routes.get_board_revision")
+    @patch("routes.api_routes.get_board_snapshot")
+    def test_get_board_snapshot_not_modified(
+        self, mock_get_board_snapshot, mock_get_board_revision
+    ):
+        """Test GET request to the board snapshot with a matching ETag"""
+        mock_get_board_revision.return_value = 7
+
+        response = self.client.get(
+            "/api/boards/1/snapshot",
+            headers={"If-None-Match": '"snapshot-1-7"'},
+        )
+        self.assertEqual(response.status_code, 304)
+        mock_get_board_snapshot.assert_not_called()
+
+    @patch("routes.api_routes.get_board_revision")
+    def test_get_board_snapshot_board_not_found(self, mock_get_board_revision):
+        """Test GET request to the snapshot of a missing board"""
+        mock_get_board_revision.return_value = None
+
+        response = self.client.get("/api/boards/1/snapshot")
+        self.assertEqual(response.status_code, 404)
+
     @patch("routes.api_routes.get_notes")
     def test_get_notes_success(self, mock_get_notes):
         """Test GET request to notes endpoint"""
@@ -113,6 +394,71 @@ class TestRoutes(unittest.TestCase):
         self.assertEqual(response.get_json(), mock_json)
         self.assertEqual(response.status_code, 200)
 
+    @patch("routes.api_routes.get_notes")
+    def test_get_notes_page(self, mock_get_notes):
+        """Test GET request to notes endpoint with a limit and cursor"""
+        mock_json = {"notes": [], "next_cursor": None}
+        mock_get_notes.return_value = ApiResponse(
+            response=mock_json, status_code=200
+        )
+
+        response = self.client.get("/api/notes/?board_id=1&limit=50&cursor=9")
+        self.assertEqual(response.get_json(), mock_json)
+        self.assertEqual(response.status_code, 200)
+        mock_get_notes.assert_called_once_with(1, 50, 9)
+
+    @patch("routes.api_routes.get_board_revision")
+    @patch("routes.api_routes.get_notes")
+    def test_get_notes_not_modified(
+        self, mock_get_notes, mock_get_board_revision
+    ):
+        """Test GET request to notes endpoint with a matching ETag"""
+        mock_get_board_revision.return_value = 7
+
+        response = self.client.get(
+            "/api/notes/?board_id=1", headers={"If-None-Match": '"notes-1-7"'}
+        )
+        self.assertEqual(response.status_code, 304)
+        mock_get_notes.assert_not_called()
+
+    @patch("routes.api_routes.get_board_revision")
+    @patch("routes.api_routes.get_notes")
+    def test_get_notes_modified(self, mock_get_notes, mock_get_board_revision):
+        """Test GET request to notes endpoint with an outdated ETag"""
+        mock_json = [
+            {"id": 1, "description": "test", "category": 1, "tags": []}
+        ]
+        mock_get_notes.return_value = ApiResponse(
+            response=mock_json, status_code=200
+        )
+        mock_get_board_revision.return_value = 8
+
+        response = self.client.get(
+            "/api/notes/?board_id=1", headers={"If-None-Match": '"notes-1-7"'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["ETag"], '"notes-1-8"')
+        self.assertEqual(response.get_json(), mock_json)
+
+    @patch("routes.api_routes.get_note_changes")
+    def test_get_notes_since_success(self, mock_get_note_changes):
+        """Test GET request to notes endpoint with a since revision"""
+        mock_json = {
+            "revision": 5,
+            "notes": [
+                {"id": 1, "description": "test", "category": 1, "tags": []}
+            ],
+            "deleted": [2],
+        }
+        mock_get_note_changes.return_value = ApiResponse(
+            response=mock_json, status_code=200
+        )
+
+        response = self.client.get("/api/notes/?board_id=1&since=3")
+        self.assertEqual(response.get_json(), mock_json)
+        self.assertEqual(response.status_code, 200)
+        mock_get_note_changes.assert_called_once_with(1, 3)
+
     @patch("routes.api_routes.add_note")
     def test_post_notes_success(self, mock_add_note):
         """Test POST request to notes endpoint"""
@@ -153,6 +499,63 @@ class TestRoutes(unittest.TestCase):
         self.assertEqual(response.get_json(), mock_json)
         self.assertEqual(response.status_code, 500)
 
+    @patch("routes.api_routes.add_notes")
+    def test_post_notes_bulk_success(self, mock_add_notes):
+        """Test POST request to bulk notes endpoint"""
+        mock_json = {"status": "Success", "note_ids": [1, 2]}
+        mock_add_notes.return_value = ApiResponse(
+            response=mock_json, status_code=200
+        )
+        notes = [
+            {"description": "first", "category": 1, "board_id": 1},
+            {"description": "second", "category": 2, "board_id": 1},
+        ]
+
+        response = self.client.post("/api/notes/bulk", json=notes)
+        self.assertEqual(response.get_json(), mock_json)
+        self.assertEqual(response.status_code, 200)
+        mock_add_notes.assert_called_once_with(notes)
+
+    @patch("routes.api_routes.add_notes")
+    def test_post_notes_bulk_invalid(self, mock_add_notes):
+        """Test POST request to bulk notes endpoint with invalid notes"""
+        for body in (
+            [{"description": "test", "board_id": 1}],
+            {"description": "test", "category": 1, "board_id": 1},
+            [],
+        ):
+            response = self.client.post("/api/notes/bulk", json=body)
+            self.assertEqual(response.status_code, 400)
+        mock_add_notes.assert_not_called()
+
+    @patch("routes.api_routes.modify_notes")
+    def test_patch_notes_bulk(self, mock_modify_notes):
+        """Test PATCH request to bulk notes endpoint"""
+        mock_json = {
+            "status": "Success",
+            "results": [
+                {"id": 1, "status": "Success"},
+                {"id": 2, "status": "Note not found"},
+            ],
+        }
+        mock_modify_notes.return_value = ApiResponse(
+            response=mock_json, status_code=200
+        )
+        changes = [{"id": 1, "category": 3}, {"id": 2, "tags": ["a"]}]
+
+        response = self.client.patch("/api/notes/bulk", json=changes)
+        self.assertEqual(response.get_json(), mock_json)
+        self.assertEqual(response.status_code, 200)
+        mock_modify_notes.assert_called_once_with(changes)
+
+    @patch("routes.api_routes.modify_notes")
+    def test_patch_notes_bulk_invalid(self, mock_modify_notes):
+        """Test PATCH request to bulk notes endpoint with invalid changes"""
+        for body in ([{"category": 3}], [{"id": 1, "tags": "a"}], []):
+            response = self.client.patch("/api/notes/bulk", json=body)
+            self.assertEqual(response.status_code, 400)
+        mock_modify_notes.assert_not_called()
+
     @patch("routes.api_routes.remove_note")
     def test_delete_notes_success(self, mock_remove_note):
         """Test DELETE request to notes endpoint"""
@@ -245,6 +648,21 @@ class TestRoutes(unittest.TestCase):
         self.assertEqual(response.get_json(), mock_json)
         self.assertEqual(response.status_code, 200)
 
+    @patch("routes.api_routes.get_board_revision")
+    @patch("routes.api_routes.get_categories")
+    def test_get_categories_not_modified(
+        self, mock_get_categories, mock_get_board_revision
+    ):
+        """Test GET request to categories endpoint with a matching ETag"""
+        mock_get_board_revision.return_value = 7
+
+        response = self.client.get(
+            "/api/categories/?board_id=1",
+            headers={"If-None-Match": '"categories-1-7"'},
+        )
+        self.assertEqual(response.status_code, 304)
+        mock_get_categories.assert_not_called()
+
     @patch("routes.api_routes.add_category")
     def test_post_categories_success(self, mock_add_category):
         """Test POST request to categories endpoint"""
@@ -318,6 +736,20 @@ class TestRoutes(unittest.TestCase):
         self.assertEqual(response.get_json(), mock_json)
         self.assertEqual(response.status_code, 200)
 
+    @patch("routes.api_routes.get_settings_revision")
+    @patch("routes.api_routes.get_settings")
+    def test_get_settings_not_modified(
+        self, mock_get_settings, mock_get_settings_revision
+    ):
+        """Test GET request to settings endpoint with a matching ETag"""
+        mock_get_settings_revision.return_value = 3
+
+        response = self.client.get(
+            "/api/settings/", headers={"If-None-Match": '"settings-3"'}
+        )
+        self.assertEqual(response.status_code, 304)
+        mock_get_settings.assert_not_called()
+
     @patch("routes.api_routes.modify_setting")
     def test_put_settings_success(self, mock_modify_setting):
         """Test PUT request to modify a setting endpoint"""
@@ -345,3 +777,86 @@ class TestRoutes(unittest.TestCase):
         )
         self.assertEqual(response.get_json(), mock_json)
         self.assertEqual(response.status_code, 500)
+
+    @patch("routes.api_routes.get_stats")
+    def test_get_stats(self, mock_get_stats):
+        """Test GET request to the internal stats endpoint"""
+        mock_json = {"pool": {"checkouts": 3, "checkins": 3}}
+        mock_get_stats.return_value = ApiResponse(
+            response=mock_json, status_code=200
+        )
+
+        response = self.client.get("/api/internal/stats")
+        self.assertEqual(response.get_json(), mock_json)
+        self.assertEqual(response.status_code, 200)
+
+
+class TestRoutesDatabase(ServicesTestCase):
+    """Route tests against the test database, so the arguments parsed by
+    the routes reach the database of TEST_DATABASE_URL"""
+
+    def setUp(self):
+        """Create the test client over the test database with a board,
+        categories and notes"""
+        self.client = create_app(testing=True).test_client()
+        super().setUp()
+        self.board_id, self.category_ids = self.create_board()
+        self.create_notes(self.board_id, self.category_ids, 2)
+
+    def test_delete_category(self):
+        """Test DELETE request to categories endpoint removes the category
+        and its notes"""
+        response = self.client.delete(
+            f"/api/categories/?category_id={self.category_ids[0]}"
+        )
+
+        self.assertEqual(response.get_json(), {"status": "Success"})
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(f"/api/notes/?board_id={self.board_id}")
+        self.assertEqual(
+            [note["category"] for note in response.get_json()],
+            self.category_ids[1:],
+        )
+
+    def test_delete_category_not_found(self):
+        """Test DELETE request to categories endpoint with a missing or
+        invalid category id"""
+        response = self.client.delete("/api/categories/?category_id=999")
+        self.assertEqual(response.status_code, 404)
+
+        for query in ("", "?category_id=abc"):
+            with self.subTest(query=query):
+                response = self.client.delete(f"/api/categories/{query}")
+                self.assertEqual(response.status_code, 400)
+
+    def test_post_long_names(self):
+        """Test boards, categories and notes keep names and descriptions
+        longer than the former 30 character columns"""
+        name, description = "Board " * 20, "Note " * 200
+
+        response = self.client.post("/api/boards/", json={"name": name})
+        self.assertEqual(response.status_code, 200)
+        board_id = response.get_json()["board_id"]
+        response = self.client.post(
+            "/api/categories/", json={"name": name, "board_id": board_id}
+        )
+        self.assertEqual(response.status_code, 200)
+        category_id = self.client.get(
+            f"/api/categories/?board_id={board_id}"
+        ).get_json()[0]["id"]
+        response = self.client.post(
+            "/api/notes/",
+            json={
+                "description": description,
+                "category": category_id,
+                "board_id": board_id,
+            },
+        )
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.get(f"/api/boards/{board_id}/snapshot")
+        self.assertEqual(response.get_json()["board"]["name"], name)
+        self.assertEqual(response.get_json()["categories"][0]["name"], name)
+        self.assertEqual(
+            response.get_json()["notes"][0]["description"], description
+        )
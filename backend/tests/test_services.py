@@ -15,47 +15,69 @@
 import unittest
 from unittest.mock import ANY, MagicMock, patch
 
+from sqlalchemy import Integer, delete, event, insert, text, update
+from sqlalchemy.dialects.postgresql import psycopg
 from sqlalchemy.exc import DatabaseError
+from sqlalchemy.orm import Session
 
+from database.database_handler import bump_revision
+from database.models import Board, Category, Note, Revision, Setting
+from services.cache import LRUCache, LRURevisionCache, RevisionCache
+from services.importers import InvalidImport
 from services.services import (
     add_board,
     add_category,
     add_note,
+    add_notes,
     get_board_name_from_id,
+    get_board_revision,
+    get_board_snapshot,
     get_boards,
+    get_boards_revision,
     get_categories,
+    get_category_name_from_id,
+    get_note_changes,
     get_notes,
     get_notes_for_export,
     get_settings,
+    get_settings_revision,
+    get_stats,
+    import_board,
+    iter_export_rows,
+    load_board_name,
+    load_board_revision,
+    load_board_state,
+    load_category_name,
+    load_settings,
+    load_settings_revision,
     modify_note_category,
     modify_note_tags,
+    modify_notes,
     modify_setting,
     remove_board,
     remove_category,
     remove_note,
 )
+from tests import ServicesTestCase
 
 
 class TestServices(unittest.TestCase):
     """Tests for Services"""
 
-    @patch("services.services.get_note_count_on_board")
     @patch("services.services.db")
-    def test_get_boards_success(self, mock_database_handler, mock_get_count):
+    def test_get_boards_success(self, mock_database_handler):
         """Test get boards"""
         mock_session = MagicMock()
 
         mock_board = MagicMock()
         mock_board.id = 10
         mock_board.name = "Test Board"
+        mock_board.note_count = 3
 
-        mock_query = mock_session.query.return_value
-        mock_query.all.return_value = [mock_board]
+        mock_session.execute.return_value.all.return_value = [mock_board]
 
         mock_database_handler.get_session.return_value.__enter__.return_value = mock_session
 
-        mock_get_count.return_value = [(10, 3)]
-
         resp = get_boards()
 
         expected_json = [{"id": 10, "name": "Test Board", "note_count": 3}]
@@ -63,43 +85,31 @@ class TestServices(unittest.TestCase):
         self.assertEqual(resp.response, expected_json)
         self.assertEqual(resp.status_code, 200)
 
+    @patch("services.services.board_names", LRUCache(load_board_name, size=0))
     @patch("services.services.db")
     def test_get_board_name_from_id_success(self, mock_database_handler):
         """Test get board name from id"""
         mock_session = MagicMock()
-
-        mock_board = MagicMock()
-        mock_board.id = 10
-        mock_board.name = "Test Board"
-
-        mock_filter = MagicMock()
-        mock_filter.first.return_value = mock_board
-
-        mock_query = mock_session.query.return_value
-        mock_query.filter.return_value = mock_filter
+        mock_session.scalar.return_value = "Test Board"
 
         mock_database_handler.get_session.return_value.__enter__.return_value = mock_session
 
-        result = get_board_name_from_id(ANY)
+        result = get_board_name_from_id(10)
 
-        self.assertEqual(result, mock_board.name)
+        self.assertEqual(result, "Test Board")
 
+    @patch("services.services.board_names", LRUCache(load_board_name, size=0))
     @patch("services.services.db")
     def test_get_board_name_from_id_failure_board_not_found(
         self, mock_database_handler
     ):
         """Test get board name from id where board not found"""
         mock_session = MagicMock()
-
-        mock_filter = MagicMock()
-        mock_filter.first.return_value = None
-
-        mock_query = mock_session.query.return_value
-        mock_query.filter.return_value = mock_filter
+        mock_session.scalar.return_value = None
 
         mock_database_handler.get_session.return_value.__enter__.return_value = mock_session
 
-        result = get_board_name_from_id(ANY)
+        result = get_board_name_from_id(10)
 
         self.assertEqual(result, "")
 
@@ -219,13 +229,11 @@ class TestServices(unittest.TestCase):
         mock_note.category = 10
         mock_note.tags = []
 
-        mock_query = mock_session.query.return_value
-
-        mock_query.where.return_value = [mock_note]
+        mock_session.execute.return_value = [mock_note]
 
         mock_database_handler.get_session.return_value.__enter__.return_value = mock_session
 
-        resp = get_notes(ANY)
+        resp = get_notes(1)
         expected_json = [
             {"id": 10, "description": "Test Note", "category": 10, "tags": []}
         ]
@@ -233,39 +241,53 @@ class TestServices(unittest.TestCase):
         self.assertEqual(resp.response, expected_json)
         self.assertEqual(resp.status_code, 200)
 
-    @patch("services.services.get_board_name_from_id")
     @patch("services.services.db")
-    def test_get_notes_for_export(
-        self, mock_database_handler, mock_get_board_name_from_id
-    ):
+    def test_get_notes_for_export(self, mock_database_handler):
         """Test get notes for export"""
         mock_session = MagicMock()
-
-        mock_note = MagicMock()
-        mock_note.description = "Test Note"
-        mock_note.category = 10
-        mock_get_board_name_from_id.return_value = "Sample Board"
-
-        mock_query = mock_session.query.return_value
-        mock_query.where.return_value = [mock_note]
+        mock_session.execute.return_value.all.return_value = [
+            ("Sample Board", 1, "Test Note", "Test Category")
+        ]
 
         mock_database_handler.get_session.return_value.__enter__.return_value = mock_session
 
         result = get_notes_for_export(ANY)
         expected_json = {
             "board_name": "Sample Board",
-            "notes": [{"description": "Test Note", "category": 10}],
+            "notes": [
+                {"description": "Test Note", "category": "Test Category"}
+            ],
         }
 
         self.assertEqual(result, expected_json)
+        mock_session.execute.assert_called_once()
 
-    @patch("services.services.get_board_name_from_id")
-    def test_get_notes_for_export_empty_board_name(
-        self, mock_get_board_name_from_id
-    ):
+    @patch("services.services.db")
+    def test_get_notes_for_export_empty_board(self, mock_database_handler):
+        """Test get notes for export where board has no notes"""
+        mock_session = MagicMock()
+        mock_session.execute.return_value.all.return_value = [
+            ("Sample Board", None, None, None)
+        ]
+
+        session_context = mock_database_handler.get_session.return_value
+        session_context.__enter__.return_value = mock_session
+
+        result = get_notes_for_export(ANY)
+
+        self.assertEqual(result, {"board_name": "Sample Board", "notes": []})
+
+    @patch("services.services.db")
+    def test_get_notes_for_export_board_not_found(self, mock_database_handler):
         """Test get notes for export where board cannot be found"""
-        mock_get_board_name_from_id.return_value = ""
+        mock_session = MagicMock()
+        mock_session.execute.return_value.all.return_value = []
+
+        session_context = mock_database_handler.get_session.return_value
+        session_context.__enter__.return_value = mock_session
+
         result = get_notes_for_export(ANY)
+
         self.assertEqual(result, {})
 
     @patch("services.services.Note")
@@ -316,93 +338,96 @@ class TestServices(unittest.TestCase):
         mock_session.add.assert_called_once_with(mock_note)
         mock_session.commit.assert_called_once()
 
-    @patch("services.services.Note")
     @patch("services.services.db")
-    def test_remove_note_success(self, mock_database_handler, mock_note_class):
+    def test_remove_note_success(self, mock_database_handler):
         """Test remove note success"""
         mock_session = MagicMock()
-        mock_note = MagicMock()
-        mock_session.get.return_value = mock_note
 
         mock_database_handler.get_session.return_value.__enter__.return_value = mock_session
 
-        resp = remove_note(ANY)
+        resp = remove_note(1)
 
         self.assertEqual(resp.response, {"status": "Success"})
         self.assertEqual(resp.status_code, 200)
 
-        mock_session.get.assert_called_once_with(mock_note_class, ANY)
-        mock_session.delete.assert_called_once_with(mock_note)
+        # Board and boards revisions, delete and tombstone, without loading
+        # the note
+        self.assertEqual(mock_session.execute.call_count, 4)
+        mock_session.get.assert_not_called()
         mock_session.commit.assert_called_once()
 
-    @patch("services.services.Note")
     @patch("services.services.db")
-    def test_remove_note_failure_not_found(
-        self, mock_database_handler, mock_note_class
-    ):
+    def test_remove_note_failure_not_found(self, mock_database_handler):
         """Ttest remove note where note not found"""
         mock_session = MagicMock()
 
         mock_database_handler.get_session.return_value.__enter__.return_value = mock_session
 
-        mock_session.get.return_value = None
+        mock_session.execute.return_value.one_or_none.return_value = None
 
-        resp = remove_note(ANY)
+        resp = remove_note(1)
 
         self.assertEqual(resp.response, {"status": "Note not found"})
         self.assertEqual(resp.status_code, 404)
 
-        mock_session.get.assert_called_once_with(mock_note_class, ANY)
+        mock_session.execute.assert_called_once()
+        mock_session.commit.assert_not_called()
 
-    @patch("services.services.Note")
     @patch("services.services.db")
-    def test_remove_note_failure_database_error(
-        self, mock_database_handler, mock_note_class
-    ):
+    def test_remove_note_failure_database_error(self, mock_database_handler):
         """Test remove note success"""
         mock_session = MagicMock()
-        mock_note = MagicMock()
-        mock_session.get.return_value = mock_note
 
         mock_database_handler.get_session.return_value.__enter__.return_value = mock_session
 
-        mock_session.get.side_effect = DatabaseError(
+        mock_session.execute.side_effect = DatabaseError(
             "statement", {}, Exception("Error")
         )
 
-        resp = remove_note(ANY)
+        resp = remove_note(1)
 
         self.assertIn("DB Error", resp.response["status"])  # type: ignore
         self.assertEqual(resp.status_code, 500)
 
-        mock_session.get.assert_called_once_with(mock_note_class, ANY)
         mock_session.rollback.assert_called_once()
 
     @patch("services.services.db")
     def test_modify_note_category_success(self, mock_database_handler):
         """Test modify note category"""
         mock_session = MagicMock()
-        mock_note = MagicMock()
         mock_database_handler.get_session.return_value.__enter__.return_value = mock_session
 
-        mock_scalars = MagicMock()
-        mock_scalars.one.return_value = mock_note
-        mock_session.scalars.return_value = mock_scalars
-
         resp = modify_note_category(1, 2)
 
         self.assertEqual(resp.response, {"status": "Success"})
         self.assertEqual(resp.status_code, 200)
-        self.assertEqual(mock_note.category, 2)
+        statement = mock_session.execute.call_args_list[1].args[0]
+        self.assertEqual(statement.compile().params["category"], 2)
+        mock_session.scalars.assert_not_called()
         mock_session.commit.assert_called_once()
 
+    @patch("services.services.db")
+    def test_modify_note_category_not_found(self, mock_database_handler):
+        """Test modify note category where note not found"""
+        mock_session = MagicMock()
+        session_context = mock_database_handler.get_session.return_value
+        session_context.__enter__.return_value = mock_session
+
+        mock_session.execute.return_value.one_or_none.return_value = None
+
+        resp = modify_note_category(1, 2)
+
+        self.assertEqual(resp.response, {"status": "Note not found"})
+        self.assertEqual(resp.status_code, 404)
+        mock_session.commit.assert_not_called()
+
     @patch("services.services.db")
     def test_modify_note_category_database_error(self, mock_database_handler):
         """Test modify note category failure"""
         mock_session = MagicMock()
         mock_database_handler.get_session.return_value.__enter__.return_value = mock_session
 
-        mock_session.scalars.side_effect = DatabaseError(
+        mock_session.execute.side_effect = DatabaseError(
             "statement", {}, Exception("Error")
         )
 
@@ -416,18 +441,15 @@ class TestServices(unittest.TestCase):
     def test_modify_note_tags_success(self, mock_database_handler):
         """Test modify note tag"""
         mock_session = MagicMock()
-        mock_note = MagicMock()
         mock_database_handler.get_session.return_value.__enter__.return_value = mock_session
 
-        mock_scalars = MagicMock()
-        mock_scalars.one.return_value = mock_note
-        mock_session.scalars.return_value = mock_scalars
-
         resp = modify_note_tags(1, ["sample_tag"])
 
         self.assertEqual(resp.response, {"status": "Success"})
         self.assertEqual(resp.status_code, 200)
-        self.assertEqual(mock_note.tags, ["sample_tag"])
+        statement = mock_session.execute.call_args_list[1].args[0]
+        self.assertEqual(statement.compile().params["tags"], ["sample_tag"])
+        mock_session.scalars.assert_not_called()
         mock_session.commit.assert_called_once()
 
     @patch("services.services.db")
@@ -436,7 +458,7 @@ class TestServices(unittest.TestCase):
         mock_session = MagicMock()
         mock_database_handler.get_session.return_value.__enter__.return_value = mock_session
 
-        mock_session.scalars.side_effect = DatabaseError(
+        mock_session.execute.side_effect = DatabaseError(
             "statement", {}, Exception("Error")
         )
 
@@ -451,14 +473,10 @@ class TestServices(unittest.TestCase):
         """Test get categories"""
         mock_session = MagicMock()
 
-        mock_category = MagicMock()
-        mock_category.id = 10
-        mock_category.name = "Test Category"
-        mock_category.board_id = 20
-
-        mock_query = mock_session.query.return_value
+        mock_category = {"id": 10, "name": "Test Category"}
 
-        mock_query.where.return_value = [mock_category]
+        mock_result = mock_session.execute.return_value
+        mock_result.mappings.return_value = [mock_category]
 
         mock_database_handler.get_session.return_value.__enter__.return_value = mock_session
 
@@ -518,86 +536,82 @@ class TestServices(unittest.TestCase):
         mock_session.add.assert_called_once_with(mock_category)
         mock_session.commit.assert_called_once()
 
-    @patch("services.services.Category")
     @patch("services.services.db")
-    def test_remove_category_success(
-        self, mock_database_handler, mock_category_class
-    ):
+    def test_remove_category_success(self, mock_database_handler):
         """Test remove category success"""
         mock_session = MagicMock()
-        mock_category = MagicMock()
-        mock_session.get.return_value = mock_category
 
         mock_database_handler.get_session.return_value.__enter__.return_value = mock_session
-        mock_session.query.return_value.filter_by.return_value.first.return_value = None
 
-        resp = remove_category(ANY)
+        resp = remove_category(1)
 
         self.assertEqual(resp.response, {"status": "Success"})
         self.assertEqual(resp.status_code, 200)
 
-        mock_session.get.assert_called_once_with(mock_category_class, ANY)
-        mock_session.delete.assert_called_once_with(mock_category)
+        # Board and boards revisions, tombstones and delete, without
+        # loading the category
+        self.assertEqual(mock_session.execute.call_count, 4)
+        mock_session.get.assert_not_called()
         mock_session.commit.assert_called_once()
 
-    @patch("services.services.Category")
     @patch("services.services.db")
-    def test_remove_category_failure_not_found(
-        self, mock_database_handler, mock_category_class
-    ):
+    def test_remove_category_failure_not_found(self, mock_database_handler):
         """Test remove category where category not found"""
         mock_session = MagicMock()
 
         mock_database_handler.get_session.return_value.__enter__.return_value = mock_session
 
-        mock_session.get.return_value = None
+        mock_session.execute.return_value.one_or_none.return_value = None
 
-        resp = remove_category(ANY)
+        resp = remove_category(1)
 
         self.assertEqual(resp.response, {"status": "Category not found"})
         self.assertEqual(resp.status_code, 404)
 
-        mock_session.get.assert_called_once_with(mock_category_class, ANY)
+        mock_session.execute.assert_called_once()
+        mock_session.commit.assert_not_called()
 
-    @patch("services.services.Category")
     @patch("services.services.db")
     def test_remove_category_failure_database_error(
-        self, mock_database_handler, mock_category_class
+        self, mock_database_handler
     ):
         """Test remove note success"""
         mock_session = MagicMock()
-        mock_category = MagicMock()
-        mock_session.get.return_value = mock_category
 
         mock_database_handler.get_session.return_value.__enter__.return_value = mock_session
 
-        mock_session.get.side_effect = DatabaseError(
+        mock_session.execute.side_effect = DatabaseError(
             "statement", {}, Exception("Error")
         )
 
-        resp = remove_category(ANY)
+        resp = remove_category(1)
 
         self.assertIn("DB Error", resp.response["status"])  # type: ignore
         self.assertEqual(resp.status_code, 500)
 
-        mock_session.get.assert_called_once_with(mock_category_class, ANY)
         mock_session.rollback.assert_called_once()
 
+    @patch(
+        "services.services.settings_cache",
+        new_callable=lambda: RevisionCache(
+            load_settings_revision, load_settings, ttl=0
+        ),
+    )
     @patch("services.services.db")
-    def test_get_settings_success(self, mock_database_handler):
+    def test_get_settings_success(self, mock_database_handler, _mock_cache):
         """Test get settings"""
         mock_session = MagicMock()
 
-        mock_setting = MagicMock()
-        mock_setting.setting_name = "test_setting_name"
-        mock_setting.setting_value = "ABCD"
-        mock_setting.setting_type = "string"
-        mock_setting.setting_display_name = "Test Setting Name"
-        mock_setting.setting_description = "Test Description"
-
-        mock_query = mock_session.query.return_value
+        mock_setting = {
+            "setting_name": "test_setting_name",
+            "setting_value": "ABCD",
+            "setting_type": "string",
+            "setting_display_name": "Test Setting Name",
+            "setting_description": "Test Description",
+        }
 
-        mock_query.all.return_value = [mock_setting]
+        mock_result = mock_session.execute.return_value
+        mock_result.mappings.return_value = [mock_setting]
 
         mock_database_handler.get_session.return_value.__enter__.return_value = mock_session
 
@@ -619,27 +633,41 @@ class TestServices(unittest.TestCase):
     def test_modify_setting_success(self, mock_database_handler):
         """Test modify setting"""
         mock_session = MagicMock()
-        mock_setting = MagicMock()
         mock_database_handler.get_session.return_value.__enter__.return_value = mock_session
 
-        mock_scalars = MagicMock()
-        mock_scalars.one.return_value = mock_setting
-        mock_session.scalars.return_value = mock_scalars
-
         resp = modify_setting("test", "Test value")
 
         self.assertEqual(resp.response, {"status": "Success"})
         self.assertEqual(resp.status_code, 200)
-        self.assertEqual(mock_setting.setting_value, "Test value")
+        statement = mock_session.execute.call_args_list[0].args[0]
+        self.assertEqual(
+            statement.compile().params["setting_value"], "Test value"
+        )
+        mock_session.scalars.assert_not_called()
         mock_session.commit.assert_called_once()
 
+    @patch("services.services.db")
+    def test_modify_setting_not_found(self, mock_database_handler):
+        """Test modify setting where setting not found"""
+        mock_session = MagicMock()
+        session_context = mock_database_handler.get_session.return_value
+        session_context.__enter__.return_value = mock_session
+
+        mock_session.execute.return_value.first.return_value = None
+
+        resp = modify_setting("test", "Test value")
+
+        self.assertEqual(resp.response, {"status": "Setting not found"})
+        self.assertEqual(resp.status_code, 404)
+        mock_session.commit.assert_not_called()
+
     @patch("services.services.db")
     def test_modify_setting_database_error(self, mock_database_handler):
         """Test modify setting"""
         mock_session = MagicMock()
         mock_database_handler.get_session.return_value.__enter__.return_value = mock_session
 
-        mock_session.scalars.side_effect = DatabaseError(
+        mock_session.execute.side_effect = DatabaseError(
             "statement", {}, Exception("Error")
         )
 
@@ -648,3 +676,1023 @@ class TestServices(unittest.TestCase):
         self.assertIn("DB Error", resp.response["status"])  # type: ignore
         self.assertEqual(resp.status_code, 500)
         mock_session.rollback.assert_called_once()
+
+
+class TestServicesQueryCount(ServicesTestCase):
+    """Query count tests for Services against the test database"""
+
+    def setUp(self):
+        """Create the test database and count the statements it runs"""
+        super().setUp()
+        self.statements = self.record_statements()
+
+    def _create_board(self, note_count: int) -> int:
+        """Create a board with two categories and the given note count"""
+        with self.db.get_session() as session:
+            board = Board(name="Board")
+            session.add(board)
+            session.flush()
+            categories = [
+                Category(name="Good", board_id=board.id),
+                Category(name="Bad", board_id=board.id),
+            ]
+            session.add_all(categories)
+            session.flush()
+            session.add_all(
+                Note(
+                    description=f"Note {index}",
+                    category=categories[index % 2].id,
+                    tags=[],
+                    board_id=board.id,
+                )
+                for index in range(note_count)
+            )
+            session.commit()
+            return board.id
+
+    def _count_export_statements(self, board_id: int) -> int:
+        """Export a board and return the number of statements it ran"""
+        self.statements.clear()
+        result = get_notes_for_export(board_id)
+        self.assertEqual(result["board_name"], "Board")
+        return len(self.statements)
+
+    def test_get_notes_for_export_constant_query_count(self):
+        """Test export query count does not grow with the board size"""
+        small_board_id = self._create_board(2)
+        large_board_id = self._create_board(200)
+
+        small_count = self._count_export_statements(small_board_id)
+        large_count = self._count_export_statements(large_board_id)
+
+        self.assertEqual(small_count, 1)
+        self.assertEqual(large_count, small_count)
+
+    def test_get_notes_for_export_resolves_category_names(self):
+        """Test export resolves category names with the joined query"""
+        board_id = self._create_board(3)
+
+        result = get_notes_for_export(board_id)
+
+        self.assertEqual(
+            result["notes"],
+            [
+                {"description": "Note 0", "category": "Good"},
+                {"description": "Note 1", "category": "Bad"},
+                {"description": "Note 2", "category": "Good"},
+            ],
+        )
+
+    def test_iter_export_rows(self):
+        """Test export rows are streamed from a single statement"""
+        board_id = self._create_board(3)
+        self.statements.clear()
+
+        rows = list(iter_export_rows(board_id))
+
+        self.assertEqual(
+            rows,
+            [("Note 0", "Good"), ("Note 1", "Bad"), ("Note 2", "Good")],
+        )
+        self.assertEqual(len(self.statements), 1)
+
+
+class TestServicesNoteChanges(ServicesTestCase):
+    """Delta sync tests for Services against the test database"""
+
+    def setUp(self):
+        """Create the test database with a board and two categories"""
+        super().setUp()
+        self.board_id, (self.good, self.bad) = self.create_board()
+
+    def _changes(self, since: int) -> dict:
+        """Return the note changes of the board since a revision"""
+        resp = get_note_changes(self.board_id, since)
+        self.assertEqual(resp.status_code, 200)
+        return resp.response
+
+    def _note_ids(self) -> list[int]:
+        """Return the ids of the notes on the board"""
+        return [note["id"] for note in get_notes(self.board_id).response]
+
+    def test_get_note_changes_returns_only_newer_notes(self):
+        """Test only notes written after the revision are returned"""
+        add_note("First", self.good, [], self.board_id)
+        revision = self._changes(0)["revision"]
+        add_note("Second", self.good, [], self.board_id)
+
+        changes = self._changes(revision)
+
+        self.assertEqual(changes["revision"], revision + 1)
+        self.assertEqual(
+            [note["description"] for note in changes["notes"]], ["Second"]
+        )
+        self.assertEqual(changes["deleted"], [])
+
+    def test_get_note_changes_tracks_updates_and_deletes(self):
+        """Test updated notes and tombstoned deletes are returned"""
+        add_note("First", self.good, [], self.board_id)
+        add_note("Second", self.good, [], self.board_id)
+        first_id, second_id = self._note_ids()
+        revision = self._changes(0)["revision"]
+
+        modify_note_category(first_id, self.bad)
+        remove_note(second_id)
+        changes = self._changes(revision)
+
+        self.assertEqual(changes["revision"], revision + 2)
+        self.assertEqual(
+            [(note["id"], note["category"]) for note in changes["notes"]],
+            [(first_id, self.bad)],
+        )
+        self.assertEqual(changes["deleted"], [second_id])
+
+    def test_get_note_changes_tombstones_category_notes(self):
+        """Test notes cascaded by a category delete are tombstoned"""
+        add_note("First", self.good, [], self.board_id)
+        add_note("Second", self.bad, [], self.board_id)
+        first_id, _ = self._note_ids()
+        revision = self._changes(0)["revision"]
+
+        remove_category(self.good)
+        changes = self._changes(revision)
+
+        self.assertEqual(changes["notes"], [])
+        self.assertEqual(changes["deleted"], [first_id])
+
+    def test_get_note_changes_board_not_found(self):
+        """Test note changes of a missing board"""
+        resp = get_note_changes(self.board_id + 1, 0)
+
+        self.assertEqual(resp.response, {"status": "Board not found"})
+        self.assertEqual(resp.status_code, 404)
+
+
+class TestServicesRevisions(ServicesTestCase):
+    """Revision stamp tests for Services against the test database"""
+
+    def setUp(self):
+        """Create the test database and an empty settings cache"""
+        super().setUp()
+        self.settings_cache = RevisionCache(
+            load_settings_revision, load_settings, ttl=60
+        )
+        self.patch_services(settings_cache=self.settings_cache)
+
+    def _add_setting(self, setting_name: str):
+        """Store a string setting with an empty value"""
+        with self.db.get_session() as session:
+            session.add(
+                Setting(
+                    setting_name=setting_name,
+                    setting_value="",
+                    setting_type="string",
+                    setting_display_name="Test",
+                    setting_description="Test",
+                )
+            )
+            session.commit()
+
+    def test_get_board_revision(self):
+        """Test the board revision follows note and category writes"""
+        board_id = add_board("Board").response["board_id"]
+        self.assertEqual(get_board_revision(board_id), 0)
+
+        add_category("Good", board_id)
+        category_id = get_categories(board_id).response[0]["id"]
+        add_note("Note", category_id, [], board_id)
+
+        self.assertEqual(get_board_revision(board_id), 2)
+        self.assertIsNone(get_board_revision(board_id + 1))
+
+    def test_get_boards_revision(self):
+        """Test the boards stamp changes with every boards listing change"""
+        stamps = [get_boards_revision()]
+        board_id = add_board("Board").response["board_id"]
+        stamps.append(get_boards_revision())
+        add_category("Good", board_id)
+        category_id = get_categories(board_id).response[0]["id"]
+        self.assertEqual(get_boards_revision(), stamps[-1])
+        add_note("Note", category_id, [], board_id)
+        stamps.append(get_boards_revision())
+        remove_category(category_id)
+        stamps.append(get_boards_revision())
+        remove_board(board_id)
+        stamps.append(get_boards_revision())
+
+        self.assertEqual(stamps, [0, 1, 2, 3, 4])
+
+    def test_get_boards_revision_single_row(self):
+        """Test the boards stamp is read from its revision row alone"""
+        statements = self.record_statements()
+
+        get_boards_revision()
+
+        self.assertEqual(len(statements), 1)
+        self.assertNotIn("boards", statements[0])
+
+    def test_bump_revision_missing_row(self):
+        """Test a missing revision row is created by its first bump"""
+        with self.db.get_session() as session:
+            session.execute(delete(Revision))
+            self.assertEqual(bump_revision(session, "boards"), 1)
+            self.assertEqual(bump_revision(session, "boards"), 2)
+            session.commit()
+
+        self.assertEqual(get_boards_revision(), 2)
+
+    def test_get_settings_revision(self):
+        """Test the settings revision follows setting writes"""
+        self._add_setting("test")
+        self.assertEqual(get_settings_revision(), 0)
+
+        modify_setting("test", "value")
+
+        self.assertEqual(get_settings_revision(), 1)
+
+    def test_get_settings_served_from_cache(self):
+        """Test cached settings are read without a database query"""
+        self._add_setting("test")
+        get_settings()
+
+        with patch.object(self.db, "get_session") as mock_get_session:
+            resp = get_settings()
+
+        mock_get_session.assert_not_called()
+        self.assertEqual(resp.response[0]["setting_value"], "")
+
+    def test_modify_setting_writes_through(self):
+        """Test a setting change updates the cache without a reload"""
+        self._add_setting("test")
+        self._add_setting("other")
+        get_settings()
+
+        with patch.object(
+            self.settings_cache, "load", wraps=self.settings_cache.load
+        ) as mock_load:
+            modify_setting("test", "value")
+            resp = get_settings()
+
+        mock_load.assert_not_called()
+        self.assertEqual(
+            {
+                setting["setting_name"]: setting["setting_value"]
+                for setting in resp.response
+            },
+            {"test": "value", "other": ""},
+        )
+
+
+class TestServicesNoteCount(ServicesTestCase):
+    """Board note count tests for Services against the test database"""
+
+    def setUp(self):
+        """Create the test database with a board with two categories and
+        an empty one"""
+        super().setUp()
+        self.board_id, (self.good_id, self.bad_id) = self.create_board()
+        self.create_board("Other", ())
+
+    def _note_counts(self) -> dict[str, int]:
+        """Return the note count of every board by name"""
+        return {
+            board["name"]: board["note_count"]
+            for board in get_boards().response
+        }
+
+    def test_note_count_follows_note_writes(self):
+        """Test adding and removing notes moves the note count"""
+        for category_id in (self.good_id, self.good_id, self.bad_id):
+            add_note("Note", category_id, [], self.board_id)
+        self.assertEqual(self._note_counts(), {"Board": 3, "Other": 0})
+
+        remove_note(get_notes(self.board_id).response[0]["id"])
+        self.assertEqual(self._note_counts(), {"Board": 2, "Other": 0})
+
+    def test_note_count_follows_category_removal(self):
+        """Test removing a category subtracts its notes"""
+        for category_id in (self.good_id, self.good_id, self.bad_id):
+            add_note("Note", category_id, [], self.board_id)
+
+        remove_category(self.good_id)
+        self.assertEqual(self._note_counts(), {"Board": 1, "Other": 0})
+
+        remove_category(self.bad_id)
+        self.assertEqual(self._note_counts(), {"Board": 0, "Other": 0})
+
+    def test_get_boards_single_query(self):
+        """Test the boards listing does not read the notes"""
+        add_note("Note", self.good_id, [], self.board_id)
+        statements = self.record_statements()
+
+        get_boards()
+
+        self.assertEqual(len(statements), 1)
+        self.assertNotIn("notes", statements[0])
+
+
+class TestServicesPagination(ServicesTestCase):
+    """Keyset pagination tests for Services against the test database"""
+
+    def setUp(self):
+        """Create the test database with five boards and notes"""
+        super().setUp()
+        self.board_ids = [
+            add_board(f"Board {index}").response["board_id"]
+            for index in range(5)
+        ]
+        add_category("Good", self.board_ids[0])
+        category_id = get_categories(self.board_ids[0]).response[0]["id"]
+        for index in range(5):
+            add_note(f"Note {index}", category_id, [], self.board_ids[0])
+            add_note("Other", category_id, [], self.board_ids[0] + 1)
+
+    def test_get_boards_pages(self):
+        """Test boards are paged through in id order"""
+        pages, cursor = [], None
+        while True:
+            resp = get_boards(2, cursor).response
+            pages.append([board["id"] for board in resp["boards"]])
+            cursor = resp["next_cursor"]
+            if cursor is None:
+                break
+
+        ids = self.board_ids
+        self.assertEqual(pages, [ids[0:2], ids[2:4], ids[4:5]])
+
+    def test_get_notes_pages(self):
+        """Test the notes of a board are paged through in id order"""
+        first = get_notes(self.board_ids[0], 3).response
+        second = get_notes(self.board_ids[0], 3, first["next_cursor"]).response
+
+        self.assertEqual(
+            [note["description"] for note in first["notes"]],
+            ["Note 0", "Note 1", "Note 2"],
+        )
+        self.assertEqual(
+            [note["description"] for note in second["notes"]],
+            ["Note 3", "Note 4"],
+        )
+        self.assertIsNone(second["next_cursor"])
+
+    def test_get_notes_exact_last_page(self):
+        """Test a full last page has no next cursor"""
+        resp = get_notes(self.board_ids[0], 5).response
+
+        self.assertEqual(len(resp["notes"]), 5)
+        self.assertIsNone(resp["next_cursor"])
+
+    def test_get_notes_page_uses_index(self):
+        """Test a page of notes is read by an index range scan"""
+        if self.db.engine.dialect.name != "sqlite":
+            self.skipTest("query plan is SQLite specific")
+
+        with self.db.engine.connect() as connection:
+            plan = " ".join(
+                row[-1]
+                for row in connection.execute(
+                    text(
+                        "EXPLAIN QUERY PLAN SELECT * FROM notes "
+                        "WHERE board_id = 1 AND id > 3 ORDER BY id LIMIT 4"
+                    )
+                )
+            )
+
+        self.assertIn("USING INDEX ix_notes_board_id_id", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+
+
+class TestServicesBulkNotes(ServicesTestCase):
+    """Bulk note tests for Services against the test database"""
+
+    def setUp(self):
+        """Create the test database with two boards and categories"""
+        super().setUp()
+        self.board_ids, self.category_ids = [], []
+        for name in ("A", "B"):
+            board_id, (category_id,) = self.create_board(name, ("Good",))
+            self.board_ids.append(board_id)
+            self.category_ids.append(category_id)
+
+    def _note(self, index: int, board: int = 0) -> dict:
+        """Return a new note for one of the boards"""
+        return {
+            "description": f"Note {index}",
+            "category": self.category_ids[board],
+            "tags": [],
+            "board_id": self.board_ids[board],
+        }
+
+    def test_add_notes(self):
+        """Test notes are added with one revision per board"""
+        notes = [self._note(0), self._note(1, board=1), self._note(2)]
+
+        resp = add_notes(notes)
+
+        self.assertEqual(resp.status_code, 200)
+        note_ids = resp.response["note_ids"]
+        self.assertEqual(
+            [note["id"] for note in get_notes(self.board_ids[0]).response],
+            [note_ids[0], note_ids[2]],
+        )
+        self.assertEqual(
+            [note["id"] for note in get_notes(self.board_ids[1]).response],
+            [note_ids[1]],
+        )
+        self.assertEqual(get_board_revision(self.board_ids[0]), 2)
+        self.assertEqual(
+            [board["note_count"] for board in get_boards().response], [2, 1]
+        )
+
+    def test_add_notes_statements(self):
+        """Test the notes are inserted with a single statement"""
+        statements = self.record_statements()
+
+        resp = add_notes([self._note(index) for index in range(50)])
+
+        inserts = [s for s in statements if s.startswith("INSERT INTO notes")]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(len(resp.response["note_ids"]), 50)
+
+    def test_add_notes_wrong_board(self):
+        """Test no note is added if a category is not on its board"""
+        wrong = self._note(1)
+        wrong["board_id"] = self.board_ids[1]
+
+        resp = add_notes([self._note(0), wrong])
+
+        self.assertEqual(resp.status_code, 404)
+        self.assertEqual(get_notes(self.board_ids[0]).response, [])
+        self.assertEqual(get_board_revision(self.board_ids[0]), 1)
+
+
+class TestServicesImportBoard(ServicesTestCase):
+    """Board import tests for Services against the test database"""
+
+    def test_import_board(self):
+        """Test the board, its categories and notes are created"""
+        rows = [("Went well", "Good"), ("Slow CI", "Bad"), ("Pair", "Good")]
+
+        resp = import_board("Retro", rows)
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.response["note_count"], 3)
+        board_id = resp.response["board_id"]
+        self.assertEqual(
+            get_notes_for_export(board_id),
+            {
+                "board_name": "Retro",
+                "notes": [
+                    {"description": description, "category": category}
+                    for description, category in rows
+                ],
+            },
+        )
+        self.assertEqual(
+            [
+                category["name"]
+                for category in get_categories(board_id).response
+            ],
+            ["Good", "Bad"],
+        )
+        self.assertEqual(get_boards().response[0]["note_count"], 3)
+
+    @patch("services.services.IMPORT_BATCH_SIZE", 10)
+    def test_import_board_batches(self):
+        """Test notes and new categories are inserted once per batch"""
+        rows = [(f"Note {index}", f"C{index % 3}") for index in range(25)]
+        statements = self.record_statements()
+
+        resp = import_board("Retro", rows)
+
+        self.assertEqual(resp.response["note_count"], 25)
+        self.assertEqual(
+            [
+                statement.split()[2]
+                for statement in statements
+                if statement.startswith(
+                    ("INSERT INTO notes", "INSERT INTO cat")
+                )
+            ],
+            ["categories", "notes", "notes", "notes"],
+        )
+
+    def test_import_board_invalid(self):
+        """Test nothing is created when the export turns out invalid"""
+
+        def rows():
+            yield ("Went well", "Good")
+            raise InvalidImport("Invalid JSON")
+
+        resp = import_board("Retro", rows())
+
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(get_boards().response, [])
+
+
+class TestServicesModifyNotes(ServicesTestCase):
+    """Batch note change tests for Services against the test database"""
+
+    def setUp(self):
+        """Create the test database with two boards and their notes"""
+        super().setUp()
+        self.board_ids, self.category_ids = [], []
+        for name in ("A", "B"):
+            board_id, category_ids = self.create_board(name)
+            self.board_ids.append(board_id)
+            self.category_ids.append(category_ids)
+        self.note_ids = add_notes(
+            [
+                {
+                    "description": f"Note {index}",
+                    "category": self.category_ids[index % 2][0],
+                    "board_id": self.board_ids[index % 2],
+                }
+                for index in range(6)
+            ]
+        ).response["note_ids"]
+
+    def _notes(self, board: int) -> dict[int, dict]:
+        """Return the notes of a board by id"""
+        return {
+            note["id"]: note
+            for note in get_notes(self.board_ids[board]).response
+        }
+
+    def test_modify_notes(self):
+        """Test categories and tags of notes on several boards change"""
+        bad_a, bad_b = self.category_ids[0][1], self.category_ids[1][1]
+        changes = [
+            {"id": self.note_ids[0], "category": bad_a},
+            {"id": self.note_ids[2], "category": bad_a, "tags": ["x"]},
+            {"id": self.note_ids[4], "tags": ["x"]},
+            {"id": self.note_ids[1], "category": bad_b},
+        ]
+
+        resp = modify_notes(changes)
+
+        self.assertEqual(
+            [result["status"] for result in resp.response["results"]],
+            ["Success"] * 4,
+        )
+        notes_a, notes_b = self._notes(0), self._notes(1)
+        self.assertEqual(
+            [notes_a[i]["category"] for i in self.note_ids[0:6:2]],
+            [bad_a, bad_a, self.category_ids[0][0]],
+        )
+        self.assertEqual(
+            [notes_a[i]["tags"] for i in self.note_ids[0:6:2]],
+            [[], ["x"], ["x"]],
+        )
+        self.assertEqual(notes_b[self.note_ids[1]]["category"], bad_b)
+        self.assertEqual(get_board_revision(self.board_ids[0]), 4)
+        self.assertEqual(get_board_revision(self.board_ids[1]), 4)
+
+    def test_modify_notes_statements(self):
+        """Test each board and new value is applied with one UPDATE"""
+        statements = self.record_statements()
+
+        modify_notes(
+            [
+                {"id": note_id, "category": self.category_ids[0][1]}
+                for note_id in self.note_ids[0:6:2]
+            ]
+        )
+
+        updates = [s for s in statements if s.startswith("UPDATE notes")]
+        self.assertEqual(len(updates), 1)
+
+    def test_modify_notes_statuses(self):
+        """Test invalid changes are reported and skipped"""
+        changes = [
+            {"id": self.note_ids[0], "category": self.category_ids[1][0]},
+            {"id": self.note_ids[-1] + 100, "tags": []},
+            {"id": self.note_ids[2]},
+            {"id": self.note_ids[4], "tags": ["y"]},
+        ]
+
+        resp = modify_notes(changes)
+
+        self.assertEqual(
+            resp.response["results"],
+            [
+                {
+                    "id": self.note_ids[0],
+                    "status": "Category not found on board",
+                },
+                {"id": self.note_ids[-1] + 100, "status": "Note not found"},
+                {"id": self.note_ids[2], "status": "Nothing to change"},
+                {"id": self.note_ids[4], "status": "Success"},
+            ],
+        )
+        notes = self._notes(0)
+        self.assertEqual(
+            notes[self.note_ids[0]]["category"], self.category_ids[0][0]
+        )
+        self.assertEqual(notes[self.note_ids[4]]["tags"], ["y"])
+
+
+class TestServicesDirectWrites(ServicesTestCase):
+    """Single note, category and setting writes against the test database"""
+
+    def setUp(self):
+        """Create the test database with a board, categories and notes"""
+        super().setUp()
+        self.board_id, self.category_ids = self.create_board()
+        self.note_ids = self.create_notes(self.board_id, self.category_ids, 4)
+        self.statements = self.record_statements()
+
+    def _verbs(self) -> list[str]:
+        """Return the first keyword of every statement run so far"""
+        return [statement.split(None, 1)[0] for statement in self.statements]
+
+    def test_note_writes_without_select(self):
+        """Test note writes run no SELECT before they change the note"""
+        modify_note_category(self.note_ids[0], self.category_ids[1])
+        modify_note_tags(self.note_ids[0], ["x"])
+        remove_note(self.note_ids[1])
+
+        self.assertNotIn("SELECT", self._verbs())
+        notes = get_notes(self.board_id).response
+        self.assertEqual(
+            [note["id"] for note in notes],
+            [self.note_ids[0], *self.note_ids[2:]],
+        )
+        self.assertEqual(notes[0]["category"], self.category_ids[1])
+        self.assertEqual(notes[0]["tags"], ["x"])
+        self.assertEqual(get_board_revision(self.board_id), 6)
+
+    def test_note_writes_not_found(self):
+        """Test writes to a missing note are 404 and leave the board alone"""
+        for resp in (
+            modify_note_category(999, self.category_ids[1]),
+            modify_note_tags(999, ["x"]),
+            remove_note(999),
+        ):
+            self.assertEqual(resp.response, {"status": "Note not found"})
+            self.assertEqual(resp.status_code, 404)
+        self.assertEqual(get_board_revision(self.board_id), 3)
+
+    def test_remove_category(self):
+        """Test a category is removed with its notes and tombstones"""
+        resp = remove_category(self.category_ids[0])
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotIn("SELECT", self._verbs())
+        self.assertEqual(
+            [note["id"] for note in get_notes(self.board_id).response],
+            self.note_ids[1::2],
+        )
+        self.assertEqual(get_boards().response[0]["note_count"], 2)
+        changes = get_note_changes(self.board_id, 3).response
+        self.assertEqual(changes["revision"], 4)
+        self.assertEqual(sorted(changes["deleted"]), self.note_ids[0::2])
+
+    def test_remove_category_binds_integers(self):
+        """Test the category id is bound as an integer, which PostgreSQL
+        needs to compare and insert it"""
+        statements = []
+
+        @event.listens_for(Session, "do_orm_execute")
+        def record(orm_execute_state):
+            statements.append(orm_execute_state.statement)
+
+        self.addCleanup(event.remove, Session, "do_orm_execute", record)
+
+        category_id = self.category_ids[0]
+        resp = remove_category(category_id)
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(len(get_notes(self.board_id).response), 2)
+        binds = [
+            bind
+            for statement in statements
+            for bind in statement.compile(
+                dialect=psycopg.dialect()
+            ).binds.values()
+            if bind.value == category_id
+        ]
+        self.assertNotEqual(binds, [])
+        for bind in binds:
+            self.assertIsInstance(bind.type, Integer)
+
+    def test_remove_category_not_found(self):
+        """Test removing a missing category is 404"""
+        resp = remove_category(999)
+
+        self.assertEqual(resp.response, {"status": "Category not found"})
+        self.assertEqual(resp.status_code, 404)
+        self.assertEqual(get_board_revision(self.board_id), 3)
+
+    def test_modify_setting_not_found(self):
+        """Test changing a missing setting is 404"""
+        resp = modify_setting("missing", "value")
+
+        self.assertEqual(resp.response, {"status": "Setting not found"})
+        self.assertEqual(resp.status_code, 404)
+
+
+class TestServicesProjectedReads(ServicesTestCase):
+    """Read path tests for Services against the test database"""
+
+    def setUp(self):
+        """Create the test database with a board, category and notes"""
+        super().setUp()
+        self.board_id, (category_id,) = self.create_board(categories=("Good",))
+        for index in range(3):
+            add_note(f"Note {index}", category_id, ["x"], self.board_id)
+        with self.db.get_session() as session:
+            session.add(
+                Setting(
+                    setting_name="name",
+                    setting_value="value",
+                    setting_type="string",
+                    setting_display_name="Name",
+                    setting_description="",
+                )
+            )
+            session.commit()
+
+    def test_reads_do_not_load_entities(self):
+        """Test the listings are built from columns, not ORM objects"""
+        loaded = []
+
+        def record(target, _context):
+            loaded.append(target)
+
+        for entity in (Board, Category, Note, Setting):
+            event.listen(entity, "load", record)
+            self.addCleanup(event.remove, entity, "load", record)
+
+        self.assertEqual(len(get_notes(self.board_id).response), 3)
+        self.assertEqual(
+            get_notes(self.board_id).response[0],
+            {"id": 1, "description": "Note 0", "category": 1, "tags": ["x"]},
+        )
+        self.assertEqual(
+            len(get_note_changes(self.board_id, 0).response["notes"]), 3
+        )
+        self.assertEqual(
+            get_categories(self.board_id).response, [{"id": 1, "name": "Good"}]
+        )
+        self.assertEqual(load_settings()[0]["setting_value"], "value")
+        self.assertEqual(get_board_name_from_id(self.board_id), "Board")
+        self.assertEqual(get_board_name_from_id(999), "")
+
+        self.assertEqual(loaded, [])
+
+    def test_get_board_snapshot(self):
+        """Test the snapshot holds the board, categories with their note
+        counts and notes from three queries"""
+        add_category("Bad", self.board_id)
+        statements = self.record_statements()
+
+        resp = get_board_snapshot(self.board_id)
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(len(statements), 3)
+        self.assertEqual(
+            resp.response["board"],
+            {
+                "id": self.board_id,
+                "name": "Board",
+                "revision": 5,
+                "note_count": 3,
+            },
+        )
+        self.assertEqual(
+            resp.response["categories"],
+            [
+                {"id": 1, "name": "Good", "note_count": 3},
+                {"id": 2, "name": "Bad", "note_count": 0},
+            ],
+        )
+        self.assertEqual(
+            resp.response["notes"], get_notes(self.board_id).response
+        )
+
+    def test_get_board_snapshot_board_not_found(self):
+        """Test the snapshot of a missing board is 404"""
+        resp = get_board_snapshot(999)
+
+        self.assertEqual(resp.response, {"status": "Board not found"})
+        self.assertEqual(resp.status_code, 404)
+
+
+class TestServicesBoardCache(ServicesTestCase):
+    """Cached board read tests for Services against the test database"""
+
+    def setUp(self):
+        """Create the test database with a board and enable the cache"""
+        super().setUp()
+        self.board_cache = LRURevisionCache(
+            load_board_revision, load_board_state, size=8, ttl=60, idle=600
+        )
+        self.patch_services(board_cache=self.board_cache)
+        self.board_id, self.category_ids = self.create_board()
+        self.create_notes(self.board_id, self.category_ids, 4)
+        self.statements = self.record_statements()
+
+    def _reads(self, since: int | None = None) -> list:
+        """Return the results of the cached board reads, and of the changes
+        since a revision if one is given"""
+        reads = [
+            get_board_revision(self.board_id),
+            get_notes(self.board_id).response,
+            get_notes(self.board_id, 2, 1).response,
+            get_categories(self.board_id).response,
+            get_board_snapshot(self.board_id).response,
+        ]
+        if since is not None:
+            reads.append(get_note_changes(self.board_id, since).response)
+        return reads
+
+    def _stored_reads(self, since: int | None = None) -> list:
+        """Return the results of the same reads from the database"""
+        with patch.object(self.board_cache, "size", 0):
+            return self._reads(since)
+
+    def test_hot_reads_skip_database(self):
+        """Test reads of a cached board run no statement"""
+        get_notes(self.board_id)
+        self.statements.clear()
+
+        reads = self._reads()
+
+        self.assertEqual(self.statements, [])
+        self.assertEqual(reads, self._stored_reads())
+
+    def test_writes_update_cache(self):
+        """Test the writes of the services are applied to the cached board"""
+        get_notes(self.board_id)
+        note_ids = [note["id"] for note in get_notes(self.board_id).response]
+
+        add_note("Added", self.category_ids[0], ["x"], self.board_id)
+        modify_note_category(note_ids[0], self.category_ids[1])
+        modify_note_tags(note_ids[1], ["y"])
+        modify_notes([{"id": note_ids[2], "tags": ["z"]}])
+        remove_note(note_ids[3])
+        add_category("Ugly", self.board_id)
+        remove_category(self.category_ids[0])
+        self.statements.clear()
+
+        # The changes since the revision the board was cached at
+        reads = self._reads(since=3)
+
+        self.assertEqual(self.statements, [])
+        self.assertEqual(reads, self._stored_reads(since=3))
+
+    def test_foreign_write(self):
+        """Test a write of another worker is seen by a client at the
+        cached revision"""
+        revision = get_board_revision(self.board_id)
+        with self.db.get_session() as session:
+            session.execute(
+                update(Board)
+                .where(Board.id == self.board_id)
+                .values(revision=revision + 1)
+            )
+            session.execute(
+                insert(Note).values(
+                    description="Foreign",
+                    category=self.category_ids[0],
+                    tags=[],
+                    board_id=self.board_id,
+                    revision=revision + 1,
+                )
+            )
+            session.commit()
+
+        self.assertEqual(get_board_revision(self.board_id), revision)
+        changes = get_note_changes(self.board_id, revision).response
+        self.assertEqual(changes["revision"], revision + 1)
+        self.assertEqual(
+            [note["description"] for note in changes["notes"]], ["Foreign"]
+        )
+        self.assertEqual(get_board_revision(self.board_id), revision + 1)
+
+    def test_remove_board(self):
+        """Test a removed board is dropped from the cache"""
+        get_notes(self.board_id)
+
+        remove_board(self.board_id)
+
+        self.assertEqual(get_notes(self.board_id).response, [])
+        self.assertIsNone(get_board_revision(self.board_id))
+
+
+class TestServicesNameCache(ServicesTestCase):
+    """Memoized board and category name tests for Services against the
+    test database"""
+
+    def setUp(self):
+        """Create the test database with a board and a category and
+        enable the name caches"""
+        super().setUp()
+        self.patch_services(
+            board_names=LRUCache(load_board_name, size=8),
+            category_names=LRUCache(load_category_name, size=8),
+        )
+        self.board_id, (self.category_id,) = self.create_board(
+            categories=("Good",)
+        )
+        self.statements = self.record_statements()
+
+    def test_hits_skip_database(self):
+        """Test a memoized name is read once"""
+        for _ in range(3):
+            self.assertEqual(get_board_name_from_id(self.board_id), "Board")
+            self.assertEqual(
+                get_category_name_from_id(self.category_id), "Good"
+            )
+
+        self.assertEqual(len(self.statements), 2)
+        self.assertEqual(
+            get_stats().response["names"],
+            {
+                "boards": {"size": 1, "max_size": 8, "hits": 2, "misses": 1},
+                "categories": {
+                    "size": 1,
+                    "max_size": 8,
+                    "hits": 2,
+                    "misses": 1,
+                },
+            },
+        )
+
+    def test_missing_names_not_memoized(self):
+        """Test a board created after a miss is found"""
+        self.assertEqual(get_board_name_from_id(self.board_id + 1), "")
+
+        board_id = add_board("Other").response["board_id"]
+
+        self.assertEqual(get_board_name_from_id(board_id), "Other")
+
+    def test_remove_category_invalidates(self):
+        """Test a removed category is no longer named"""
+        get_category_name_from_id(self.category_id)
+
+        remove_category(self.category_id)
+
+        self.assertEqual(get_category_name_from_id(self.category_id), "")
+
+    def test_remove_board_invalidates(self):
+        """Test a removed board and its categories are no longer named"""
+        get_board_name_from_id(self.board_id)
+        get_category_name_from_id(self.category_id)
+
+        remove_board(self.board_id)
+
+        self.assertEqual(get_board_name_from_id(self.board_id), "")
+        self.assertEqual(get_category_name_from_id(self.category_id), "")
+
+
+class TestServicesBrokerFailure(ServicesTestCase):
+    """Write tests for Services with a failing event broker"""
+
+    def setUp(self):
+        """Create the test database with a board and a broker whose
+        transport fails"""
+        super().setUp()
+        self.board_id, self.category_ids = self.create_board()
+        self.broker = MagicMock()
+        self.broker.publish.side_effect = DatabaseError(
+            "INSERT INTO events", {}, Exception("database is locked")
+        )
+        self.patch_services(broker=self.broker)
+
+    def test_writes_succeed(self):
+        """Test committed writes return success and log the failed event"""
+        writes = {
+            "note_added": lambda: add_note(
+                "Note", self.category_ids[0], [], self.board_id
+            ),
+            "notes_added": lambda: add_notes(
+                [
+                    {
+                        "description": "Bulk",
+                        "category": self.category_ids[1],
+                        "board_id": self.board_id,
+                    }
+                ]
+            ),
+            "note_modified": lambda: modify_note_tags(
+                get_notes(self.board_id).response[0]["id"], ["x"]
+            ),
+            "note_removed": lambda: remove_note(
+                get_notes(self.board_id).response[0]["id"]
+            ),
+            "category_added": lambda: add_category("Ugly", self.board_id),
+            "category_removed": lambda: remove_category(self.category_ids[0]),
+            "board_removed": lambda: remove_board(self.board_id),
+        }
+        for name, write in writes.items():
+            logs = self.assertLogs("services.services", "ERROR")
+            with self.subTest(name), logs as captured:
+                resp = write()
+
+                self.assertEqual(resp.status_code, 200)
+                self.assertIn(name, captured.output[0])
+
+        self.assertEqual(self.broker.publish.call_count, len(writes))
+        self.assertEqual(get_boards().response, [])
@@ -13,15 +13,33 @@
  */
 
 import { defineStore } from 'pinia'
-import type { Note, Category } from '@/services/board/types'
+import type {
+  Note,
+  NoteChanges,
+  Category,
+  BoardSnapshot,
+  NoteEvent,
+  NotesEvent,
+  CategoryEvent,
+  RemovedEvent,
+} from '@/services/board/types'
 import type { Result } from '@/services/global/types'
 import { $fetch } from '@/composables/fetch'
+import { useAppService } from '@/services/app/app.service'
+
+let boardEvents: EventSource | null = null
 
 export const useBoardService = defineStore('board', {
-  state: (): { notes: Note[]; categories: Category[]; selectedCategory: number | null } => ({
+  state: (): {
+    notes: Note[]
+    categories: Category[]
+    selectedCategory: number | null
+    revision: number
+  } => ({
     notes: [],
     categories: [],
     selectedCategory: null,
+    revision: 0,
   }),
   getters: {
     filteredNotes: (state) =>
@@ -31,23 +49,105 @@ export const useBoardService = defineStore('board', {
   },
   actions: {
     async fetchBoardData(boardId: string) {
+      const appService = useAppService()
+      appService.boardName = ''
       this.selectedCategory = null
+      this.notes = []
+      this.revision = 0
       try {
-        await Promise.all([this.fetchNotes(boardId), this.fetchCategories(boardId, false)])
+        const response = await $fetch<BoardSnapshot>(`/api/boards/${boardId}/snapshot`)
+        const snapshot = await response.json()
+        appService.boardName = snapshot.board.name
+        this.notes = snapshot.notes
+        this.categories = snapshot.categories
+        this.revision = snapshot.board.revision
+        if (this.categories.length !== 0) {
+          this.selectedCategory = this.categories[0].id
+        }
       } catch (err) {
         console.error('Error fetching board data:', err)
       }
     },
 
+    watchBoard(boardId: string) {
+      this.unwatchBoard()
+      boardEvents = new EventSource(`/api/boards/${boardId}/events`)
+      // Events carry the change and the revision it made, so they are
+      // applied to the store without a request. Only a resync or a
+      // skipped revision fetches the changes since the last known one.
+      const on = <T extends { revision: number }>(event: string, apply: (data: T) => void) =>
+        boardEvents?.addEventListener(event, (message) => {
+          const data: T = JSON.parse((message as MessageEvent).data)
+          if (data.revision <= this.revision) {
+            return
+          }
+          if (data.revision !== this.revision + 1) {
+            void this.syncBoard(boardId)
+            return
+          }
+          apply(data)
+          this.revision = data.revision
+        })
+      on<NoteEvent>('note_added', (data) => this.applyNoteChanges([data.note], []))
+      on<NoteEvent>('note_modified', (data) => this.applyNoteChanges([data.note], []))
+      on<NotesEvent>('notes_added', (data) => this.applyNoteChanges(data.notes, []))
+      on<NotesEvent>('notes_modified', (data) => this.applyNoteChanges(data.notes, []))
+      on<RemovedEvent>('note_removed', (data) => this.applyNoteChanges([], [data.id]))
+      on<CategoryEvent>('category_added', (data) => {
+        if (!this.categories.some((c) => c.id === data.category.id)) {
+          this.categories = [...this.categories, data.category]
+        }
+        if (this.selectedCategory == null) {
+          this.selectedCategory = data.category.id
+        }
+      })
+      on<RemovedEvent>('category_removed', (data) => {
+        this.categories = this.categories.filter((c) => c.id !== data.id)
+        this.notes = this.notes.filter((n) => n.category !== data.id)
+        if (this.selectedCategory === data.id) {
+          this.selectedCategory = this.categories.length !== 0 ? this.categories[0].id : null
+        }
+      })
+      boardEvents.addEventListener('resync', () => void this.syncBoard(boardId))
+    },
+
+    unwatchBoard() {
+      boardEvents?.close()
+      boardEvents = null
+    },
+
+    async syncBoard(boardId: string) {
+      await Promise.all([this.fetchNotes(boardId), this.fetchCategories(boardId, false)])
+      const selected = this.selectedCategory
+      if (selected != null && selected !== -1 && !this.categories.some((c) => c.id === selected)) {
+        this.selectedCategory = this.categories.length !== 0 ? this.categories[0].id : null
+      }
+    },
+
     async fetchNotes(boardId: string) {
       try {
-        const response = await $fetch<Note[]>(`/api/notes?board_id=${boardId}`)
-        this.notes = await response.json()
+        const response = await $fetch<NoteChanges>(
+          `/api/notes?board_id=${boardId}&since=${this.revision}`,
+        )
+        const changes = await response.json()
+        if (changes.revision > this.revision) {
+          this.applyNoteChanges(changes.notes, changes.deleted)
+          this.revision = changes.revision
+        }
       } catch (err) {
         console.error('Error fetching notes:', err)
       }
     },
 
+    applyNoteChanges(changed: Note[], deletedIds: number[]) {
+      const deleted = new Set(deletedIds)
+      const notes = new Map(
+        this.notes.filter((n) => !deleted.has(n.id)).map((n): [number, Note] => [n.id, n]),
+      )
+      changed.forEach((n) => notes.set(n.id, n))
+      this.notes = [...notes.values()].sort((a, b) => a.id - b.id)
+    },
+
     async fetchCategories(boardId: string, selectedWasDeleted: boolean) {
       try {
         const response = await $fetch<Category[]>(`/api/categories?board_id=${boardId}`)
@@ -138,7 +238,7 @@ export const useBoardService = defineStore('board', {
 
     async exportData(boardId: string) {
       try {
-        const response = await fetch(`/api/boards/export?board_id=${boardId}`)
+        const response = await $fetch<Blob>(`/api/boards/export?board_id=${boardId}&stream=true`)
 
         const disposition = response.headers.get('Content-Disposition')
         let filename = 'export.json'
@@ -163,72 +263,15 @@ export const useBoardService = defineStore('board', {
       }
     },
 
-    async exportJson(boardId: string) {
+    async exportText(boardId: string, format: 'json' | 'markdown' | 'csv' | 'ndjson') {
       try {
-        const response = await fetch(`/api/boards/export?board_id=${boardId}`)
-        const json = await response.json()
-
-        return JSON.stringify(json, null, 2)
-      } catch (err) {
-        console.error('Error exporting board to string: ', err)
-        return ''
-      }
-    },
-
-    async exportMarkdown(boardId: string) {
-      interface ImportedNote {
-        description: string
-        category: string
-        category_id: number
-      }
-      interface ImportedBoardData {
-        board_name: string
-        notes: ImportedNote[]
-      }
-
-      try {
-        const response = await fetch(`/api/boards/export?board_id=${boardId}`)
-        const rawResponseData = (await response.json()) as ImportedBoardData
-        const boardName = rawResponseData['board_name']
-        const categories: string[] = rawResponseData.notes.map((note) => note.category)
-        const uniqueCategories = [...new Set(categories)]
-
-        // Header
-        let markdownString = '# ' + boardName + '\n\n'
-
-        // Table header with categories
-        for (const category of uniqueCategories) {
-          markdownString += '| ' + category
-        }
-        markdownString += ' |\n'
-
-        //Mandatory separator under table header
-        const categoryCount = uniqueCategories.length
-        markdownString += '|-'.repeat(categoryCount)
-        markdownString += '|\n'
-
-        const notesByCategory: Record<string, ImportedNote[]> = {}
-        uniqueCategories.forEach((category: string) => {
-          notesByCategory[category] = rawResponseData.notes.filter(
-            (note: ImportedNote) => note.category === category,
-          )
-        })
-
-        const maxRows = Math.max(...uniqueCategories.map((cat) => notesByCategory[cat].length))
-
-        for (let i = 0; i < maxRows; i++) {
-          const rowCells = uniqueCategories.map((cat) => {
-            const note = notesByCategory[cat][i]
-            const noteDescription = note ? note.description : ''
-            return noteDescription.replace(/\n/g, '<br>')
-          })
-
-          markdownString += `| ${rowCells.join(' | ')} |\n`
-        }
+        const response = await $fetch<string>(
+          `/api/boards/export?board_id=${boardId}&format=${format}&stream=true`,
+        )
 
-        return markdownString
+        return await response.text()
       } catch (err) {
-        console.error('Error exporting board to markdown: ', err)
+        console.error('Error exporting board to ', format, ': ', err)
         return ''
       }
     },
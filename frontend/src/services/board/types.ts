@@ -19,7 +19,45 @@ export interface Note {
   tags: string[]
 }
 
+export interface NoteChanges {
+  revision: number
+  notes: Note[]
+  deleted: number[]
+}
+
 export interface Category {
   id: number
   name: string
+  note_count?: number
+}
+
+export interface BoardSnapshot {
+  board: {
+    id: number
+    name: string
+    revision: number
+    note_count: number
+  }
+  categories: Category[]
+  notes: Note[]
+}
+
+export interface NoteEvent {
+  revision: number
+  note: Note
+}
+
+export interface NotesEvent {
+  revision: number
+  notes: Note[]
+}
+
+export interface CategoryEvent {
+  revision: number
+  category: Category
+}
+
+export interface RemovedEvent {
+  revision: number
+  id: number
 }